@@ -0,0 +1,306 @@
+from PyQt6 import QtCore
+from PyQt6.QtCore import QModelIndex
+import pandas as pd
+import numpy as np
+
+import logging
+import sys
+import time
+import typing
+
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_data_model
+from smart_qtable import smrt_dataframe
+
+
+NUM_ROWS = 1_000_000
+NUM_CALLS = 200_000
+
+ROLES = {
+    'Display': QtCore.Qt.ItemDataRole.DisplayRole,
+    'Sort': smrt_consts.TABLE_SORT_ROLE,
+    'Filter': smrt_consts.TABLE_FILTER_ROLE,
+}
+
+# the columns of sandbox.create_dtype_dict (the sandbox module itself pulls in the whole table widget)
+DTYPES = {
+    'First Name': smrt_consts.SmartDataTypes.TEXT,
+    'Last Name': smrt_consts.SmartDataTypes.TEXT,
+    'Age': smrt_consts.SmartDataTypes.INT,
+    'Height': smrt_consts.SmartDataTypes.FLOAT,
+    'Income': smrt_consts.SmartDataTypes.ACCT,
+    'Birthdate': smrt_consts.SmartDataTypes.DATE,
+    'Registration_Date': smrt_consts.SmartDataTypes.DATE_TIME,
+    'Is_Employed': smrt_consts.SmartDataTypes.BOOL,
+}
+
+
+class LegacyDataModel(QtCore.QAbstractTableModel):
+    """
+    The SmartDataModel data() from before the columnar snapshot (per cell iloc and the dtype if/elif ladder),
+    unchanged, so the before and after numbers time the same calls.
+    """
+
+    logger = logging.getLogger("smart_qtable.benchmark")
+
+    def __init__(self, smrt_df: smrt_dataframe.SmartDataFrame):
+        super().__init__()
+        self.smrt_df: smrt_dataframe.SmartDataFrame = smrt_df
+        self.editable_cols: list[str] = []
+        self.col_value_attrs: dict[str, smrt_consts.SmartValueAttributes] = {}
+
+    def rowCount(self, parent: QModelIndex = ...) -> int:
+        return self.smrt_df.data_df.shape[0]
+
+    def columnCount(self, parent: QModelIndex = ...) -> int:
+        if self.smrt_df.data_df is None:
+            return 0
+        return self.smrt_df.data_df.shape[1]
+
+    def data(self, index: QModelIndex, role: int = ...) -> typing.Any:
+        if not index.isValid():
+            return None
+        if index.column() < 0 or index.column() >= self.columnCount():
+            return None
+
+        row = index.row()
+        col = index.column()
+        col_name = self.smrt_df.data_df.columns[col]
+        dtype = self.smrt_df.dtypes[col_name]
+        value = self.smrt_df.data_df.iloc[row, col]
+        val_flags = (
+            smrt_consts.SmartValueFlags.NO_FLAG
+            if col_name not in self.col_value_attrs
+            else self.col_value_attrs[col_name].flags
+        )
+
+        if role == QtCore.Qt.ItemDataRole.DisplayRole:
+
+            if dtype == smrt_consts.SmartDataTypes.TEXT:
+                if pd.isnull(value):
+                    return ""
+                return str(value)
+            elif dtype == smrt_consts.SmartDataTypes.FLOAT:
+                if pd.isnull(value):
+                    return ""
+                return f"{value:.2f}"
+            elif dtype == smrt_consts.SmartDataTypes.ACCT:
+                if pd.isnull(value):
+                    return ""
+                return f"$ {value:,.2f}"
+            elif dtype == smrt_consts.SmartDataTypes.INT:
+                if pd.isnull(value):
+                    return ""
+                if value == smrt_consts.SMRT_TBL_BLANK_INT_FLAG:
+                    return ""
+                return f"{value:,}"
+            elif dtype == smrt_consts.SmartDataTypes.DATE:
+
+                if pd.isnull(value):
+                    if val_flags & smrt_consts.SmartValueFlags.REQUIRED:
+                        return "UNKNOWN"
+                    else:
+                        return ""
+                try:
+                    display_val = value.strftime("%Y-%m-%d")
+                except ValueError:
+                    self.logger.warning(
+                        f"An error occurred when interpreting '{value}' as a date."
+                    )
+                    return "UNKNOWN"
+
+                if val_flags & smrt_consts.SmartValueFlags.MIN_VALID_VALUE:
+                    if value < self.col_value_attrs[col_name].min_value:
+                        return "INVALID"
+                if val_flags & smrt_consts.SmartValueFlags.MAX_VALID_VALUE:
+                    if value > self.col_value_attrs[col_name].max_value:
+                        return "INVALID"
+                if val_flags & smrt_consts.SmartValueFlags.MAX_EXPECTED_VALUE:
+                    if value > self.col_value_attrs[col_name].max_value:
+                        return ""
+                return display_val
+
+            elif dtype == smrt_consts.SmartDataTypes.DATE_TIME:
+                if pd.isnull(value):
+                    return ""
+                if (
+                    value == smrt_consts.UNKNOWN_DATETIME
+                    or value == smrt_consts.SORT_ASC_UNKNOWN_DATETIME
+                ):
+                    return "UNKNOWN"
+                elif value == smrt_consts.INVALID_DATETIME:
+                    return "INVALID"
+                else:
+                    try:
+                        temp = value.strftime("%Y-%m-%d %H:%M:%S")
+                        return temp
+                    except ValueError:
+                        self.logger.warning(
+                            f"An error occurred when interpreting '{value}' as a datetime."
+                        )
+                        return "UNKNOWN"
+            elif dtype == smrt_consts.SmartDataTypes.BOOL:
+                if pd.isnull(value):
+                    return ""
+                if value:
+                    return "TRUE"
+                else:
+                    return "FALSE"
+            else:
+                self.logger.debug(
+                    "An unknown dtype was coverted to a string (by default)"
+                )
+                if pd.isnull(value):
+                    return ""
+                return str(value)
+
+        elif role == smrt_consts.TABLE_SORT_ROLE:
+
+            if pd.isnull(value):
+                return ""
+            if dtype == smrt_consts.SmartDataTypes.TEXT:
+                return str(value)
+            elif dtype == smrt_consts.SmartDataTypes.FLOAT:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.ACCT:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.INT:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.DATE:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.DATE_TIME:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.BOOL:
+                if value:
+                    return 1
+                else:
+                    return 0
+            elif dtype == smrt_consts.SmartDataTypes.LOCATION:
+                return value
+            else:
+                self.logger.debug(
+                    "An unknown dtype was coverted to a string (by default)"
+                )
+                return str(value)
+
+        elif role == smrt_consts.TABLE_FILTER_ROLE:
+            if pd.isnull(value):
+                return ""
+            if dtype == smrt_consts.SmartDataTypes.TEXT:
+                return str(value)
+            elif dtype == smrt_consts.SmartDataTypes.FLOAT:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.ACCT:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.INT:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.DATE:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.DATE_TIME:
+                return value
+            elif dtype == smrt_consts.SmartDataTypes.BOOL:
+                if value:
+                    return 1
+                else:
+                    return 0
+            else:
+                self.logger.debug(
+                    "An unknown dtype was coverted to a string (by default)"
+                )
+                return str(value)
+
+        elif role == QtCore.Qt.ItemDataRole.EditRole:
+            value = self.smrt_df.data_df.iloc[row, col]
+            return value
+
+        elif role == QtCore.Qt.ItemDataRole.TextAlignmentRole:
+            return QtCore.Qt.AlignmentFlag.AlignCenter
+
+        elif role == smrt_consts.SPN_MIN_VALUE_ROLE:
+            if (
+                dtype == smrt_consts.SmartDataTypes.INT
+                or dtype == smrt_consts.SmartDataTypes.FLOAT
+                or dtype == smrt_consts.SmartDataTypes.ACCT
+            ):
+                return 0
+            return None
+
+        elif role == smrt_consts.SPN_MAX_VALUE_ROLE:
+            if (
+                dtype == smrt_consts.SmartDataTypes.INT
+                or dtype == smrt_consts.SmartDataTypes.FLOAT
+                or dtype == smrt_consts.SmartDataTypes.ACCT
+            ):
+                return value
+            return None
+
+        elif role == QtCore.Qt.ItemDataRole.BackgroundRole:
+            if col_name in self.editable_cols:
+                return smrt_consts.EDITABLE_COLUMN_BG_COLOR
+
+        return None
+
+
+def create_large_dataframe(num_rows: int, seed: int = 0) -> pd.DataFrame:
+    # the same data as sandbox.create_test_dataframe, generated with numpy so a million rows builds quickly
+    rng = np.random.default_rng(seed)
+    f_names = np.array(['John', 'Alice', 'Bob', 'Emily', 'Charlie', 'Barry', 'Quinn', 'Jackie', 'James'], dtype=object)
+    l_names = np.array(['Smith', 'Johnson', 'Williams', 'Jones', 'Brown', 'Davis', 'Miller', 'Wilson'], dtype=object)
+    date_times = pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 4 * 365 * 24 * 3600, 100), unit='s')
+    dates = np.array([date_time.date() for date_time in date_times], dtype=object)
+    data = {
+        'First Name': f_names[rng.integers(0, len(f_names), num_rows)],
+        'Last Name': l_names[rng.integers(0, len(l_names), num_rows)],
+        'Age': rng.integers(18, 81, num_rows).astype(object),
+        'Height': rng.uniform(58.3, 71.9, num_rows),
+        'Income': rng.uniform(1000, 10000, num_rows),
+        'Birthdate': dates[rng.integers(0, len(dates), num_rows)],
+        'Registration_Date': date_times[rng.integers(0, len(date_times), num_rows)].to_numpy(),
+        'Is_Employed': rng.integers(0, 2, num_rows).astype(bool).astype(object),
+    }
+
+    # Introduce None values randomly
+    data_df = pd.DataFrame(data)
+    for col in data_df.columns:
+        data_df.loc[rng.choice(num_rows, 5, replace=False), col] = None
+    return data_df
+
+
+def model_data_calls(model: QtCore.QAbstractTableModel, rows: np.ndarray, cols: np.ndarray, role: int) -> float:
+    indexes = [model.index(int(row), int(col)) for row, col in zip(rows, cols)]
+    start = time.perf_counter()
+    for idx in indexes:
+        model.data(idx, role)
+    return time.perf_counter() - start
+
+
+def main():
+    app = QtCore.QCoreApplication(sys.argv)
+
+    print(f'Building a {NUM_ROWS:,} row dataframe...')
+    smrt_df = smrt_dataframe.SmartDataFrame(dtypes=DTYPES, data_df=create_large_dataframe(NUM_ROWS))
+
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, NUM_ROWS, NUM_CALLS)
+    cols = rng.integers(0, smrt_df.data_df.shape[1], NUM_CALLS)
+
+    legacy_model = LegacyDataModel(smrt_df)
+    for role_name, role in ROLES.items():
+        elapsed = model_data_calls(legacy_model, rows, cols, role)
+        print(f'{"before data() " + role_name:<32}{NUM_CALLS / elapsed:>14,.0f} calls/sec')
+
+    start = time.perf_counter()
+    model = smrt_data_model.SmartDataModel(smrt_df=smrt_df)
+    print(f'{"snapshot build":<32}{time.perf_counter() - start:>14.3f} sec')
+    for role_name, role in ROLES.items():
+        elapsed = model_data_calls(model, rows, cols, role)
+        print(f'{"after data() " + role_name:<32}{NUM_CALLS / elapsed:>14,.0f} calls/sec')
+
+    cached_model = smrt_data_model.SmartDataModel(smrt_df=smrt_df, display_cache=True)
+    model_data_calls(cached_model, rows, cols, ROLES['Display'])
+    elapsed = model_data_calls(cached_model, rows, cols, ROLES['Display'])
+    print(f'{"after data() Display (cached)":<32}{NUM_CALLS / elapsed:>14,.0f} calls/sec')
+
+
+if __name__ == '__main__':
+    main()
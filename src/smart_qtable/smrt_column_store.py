@@ -0,0 +1,474 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import dataclasses
+import datetime
+import typing
+
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_dataframe
+from smart_qtable import smrt_dates
+
+
+# the pandas arrays that hold a numpy array of values with a separate mask of the missing values
+MASKED_ARRAY_TYPES = (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)
+
+
+@dataclasses.dataclass
+class SmartColumnBuffer:
+    """
+    One column of a SmartColumnStore: a numpy array of values and a mask of the null rows.
+
+    Compacted columns (see SmartDataFrame.compact_columns) keep their compact form. A categorical column holds the
+    category codes (-1 for nulls) with its categorical dtype, and a nullable int/float/bool column holds its numpy
+    values (0 in the null rows) with the masked array type to rebuild it from. Either falls back to plain objects
+    when it is given a value its dtype cannot hold.
+    """
+
+    name: str
+    dtype: smrt_consts.SmartDataTypes
+    values: np.ndarray
+    null_mask: np.ndarray
+    box: typing.Optional[typing.Callable] = None
+    # spare capacity for appends; values and null_mask are views onto the front of these while they are in use
+    values_capacity: typing.Optional[np.ndarray] = dataclasses.field(default=None, repr=False)
+    null_capacity: typing.Optional[np.ndarray] = dataclasses.field(default=None, repr=False)
+    # set when values holds the codes of a categorical column
+    categorical_dtype: typing.Optional[pd.CategoricalDtype] = None
+    # set (IntegerArray, BooleanArray...) when values holds the data of a nullable column
+    masked_type: typing.Optional[type] = None
+
+    @classmethod
+    def from_series(
+        cls, name: str, dtype: smrt_consts.SmartDataTypes, column: pd.Series
+    ) -> "SmartColumnBuffer":
+        box = None
+        categorical_dtype = None
+        masked_type = None
+        null_mask = column.isnull().to_numpy()
+        if isinstance(column.dtype, np.dtype):
+            values = column.to_numpy(copy=True)
+            if column.dtype.kind == "M":
+                # kept as datetime64, each value is boxed into a Timestamp when read (as iloc did)
+                box = pd.Timestamp
+            elif column.dtype.kind == "m":
+                box = pd.Timedelta
+        elif isinstance(column.dtype, pd.CategoricalDtype):
+            values = column.cat.codes.to_numpy(copy=True)
+            categorical_dtype = column.dtype
+        elif isinstance(column.array, MASKED_ARRAY_TYPES):
+            values = column.array.to_numpy(dtype=column.dtype.numpy_dtype, na_value=column.dtype.type(0))
+            masked_type = type(column.array)
+        else:
+            # other extension arrays (arrow backed, intervals...) are held as plain objects
+            values = column.to_numpy(dtype=object)
+        return cls(
+            name=name,
+            dtype=dtype,
+            values=values,
+            null_mask=null_mask,
+            box=box,
+            categorical_dtype=categorical_dtype,
+            masked_type=masked_type,
+        )
+
+    def get(self, row: int) -> typing.Any:
+        if self.categorical_dtype is not None:
+            code = self.values[row]
+            return np.nan if code < 0 else self.categorical_dtype.categories[code]
+        if self.masked_type is not None:
+            return pd.NA if self.null_mask[row] else self.values[row].item()
+        if self.box is not None:
+            return self.box(self.values[row])
+        return self.values[row]
+
+    def array(self, first_row: int = 0, end_row: int = None) -> typing.Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+        """
+        Returns the values of a run of rows the way pandas holds them: a Categorical or masked array over the
+        compact values (without copying them), or the values themselves.
+        """
+        values = self.values[first_row:end_row]
+        if self.categorical_dtype is not None:
+            return pd.Categorical.from_codes(values, dtype=self.categorical_dtype, validate=False)
+        if self.masked_type is not None:
+            return self.masked_type(values, self.null_mask[first_row:end_row])
+        return values
+
+    def accepts(self, value: typing.Any) -> bool:
+        if self.categorical_dtype is not None:
+            return pd.isnull(value) or value in self.categorical_dtype.categories
+        kind = self.values.dtype.kind
+        if kind == "O":
+            return True
+        if isinstance(value, (bool, np.bool_)):
+            return kind == "b"
+        if pd.isnull(value):
+            return kind in "fmM" or self.masked_type is not None
+        if kind == "f":
+            return isinstance(value, (int, float, np.integer, np.floating))
+        if kind in "iu":
+            # (numpy would wrap a value that does not fit, i.e. into the small ints of a compacted column)
+            limits = np.iinfo(self.values.dtype)
+            return isinstance(value, (int, np.integer)) and limits.min <= value <= limits.max
+        if kind == "M":
+            return isinstance(value, (datetime.datetime, np.datetime64))
+        if kind == "m":
+            return isinstance(value, (datetime.timedelta, np.timedelta64))
+        return False
+
+    def as_objects(self) -> np.ndarray:
+        if self.categorical_dtype is not None or self.masked_type is not None:
+            return np.asarray(self.array(), dtype=object)
+        if self.values.dtype.kind == "O":
+            return self.values
+        if self.box is not None:
+            return np.array([self.box(value) for value in self.values], dtype=object)
+        return self.values.astype(object)
+
+    def to_objects(self) -> None:
+        self.values = self.as_objects()
+        self.box = None
+        self.categorical_dtype = None
+        self.masked_type = None
+
+    def encode(self, values: np.ndarray, null_mask: np.ndarray) -> np.ndarray:
+        # the values as they are stored in values (the codes of a categorical column, 0 for nulls in a masked one)
+        if self.categorical_dtype is not None:
+            return self.categorical_dtype.categories.get_indexer(values).astype(self.values.dtype)
+        if self.masked_type is not None and null_mask.any():
+            return np.where(null_mask, 0, values).astype(self.values.dtype)
+        return values
+
+    def ensure_writeable(self) -> None:
+        # zero-copy views onto a memory mapped file are read only, they are copied the first time they are edited
+        if not self.values.flags.writeable:
+            self.values = self.values.copy()
+
+    def set_value(self, row: int, value: typing.Any) -> None:
+        self.ensure_writeable()
+        if not self.accepts(value):
+            # numpy would silently cast the value (e.g. 1.5 into an int column), so fall back to objects
+            self.to_objects()
+        is_null = pd.isnull(value)
+        if self.categorical_dtype is not None or self.masked_type is not None:
+            value = self.encode(np.array([value], dtype=object), np.array([is_null]))[0]
+        self.values[row] = value
+        self.null_mask[row] = is_null
+
+    def accepts_array(self, values: np.ndarray) -> bool:
+        if self.categorical_dtype is not None:
+            not_null = values[~pd.isnull(values)]
+            try:
+                return bool((self.categorical_dtype.categories.get_indexer(not_null) >= 0).all())
+            except TypeError:
+                return False
+        kind = self.values.dtype.kind
+        if kind == "O":
+            return True
+        if self.masked_type is not None:
+            # (the nulls are held in the mask)
+            values = values[~pd.isnull(values)]
+        if values.dtype.kind == "O":
+            return all(self.accepts(value) for value in values)
+        if self.masked_type is not None and kind in "iu" and values.dtype.kind == "f":
+            # (ints with nulls arrive as floats)
+            if not (values == np.round(values)).all():
+                return False
+        if kind in "iu" and values.dtype.kind in "iuf" and values.shape[0]:
+            limits = np.iinfo(self.values.dtype)
+            return bool(limits.min <= values.min() and values.max() <= limits.max)
+        if values.dtype.kind == kind:
+            return True
+        return kind == "f" and values.dtype.kind in "iu"
+
+    def set_values(self, rows: np.ndarray, values: np.ndarray) -> None:
+        self.ensure_writeable()
+        if not self.accepts_array(values):
+            self.to_objects()
+        null_mask = pd.isnull(values)
+        self.values[rows] = self.encode(values, null_mask)
+        self.null_mask[rows] = null_mask
+
+    def remove_row(self, row: int) -> None:
+        self.values = np.delete(self.values, row)
+        self.null_mask = np.delete(self.null_mask, row)
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        self.values = np.delete(self.values, rows)
+        self.null_mask = np.delete(self.null_mask, rows)
+
+    def append(self, other: "SmartColumnBuffer") -> None:
+        size = self.values.shape[0]
+        if size == 0:
+            self.values, self.null_mask, self.box = other.values, other.null_mask, other.box
+            return
+        other_values = other.values
+        if (self.categorical_dtype is not None or self.masked_type is not None) and (
+            other.categorical_dtype != self.categorical_dtype or other.values.dtype != self.values.dtype
+        ):
+            # (new rows usually arrive as plain values) they are encoded the same way when the column can hold them
+            other_objects = other.as_objects()
+            if self.accepts_array(other_objects):
+                other_values = self.encode(other_objects, other.null_mask)
+        if self.values.dtype != other_values.dtype:
+            # mixed dtypes would be promoted by numpy (ints into floats...), so fall back to objects
+            self.values = np.concatenate([self.as_objects(), other.as_objects()])
+            self.null_mask = np.concatenate([self.null_mask, other.null_mask])
+            self.box = None
+            self.categorical_dtype = None
+            self.masked_type = None
+            return
+
+        new_size = size + other.values.shape[0]
+        if (
+            self.values_capacity is None
+            or self.values.base is not self.values_capacity
+            or self.null_mask.base is not self.null_capacity
+            or self.values_capacity.shape[0] < new_size
+        ):
+            # grow geometrically so a stream of small appends costs amortized O(1) per row
+            capacity = max(new_size, 2 * size)
+            self.values_capacity = np.empty(capacity, dtype=self.values.dtype)
+            self.values_capacity[:size] = self.values
+            self.null_capacity = np.empty(capacity, dtype=bool)
+            self.null_capacity[:size] = self.null_mask
+        self.values_capacity[size:new_size] = other_values
+        self.null_capacity[size:new_size] = other.null_mask
+        self.values = self.values_capacity[:new_size]
+        self.null_mask = self.null_capacity[:new_size]
+
+
+@dataclasses.dataclass
+class DateColumnBuffer(SmartColumnBuffer):
+    """
+    A column buffer for a DATE or DATE_TIME column. The values are normalized to datetime64 (days for DATE,
+    nanoseconds for DATE_TIME) and the SmartDateState the table shows for every row (blank, unknown, invalid...)
+    is worked out once, up front, and kept up to date as the column is edited.
+
+    A column holding anything that cannot be converted (text, time zone aware values...) falls back to
+    plain objects, exactly like any other column, and has no states.
+    """
+
+    value_attrs: typing.Optional[smrt_consts.SmartValueAttributes] = None
+    states: typing.Optional[np.ndarray] = None
+
+    @classmethod
+    def from_series(
+        cls,
+        name: str,
+        dtype: smrt_consts.SmartDataTypes,
+        column: pd.Series,
+        value_attrs: smrt_consts.SmartValueAttributes = None,
+    ) -> "DateColumnBuffer":
+        values = smrt_dates.to_datetime64(column, dtype)
+        if values is None:
+            buffer = SmartColumnBuffer.from_series(name, dtype, column)
+            return cls(name, dtype, buffer.values, buffer.null_mask, buffer.box, value_attrs=value_attrs)
+        null_mask = np.isnat(values)
+        return cls(
+            name=name,
+            dtype=dtype,
+            values=values,
+            null_mask=null_mask,
+            box=smrt_dates.DATE_BOXES[dtype],
+            value_attrs=value_attrs,
+            states=smrt_dates.date_states(values, null_mask, dtype, value_attrs, display=True),
+        )
+
+    def update_states(self, rows: typing.Any) -> None:
+        self.states[rows] = smrt_dates.date_states(
+            self.values[rows], self.null_mask[rows], self.dtype, self.value_attrs, display=True
+        )
+
+    def to_objects(self) -> None:
+        super().to_objects()
+        self.states = None
+
+    def set_value(self, row: int, value: typing.Any) -> None:
+        if self.states is None:
+            super().set_value(row, value)
+            return
+        converted = smrt_dates.to_datetime64(pd.Series([value], dtype=object), self.dtype)
+        if converted is None:
+            self.to_objects()
+            super().set_value(row, value)
+            return
+        self.ensure_writeable()
+        self.values[row] = converted[0]
+        self.null_mask[row] = np.isnat(converted[0])
+        self.update_states(slice(row, row + 1))
+
+    def set_values(self, rows: np.ndarray, values: np.ndarray) -> None:
+        if self.states is None:
+            super().set_values(rows, values)
+            return
+        converted = smrt_dates.to_datetime64(pd.Series(values, dtype=object), self.dtype)
+        if converted is None:
+            self.to_objects()
+            super().set_values(rows, values)
+            return
+        self.ensure_writeable()
+        self.values[rows] = converted
+        self.null_mask[rows] = np.isnat(converted)
+        self.update_states(rows)
+
+    def remove_row(self, row: int) -> None:
+        super().remove_row(row)
+        if self.states is not None:
+            self.states = np.delete(self.states, row)
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        super().remove_rows(rows)
+        if self.states is not None:
+            self.states = np.delete(self.states, rows)
+
+    def append(self, other: "SmartColumnBuffer") -> None:
+        states = None
+        if self.values.shape[0] == 0:
+            states = getattr(other, "states", None)
+        elif self.states is not None and getattr(other, "states", None) is not None:
+            states = np.concatenate([self.states, other.states])
+        super().append(other)
+        # appending anything that could not be converted leaves the whole column as objects
+        self.states = states if self.values.dtype.kind == "M" else None
+
+
+class LazyColumnBuffer(SmartColumnBuffer):
+    """
+    A column buffer for an Arrow backed (pd.ArrowDtype) column. Nothing is converted until the column is first
+    read. Numeric and timestamp columns without nulls are then served as zero-copy numpy views of the Arrow
+    data (for a memory mapped file, only the pages actually read are loaded); any other column is converted the
+    same way as other extension arrays.
+    """
+
+    def __init__(self, name: str, dtype: smrt_consts.SmartDataTypes, column: pd.Series):
+        # values, null_mask and box are only set (by __getattr__) once the column is read
+        self.name = name
+        self.dtype = dtype
+        self.column = column
+        self.values_capacity = None
+        self.null_capacity = None
+
+    def __getattr__(self, attr: str) -> typing.Any:
+        if attr in ("values", "null_mask", "box") and "column" in self.__dict__:
+            self.materialize()
+            return self.__dict__[attr]
+        raise AttributeError(attr)
+
+    def __repr__(self) -> str:
+        return f"LazyColumnBuffer(name={self.name!r}, dtype={self.dtype!r}, loaded={'values' in self.__dict__})"
+
+    def materialize(self) -> None:
+        column = self.__dict__.pop("column")
+        arrow_data = column.array.__arrow_array__()
+        arrow_type = arrow_data.type
+        zero_copy_type = (
+            pa.types.is_integer(arrow_type)
+            or pa.types.is_floating(arrow_type)
+            or pa.types.is_duration(arrow_type)
+            or (pa.types.is_timestamp(arrow_type) and arrow_type.tz is None)
+        )
+        if zero_copy_type and arrow_data.num_chunks == 1 and arrow_data.null_count == 0:
+            self.values = arrow_data.chunk(0).to_numpy(zero_copy_only=True)
+            self.null_mask = np.zeros(self.values.shape[0], dtype=bool)
+            self.box = {"M": pd.Timestamp, "m": pd.Timedelta}.get(self.values.dtype.kind, None)
+            return
+        buffer = SmartColumnBuffer.from_series(self.name, self.dtype, column)
+        self.values = buffer.values
+        self.null_mask = buffer.null_mask
+        self.box = buffer.box
+
+
+class SmartColumnStore:
+    """
+    A columnar snapshot of a SmartDataFrame: one plain numpy array (plus a null mask) per column.
+
+    The SmartDataModel reads every role from this snapshot instead of going through DataFrame.iloc for
+    each cell. The model is responsible for keeping it in sync with the dataframe when it edits or drops
+    rows.
+    """
+
+    def __init__(
+        self,
+        smrt_df: smrt_dataframe.SmartDataFrame = None,
+        col_value_attrs: dict[str, smrt_consts.SmartValueAttributes] = None,
+    ):
+        # value attributes decide the states (blank, unknown, invalid...) of DATE and DATE_TIME columns
+        self.col_value_attrs: dict[str, smrt_consts.SmartValueAttributes] = col_value_attrs or {}
+        self.col_names: list[str] = []
+        self.dtypes: list[smrt_consts.SmartDataTypes] = []
+        self.buffers: list[SmartColumnBuffer] = []
+        self.row_count: int = 0
+        if smrt_df is not None:
+            self.load(smrt_df)
+
+    def load(self, smrt_df: smrt_dataframe.SmartDataFrame) -> None:
+        self.col_names.clear()
+        self.dtypes.clear()
+        self.buffers.clear()
+        self.row_count = 0
+        if smrt_df is None or smrt_df.data_df is None:
+            return
+        data_df = smrt_df.data_df
+        for col_name in data_df.columns:
+            dtype = smrt_df.dtypes.get(col_name, smrt_consts.SmartDataTypes.UNKNOWN)
+            self.col_names.append(col_name)
+            self.dtypes.append(dtype)
+            self.buffers.append(self.create_buffer(col_name, dtype, data_df[col_name]))
+        self.row_count = data_df.shape[0]
+
+    def create_buffer(
+        self, name: str, dtype: smrt_consts.SmartDataTypes, column: pd.Series
+    ) -> SmartColumnBuffer:
+        if dtype in smrt_dates.DATE_TYPES:
+            return DateColumnBuffer.from_series(name, dtype, column, self.col_value_attrs.get(name, None))
+        if isinstance(column.dtype, pd.ArrowDtype):
+            return LazyColumnBuffer(name, dtype, column)
+        return SmartColumnBuffer.from_series(name, dtype, column)
+
+    @property
+    def column_count(self) -> int:
+        return len(self.buffers)
+
+    def value(self, row: int, col: int) -> typing.Any:
+        return self.buffers[col].get(row)
+
+    def is_null(self, row: int, col: int) -> bool:
+        return self.buffers[col].null_mask[row]
+
+    def column_series(self, col: int) -> pd.Series:
+        return pd.Series(self.buffers[col].array(), name=self.col_names[col], copy=False)
+
+    def set_value(self, row: int, col: int, value: typing.Any) -> None:
+        self.buffers[col].set_value(row, value)
+
+    def set_values(self, rows: np.ndarray, col: int, values: np.ndarray) -> None:
+        self.buffers[col].set_values(rows, values)
+
+    def set_column(self, col: int, column: pd.Series) -> None:
+        # the buffer is updated in place as the model's renderers hold on to it
+        buffer = self.buffers[col]
+        new_buffer = self.create_buffer(buffer.name, buffer.dtype, column)
+        buffer.values = new_buffer.values
+        buffer.null_mask = new_buffer.null_mask
+        buffer.box = new_buffer.box
+        buffer.categorical_dtype = new_buffer.categorical_dtype
+        buffer.masked_type = new_buffer.masked_type
+        if isinstance(buffer, DateColumnBuffer):
+            buffer.states = new_buffer.states
+
+    def remove_row(self, row: int) -> None:
+        for buffer in self.buffers:
+            buffer.remove_row(row)
+        self.row_count -= 1
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        for buffer in self.buffers:
+            buffer.remove_rows(rows)
+        self.row_count = self.buffers[0].values.shape[0] if self.buffers else 0
+
+    def append(self, data_df: pd.DataFrame) -> None:
+        for col, buffer in enumerate(self.buffers):
+            buffer.append(self.create_buffer(buffer.name, buffer.dtype, data_df.iloc[:, col]))
+        self.row_count += data_df.shape[0]
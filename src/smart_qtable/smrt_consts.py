@@ -122,6 +122,14 @@ class DateTimeNodeData(enum.IntEnum):
     SEC = 5
 
 
+class SmartDateState(enum.IntEnum):
+
+    VALID = 0
+    BLANK = 1       # null, or beyond the MAX_EXPECTED_VALUE
+    UNKNOWN = 2     # null in a REQUIRED column, or one of the UNKNOWN date sentinels
+    INVALID = 3     # the INVALID date sentinel, or outside of the MIN/MAX_VALID_VALUE range
+
+
 class ExcelVerticalAlignment(enum.IntEnum):
 
     BOTTOM = -4107
@@ -224,6 +232,13 @@ TIMER_CHECK_FOR_OLD_ACTIONS_MSECS = 30000 # 30 sec
 ACTION_TIMEOUT_SECS = 300 # 5 min
 TABLE_DATA_CHANGE_TIMEOUT_SECS = 300 # 5 min
 
+# number of dropped (tombstoned) rows that forces the model to compact without waiting for the event loop
+DEFAULT_COMPACTION_THRESHOLD = 10000
+# number of rows pulled from a lazy model's row provider each time the view asks for more
+DEFAULT_FETCH_CHUNK_SIZE = 10000
+# TEXT columns with no more unique values than this fraction of their rows are compacted into categoricals
+COMPACT_CATEGORY_MAX_RATIO = 0.5
+
 # for the smart data frame object, the number of informational columns to be added to front of table (at times)
 DF_STATUS_COL = 1
 DF_STATUS_COL_NAME = 'Status'
@@ -239,6 +254,11 @@ DF_ACTION_COLUMN = 'Pending Action'
 
 DF_INDEX_NAME = 'Index'
 FILTER_MAX_ROW_LIMIT = 10000
+# the number of bars in the filter popup's histogram of a FLOAT/ACCT column
+FILTER_HISTOGRAM_BINS = 24
+# the filter popup searches once the user stops typing for this long (ms), in chunks of this many values
+FILTER_SEARCH_DELAY_MS = 150
+FILTER_SEARCH_CHUNK_SIZE = 16384
 
 SELECT_ALL_TXT = '(Select All)'
 SELECT_ALL_RESULTS = '(Select All Search Results)'
@@ -247,6 +267,7 @@ UNKNOWN_TXT = '(Unknown)'
 INVALID_TXT = '(Invalid)'
 ADD_CURRENT_TXT = 'Add current selection to filter'
 NO_MATCHES_TXT = 'No matches'
+PARTIAL_DATA_TXT = 'Loaded rows only'
 CUSTOM_VIEW_NAME = 'Custom...'
 RECORD_COUNT_NAME = 'Records'
 
@@ -1,238 +1,513 @@
 from PyQt6 import QtCore, QtWidgets, QtGui
 from PyQt6.QtCore import QModelIndex, Qt
+import numpy as np
 import pandas as pd
 
 import logging
 import typing
 
 from smart_qtable import smrt_consts
+from smart_qtable import smrt_column_store
 from smart_qtable import smrt_dataframe
+from smart_qtable import smrt_display_cache
+from smart_qtable import smrt_renderers
+from smart_qtable import smrt_row_index
+
+
+def contiguous_runs(rows: np.ndarray) -> list[tuple[int, int]]:
+    """
+    Splits sorted row numbers into runs of consecutive rows.
+    Args:
+        rows: (ndarray) sorted, unique row numbers
+    Returns:
+        (list[tuple[int, int]]) a (first row, last row) pair for each run
+    """
+    if len(rows) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(rows) != 1)
+    starts = np.concatenate([[0], breaks + 1])
+    ends = np.concatenate([breaks, [len(rows) - 1]])
+    return [(int(rows[start]), int(rows[end])) for start, end in zip(starts, ends)]
+
+
+def changed_cells(old_df: pd.DataFrame, new_df: pd.DataFrame) -> np.ndarray:
+    """
+    Compares two frames of the same shape position by position (index labels are ignored).
+    Args:
+        old_df: (DataFrame) the current values
+        new_df: (DataFrame) the new values
+    Returns:
+        (ndarray) a (rows x columns) boolean array that is True where the value changed. A null replaced by a
+            null is not a change.
+    """
+    changed = np.zeros(old_df.shape, dtype=bool)
+    for col in range(old_df.shape[1]):
+        old_col = old_df.iloc[:, col]
+        new_col = new_df.iloc[:, col]
+        old_null = old_col.isnull().to_numpy()
+        new_null = new_col.isnull().to_numpy()
+        both_valid = ~old_null & ~new_null
+        differs = old_null != new_null
+        try:
+            values_differ = np.asarray(
+                old_col.to_numpy()[both_valid] != new_col.to_numpy()[both_valid], dtype=bool
+            )
+        except (TypeError, ValueError):
+            values_differ = None
+        if values_differ is None or values_differ.shape != (both_valid.sum(),):
+            # the values cannot be compared (e.g. numbers replaced by text) so treat them all as changed
+            values_differ = True
+        differs[both_valid] = values_differ
+        changed[:, col] = differs
+    return changed
+
+
+def match_na_dtypes(frames: list[pd.DataFrame]) -> list[pd.DataFrame]:
+    """
+    Readies frames for pd.concat: every all-NA column is cast to the dtype the frames holding values in the column
+    concatenate to. pd.concat leaves all-NA columns out when it works out the result's dtypes, which pandas has
+    deprecated (with a FutureWarning); casting them first gives the same dtypes without the warning.
+    Args:
+        frames: (list[DataFrame]) the frames to concatenate, with the same columns
+    Returns:
+        (list[DataFrame]) the frames, with the all-NA columns cast where needed (the others are not copied)
+    """
+    if len(frames) < 2:
+        return frames
+    all_na = [frame.isna().all(axis=0) for frame in frames]
+    casts: list[dict] = [{} for _ in frames]
+    for col in frames[0].columns:
+        na_frames = [pos for pos in range(len(frames)) if all_na[pos][col]]
+        if not na_frames or len(na_frames) == len(frames):
+            continue
+        # (the first value of each frame that holds one works out the same common dtype as the whole columns)
+        target = pd.concat(
+            [frames[pos][col].dropna().iloc[:1] for pos in range(len(frames)) if not all_na[pos][col]]
+        ).dtype
+        if isinstance(target, np.dtype) and target.kind in "biu":
+            # (a numpy int or bool column cannot hold the nulls, the result is object either way)
+            continue
+        for pos in na_frames:
+            if frames[pos][col].dtype != target:
+                casts[pos][col] = target
+    return [frame.astype(cast) if cast else frame for frame, cast in zip(frames, casts)]
 
 
 class SmartDataModel(QtCore.QAbstractTableModel):
 
     logger = logging.getLogger("smart_qtable.model")
+    signal_all_rows_fetched = QtCore.pyqtSignal()
 
     def __init__(self, smrt_df: smrt_dataframe.SmartDataFrame, *args, **kwargs) -> None:
         parent = kwargs.get("parent", None)
         super().__init__(parent=parent)
         self.smrt_df: smrt_dataframe.SmartDataFrame = smrt_df
+        # bumped every time the data changes so dependants (i.e. the proxy's filter mask) know to rebuild
+        self.data_version: int = 0
         self.editable_cols: list[str] = kwargs.get("editable_cols", None) or []
         self.col_value_attrs: dict[str, smrt_consts.SmartValueAttributes] = (
             kwargs.get("col_value_attrs", None) or {}
         )
+        self.col_store = smrt_column_store.SmartColumnStore(smrt_df, self.col_value_attrs)
+        # index label <-> row position, kept in step with the column store
+        self.row_index = smrt_row_index.SmartRowIndex(None if smrt_df is None else smrt_df.data_df.index)
+        self.display_cache: typing.Optional[smrt_display_cache.SmartDisplayCache] = None
+        if kwargs.get("display_cache", False):
+            self.display_cache = smrt_display_cache.SmartDisplayCache()
+        self.renderers: list[smrt_renderers.SmartCellRenderer] = []
+        self.build_renderers()
+
+        # rows appended to the column store that have not been merged into smrt_df.data_df yet
+        self.pending_rows: list[pd.DataFrame] = []
+
+        # rows dropped with drop_df_rows are tombstoned (hidden by the proxy) until they are compacted out
+        self.tombstone_mask: typing.Optional[np.ndarray] = None
+        self.compaction_threshold: int = kwargs.get(
+            "compaction_threshold", smrt_consts.DEFAULT_COMPACTION_THRESHOLD
+        )
+        self.compaction_timer = QtCore.QTimer(self)
+        self.compaction_timer.setSingleShot(True)
+        self.compaction_timer.setInterval(0)
+        self.compaction_timer.timeout.connect(self.compact)
+
+        # lazy mode: rows are pulled from the provider in chunks as the view scrolls (see fetchMore)
+        self.row_provider: typing.Optional[typing.Union[typing.Callable, typing.Iterator]] = None
+        self.fetch_chunk_size: int = kwargs.get("fetch_chunk_size", smrt_consts.DEFAULT_FETCH_CHUNK_SIZE)
+        self.rows_fetched: int = 0
+        self.all_rows_fetched: bool = True
+        self.set_row_provider(kwargs.get("row_provider", None))
 
     def update_df_cell_value(
         self, df_idx: typing.Any, col_name: str, new_val: typing.Any
     ):
-        col_num = list(self.smrt_df.data_df.columns).index(col_name)
-        row_num = self.smrt_df.data_df.index.get_loc(df_idx)
-        model_idx = self.index(row_num, col_num, QtCore.QModelIndex())
-        self.smrt_df.data_df.loc[df_idx, col_name] = new_val
-        self.dataChanged.emit(model_idx, model_idx)
+        # (like DataFrame.loc, every row with the label is updated when the index is not unique)
+        row_nums = self.row_index.positions(df_idx)
+        col_num = self.col_store.col_names.index(col_name)
+        self.sync_data_df()
+        for row_num in row_nums:
+            self._set_df_values(row_num, col_num, new_val)
+            self.col_store.set_value(row_num, col_num, new_val)
+            if self.display_cache is not None:
+                self.display_cache.invalidate_cell(row_num, col_num)
+        self.data_version += 1
+        for row_num in row_nums:
+            model_idx = self.index(row_num, col_num, QtCore.QModelIndex())
+            self.dataChanged.emit(model_idx, model_idx)
+
+    def update_df_cell_values(
+        self, updates: typing.Union[pd.DataFrame, typing.Iterable[tuple[typing.Any, str, typing.Any]]]
+    ) -> None:
+        """
+        Applies many cell updates at once. The updates are grouped by column and written with one vectorized
+        assignment per column, then signalled with one dataChanged per run of consecutive updated rows.
+        Args:
+            updates: either (index, column name, value) tuples (the last update of a cell wins) or a DataFrame
+                indexed by row labels whose columns are a subset of the table's columns. Every cell of the
+                DataFrame is applied, including nulls.
+        """
+        if isinstance(updates, pd.DataFrame):
+            col_updates = {col_name: updates[col_name] for col_name in updates.columns}
+        else:
+            update_df = pd.DataFrame(
+                list(updates), columns=["df_idx", "col_name", "new_val"], dtype=object
+            ).drop_duplicates(subset=["df_idx", "col_name"], keep="last")
+            col_updates = {
+                col_name: pd.Series(group["new_val"].to_numpy(), index=group["df_idx"]).infer_objects()
+                for col_name, group in update_df.groupby("col_name", sort=False)
+            }
+        col_updates = {col_name: column for col_name, column in col_updates.items() if not column.empty}
+        if not col_updates:
+            return
+
+        self.sync_data_df()
+        data_df = self.smrt_df.data_df
+        for col_name in col_updates.keys():
+            if col_name not in data_df.columns:
+                raise KeyError(f"'{col_name}' is not a column in this table.")
+        if not self.row_index.is_unique:
+            # labels cannot be matched to positions one to one, so fall back to updating cell by cell
+            for col_name, column in col_updates.items():
+                for df_idx, new_val in column.items():
+                    self.update_df_cell_value(df_idx, col_name, new_val)
+            return
+
+        changed_rows = []
+        changed_cols = []
+        for col_name, column in col_updates.items():
+            rows = self.row_index.get_indexer(column.index)
+            if (rows < 0).any():
+                raise KeyError(f"{list(column.index[rows < 0][:5])} are not in the table's index.")
+            col_num = self.col_store.col_names.index(col_name)
+            values = column.to_numpy()
+            self._set_df_values(rows, col_num, values)
+            self.col_store.set_values(rows, col_num, values)
+            if self.display_cache is not None:
+                self.display_cache.invalidate_cells(rows, col_num)
+            changed_rows.append(rows)
+            changed_cols.append(np.full(len(rows), col_num))
+        self.data_version += 1
+        self._emit_changed_cells(np.concatenate(changed_rows), np.concatenate(changed_cols))
+
+    def _set_df_values(self, rows: typing.Any, col_num: int, values: typing.Any) -> None:
+        data_df = self.smrt_df.data_df
+        indexer = data_df.iat if isinstance(rows, (int, np.integer)) else data_df.iloc
+        try:
+            indexer[rows, col_num] = values
+        except (TypeError, ValueError):
+            # compacted columns (categoricals, small nullable ints...) reject values outside of their dtype,
+            # so the column is widened back to objects
+            col_name = data_df.columns[col_num]
+            data_df[col_name] = data_df[col_name].astype(object)
+            data_df.iloc[rows, col_num] = values
 
     def drop_df_row(self, df_idx: typing.Any):
-        row_num = self.smrt_df.data_df.index.get_loc(df_idx)
+        self.compact()
+        self.sync_data_df()
+        # (like DataFrame.drop, every row with the label is dropped when the index is not unique)
+        row_nums = self.row_index.positions(df_idx)
+        if len(row_nums) > 1:
+            rows = np.array(row_nums)
+            self._remove_store_rows(rows)
+            self.smrt_df.data_df = self.smrt_df.data_df.drop(df_idx)
+            self.data_version += 1
+            return
+        row_num = row_nums[0]
         self.beginRemoveRows(QtCore.QModelIndex(), row_num, row_num)
         self.smrt_df.data_df.drop(df_idx, inplace=True)
+        self.col_store.remove_row(row_num)
+        self.row_index.remove(np.array(row_nums))
+        if self.display_cache is not None:
+            self.display_cache.remove_row(row_num)
+        self.data_version += 1
         self.endRemoveRows()
 
+    def drop_df_rows(self, df_idxs: typing.Iterable[typing.Any]) -> None:
+        """
+        Drops many rows at once. The rows are tombstoned - the proxy hides them once the event loop is idle - and
+        are removed from the model and the dataframe in one pass once the event loop is idle, or immediately when
+        more than compaction_threshold rows are waiting. Call compact() to remove them right away.
+        Args:
+            df_idxs: the index labels of the rows to drop (every row with a label is dropped, like DataFrame.drop)
+        """
+        rows = self.row_index.get_all_positions(df_idxs)
+        if not len(rows):
+            return
+
+        if self.tombstone_mask is None:
+            self.tombstone_mask = np.zeros(self.col_store.row_count, dtype=bool)
+        rows = rows[~self.tombstone_mask[rows]]
+        self.tombstone_mask[rows] = True
+        # a dataChanged makes the proxy re-filter these rows, which hides them
+        last_col = self.col_store.column_count - 1
+        for first_row, last_row in contiguous_runs(rows):
+            self.dataChanged.emit(self.index(first_row, 0), self.index(last_row, last_col))
+
+        if self.tombstone_mask.sum() >= self.compaction_threshold:
+            self.compact()
+        else:
+            self.compaction_timer.start()
+
+    def append_rows(self, chunk_df: pd.DataFrame) -> None:
+        """
+        Appends new rows (i.e. the next chunk of a live feed) to the end of the model with a single rowsInserted.
+        The rows are validated against the SmartDataFrame's dtypes and appended to the column store, which grows
+        geometrically. They are merged into smrt_df.data_df in one concat the next time sync_data_df() is called
+        (every method that reads or writes data_df does so first).
+        Args:
+            chunk_df: (DataFrame) the new rows, with the same columns as the table and index labels not already
+                in the table
+        """
+        if chunk_df is None or chunk_df.empty:
+            return
+        chunk_df = self.smrt_df.validate_rows(chunk_df)
+        if (self.row_index.get_indexer(chunk_df.index) >= 0).any():
+            # (validate_rows only checks the rows already merged into data_df)
+            raise ValueError('The new rows\' index labels must not already be in the dataframe.')
+
+        first_row = self.col_store.row_count
+        self.beginInsertRows(QtCore.QModelIndex(), first_row, first_row + chunk_df.shape[0] - 1)
+        self.col_store.append(chunk_df)
+        self.row_index.append(chunk_df.index)
+        self.pending_rows.append(chunk_df)
+        if self.display_cache is not None:
+            self.display_cache.append_rows(chunk_df.shape[0])
+        if self.tombstone_mask is not None:
+            self.tombstone_mask = np.concatenate(
+                [self.tombstone_mask, np.zeros(chunk_df.shape[0], dtype=bool)]
+            )
+        self.endInsertRows()
+
+    def set_row_provider(
+        self, row_provider: typing.Optional[typing.Union[typing.Callable, typing.Iterable]]
+    ) -> None:
+        """
+        Puts the model in lazy mode: instead of holding every row up front, rows are appended in chunks whenever
+        the view asks for more (canFetchMore/fetchMore), i.e. as the user scrolls to the bottom.
+        Args:
+            row_provider: either a callable taking (first_row, row_count) and returning a DataFrame of up to
+                row_count rows (empty or None when there are no more), or an iterable of DataFrame chunks. None
+                turns lazy mode off.
+        """
+        self.rows_fetched = 0
+        if row_provider is None:
+            self.row_provider = None
+            self.all_rows_fetched = True
+            return
+        if callable(row_provider):
+            self.row_provider = row_provider
+        else:
+            self.row_provider = iter(row_provider)
+        self.all_rows_fetched = False
+
+    def canFetchMore(self, parent: QModelIndex) -> bool:
+        if parent.isValid():
+            return False
+        return not self.all_rows_fetched
+
+    def fetchMore(self, parent: QModelIndex) -> None:
+        if parent.isValid() or self.all_rows_fetched:
+            return
+        if callable(self.row_provider):
+            chunk_df = self.row_provider(self.rows_fetched, self.fetch_chunk_size)
+        else:
+            chunk_df = next(self.row_provider, None)
+        if chunk_df is None or chunk_df.empty:
+            self.all_rows_fetched = True
+            self.logger.debug(f"All {self.rows_fetched:,} rows have been fetched from the row provider.")
+            self.signal_all_rows_fetched.emit()
+            return
+        self.rows_fetched += chunk_df.shape[0]
+        self.append_rows(chunk_df)
+
+    def fetch_all(self) -> None:
+        """
+        Pulls every remaining row from the row provider (i.e. before exporting the whole table).
+        """
+        while self.canFetchMore(QtCore.QModelIndex()):
+            self.fetchMore(QtCore.QModelIndex())
+
+    def sync_data_df(self) -> None:
+        """
+        Merges any rows appended with append_rows into smrt_df.data_df.
+        """
+        if not self.pending_rows:
+            return
+        frames = [frame for frame in [self.smrt_df.data_df] + self.pending_rows if not frame.empty]
+        self.smrt_df.data_df = pd.concat(match_na_dtypes(frames))
+        self.pending_rows.clear()
+
+    def is_tombstone(self, row: int) -> bool:
+        return self.tombstone_mask is not None and self.tombstone_mask[row]
+
+    def compact(self) -> None:
+        """
+        Removes every tombstoned row from the model (one beginRemoveRows/endRemoveRows per contiguous run) and
+        from the dataframe in a single pass.
+        """
+        self.compaction_timer.stop()
+        if self.tombstone_mask is None:
+            return
+        tombstone_mask = self.tombstone_mask
+        self.tombstone_mask = None
+        rows = np.flatnonzero(tombstone_mask)
+        if not len(rows):
+            return
+        self.sync_data_df()
+        self._remove_store_rows(rows)
+        self.smrt_df.data_df = self.smrt_df.data_df[~tombstone_mask]
+        self.data_version += 1
+
+    def refresh_smrt_df(self, new_smrt_df: smrt_dataframe.SmartDataFrame) -> bool:
+        """
+        Brings the model up to date with new data by diffing it against the current data by index label. Only
+        the rows that were removed, inserted or changed are signalled (rowsRemoved, rowsInserted, dataChanged) so
+        views and proxies keep their sort, filters and selection.
+
+        Rows that are kept stay at their current position and new rows are appended to the end, so the new
+        frame's row order is not adopted.
+        Args:
+            new_smrt_df: (SmartDataFrame) the refreshed data. Its data_df is re-ordered to match the model.
+        Returns:
+            (bool) True when the model was refreshed, False if the data cannot be diffed (different columns or
+                dtypes, or a non-unique index) - reset the model with set_smrt_df instead.
+        """
+        self.compact()
+        self.sync_data_df()
+        old_df = self.smrt_df.data_df
+        new_df = new_smrt_df.data_df
+        if old_df is None or new_df is None:
+            return False
+        if list(old_df.columns) != list(new_df.columns) or self.smrt_df.dtypes != new_smrt_df.dtypes:
+            return False
+        if not old_df.index.is_unique or not new_df.index.is_unique:
+            return False
+
+        kept = old_df.index.isin(new_df.index)
+        kept_labels = old_df.index[kept]
+        added_labels = new_df.index[~new_df.index.isin(old_df.index)]
+        merged_df = new_df.loc[kept_labels.append(added_labels)]
+        self.smrt_df = new_smrt_df
+        self.smrt_df.data_df = merged_df
+
+        removed_rows = np.flatnonzero(~kept)
+        if len(removed_rows):
+            self._remove_store_rows(removed_rows)
+
+        changed = changed_cells(old_df[kept], merged_df.iloc[:len(kept_labels)])
+        changed_cols = np.flatnonzero(changed.any(axis=0))
+        for col in changed_cols:
+            self.col_store.set_column(col, merged_df.iloc[:len(kept_labels), col])
+            if self.display_cache is not None:
+                self.display_cache.invalidate_cells(np.flatnonzero(changed[:, col]), col)
+        self.data_version += 1
+        if len(changed_cols):
+            self._emit_changed_cells(*np.nonzero(changed))
+
+        if len(added_labels):
+            first_row = self.col_store.row_count
+            self.beginInsertRows(QtCore.QModelIndex(), first_row, first_row + len(added_labels) - 1)
+            self.col_store.append(merged_df.iloc[first_row:])
+            self.row_index.append(added_labels)
+            if self.display_cache is not None:
+                self.display_cache.append_rows(len(added_labels))
+            self.data_version += 1
+            self.endInsertRows()
+
+        self.logger.debug(
+            f"Refreshed model: {len(removed_rows)} rows removed, {int(changed.any(axis=1).sum())} rows changed, "
+            f"{len(added_labels)} rows inserted."
+        )
+        return True
+
+    def _remove_store_rows(self, rows: np.ndarray) -> None:
+        # Views only need the row count to be right between begin/endRemoveRows, so each contiguous run is
+        # announced on its own (last run first, so row numbers stay valid) and the store is compacted once.
+        for first_row, last_row in reversed(contiguous_runs(rows)):
+            self.beginRemoveRows(QtCore.QModelIndex(), first_row, last_row)
+            self.col_store.row_count -= last_row - first_row + 1
+            self.endRemoveRows()
+        self.col_store.remove_rows(rows)
+        self.row_index.remove(rows)
+        if self.display_cache is not None:
+            self.display_cache.remove_rows(rows)
+
+    def _emit_changed_cells(self, rows: np.ndarray, cols: np.ndarray) -> None:
+        # one dataChanged per run of consecutive changed rows, spanning just the columns changed within the run
+        order = np.lexsort((cols, rows))
+        rows = rows[order]
+        cols = cols[order]
+        row_starts = np.flatnonzero(np.concatenate([[True], rows[1:] != rows[:-1]]))
+        changed_rows = rows[row_starts]
+        first_cols = np.minimum.reduceat(cols, row_starts)
+        last_cols = np.maximum.reduceat(cols, row_starts)
+        run_starts = np.flatnonzero(np.concatenate([[True], np.diff(changed_rows) != 1]))
+        run_ends = np.concatenate([run_starts[1:], [len(changed_rows)]])
+        for run_start, run_end in zip(run_starts, run_ends):
+            self.dataChanged.emit(
+                self.index(int(changed_rows[run_start]), int(first_cols[run_start:run_end].min())),
+                self.index(int(changed_rows[run_end - 1]), int(last_cols[run_start:run_end].max())),
+            )
+
     def set_smrt_df(self, new_smrt_df: smrt_dataframe.SmartDataFrame):
 
         # self.beginResetModel()
+        self.compaction_timer.stop()
+        self.tombstone_mask = None
+        self.pending_rows.clear()
         self.smrt_df = new_smrt_df
+        self.col_store.load(new_smrt_df)
+        self.row_index.reset(None if new_smrt_df is None else new_smrt_df.data_df.index)
+        if self.display_cache is not None:
+            self.display_cache.reset()
+        self.build_renderers()
+        self.data_version += 1
         # self.endResetModel()
 
     def rowCount(self, parent: QModelIndex = ...) -> int:
-        return self.smrt_df.data_df.shape[0]
+        return self.col_store.row_count
 
     def columnCount(self, parent: QModelIndex = ...) -> int:
-        if self.smrt_df.data_df is None:
-            return 0
-        return self.smrt_df.data_df.shape[1]
+        return self.col_store.column_count
 
     def data(self, index: QModelIndex, role: int = ...) -> typing.Any:
         if not index.isValid():
             return None
-        if index.column() < 0 or index.column() >= self.columnCount():
-            return None
-
-        row = index.row()
         col = index.column()
-        col_name = self.smrt_df.data_df.columns[col]
-        dtype = self.smrt_df.dtypes[col_name]
-        value = self.smrt_df.data_df.iloc[row, col]
-        val_flags = (
-            smrt_consts.SmartValueFlags.NO_FLAG
-            if col_name not in self.col_value_attrs
-            else self.col_value_attrs[col_name].flags
-        )
-
-        if role == QtCore.Qt.ItemDataRole.DisplayRole:
-
-            if dtype == smrt_consts.SmartDataTypes.TEXT:
-                if pd.isnull(value):
-                    return ""
-                return str(value)
-            elif dtype == smrt_consts.SmartDataTypes.FLOAT:
-                if pd.isnull(value):
-                    return ""
-                return f"{value:.2f}"
-            elif dtype == smrt_consts.SmartDataTypes.ACCT:
-                if pd.isnull(value):
-                    return ""
-                return f"$ {value:,.2f}"
-            elif dtype == smrt_consts.SmartDataTypes.INT:
-                if pd.isnull(value):
-                    return ""
-                if value == smrt_consts.SMRT_TBL_BLANK_INT_FLAG:
-                    return ""
-                return f"{value:,}"
-            elif dtype == smrt_consts.SmartDataTypes.DATE:
-
-                if pd.isnull(value):
-                    if val_flags & smrt_consts.SmartValueFlags.REQUIRED:
-                        return "UNKNOWN"
-                    else:
-                        return ""
-                try:
-                    display_val = value.strftime("%Y-%m-%d")
-                except ValueError:
-                    self.logger.warning(
-                        f"An error occurred when interpreting '{value}' as a date."
-                    )
-                    return "UNKNOWN"
-
-                if val_flags & smrt_consts.SmartValueFlags.MIN_VALID_VALUE:
-                    if value < self.col_value_attrs[col_name].min_value:
-                        return "INVALID"
-                if val_flags & smrt_consts.SmartValueFlags.MAX_VALID_VALUE:
-                    if value > self.col_value_attrs[col_name].max_value:
-                        return "INVALID"
-                if val_flags & smrt_consts.SmartValueFlags.MAX_EXPECTED_VALUE:
-                    if value > self.col_value_attrs[col_name].max_value:
-                        return ""
-                return display_val
-
-            elif dtype == smrt_consts.SmartDataTypes.DATE_TIME:
-                if pd.isnull(value):
-                    return ""
-                if (
-                    value == smrt_consts.UNKNOWN_DATETIME
-                    or value == smrt_consts.SORT_ASC_UNKNOWN_DATETIME
-                ):
-                    return "UNKNOWN"
-                elif value == smrt_consts.INVALID_DATETIME:
-                    return "INVALID"
-                else:
-                    try:
-                        temp = value.strftime("%Y-%m-%d %H:%M:%S")
-                        return temp
-                    except ValueError:
-                        self.logger.warning(
-                            f"An error occurred when interpreting '{value}' as a datetime."
-                        )
-                        return "UNKNOWN"
-            elif dtype == smrt_consts.SmartDataTypes.BOOL:
-                if pd.isnull(value):
-                    return ""
-                if value:
-                    return "TRUE"
-                else:
-                    return "FALSE"
-            else:
-                self.logger.debug(
-                    "An unknown dtype was coverted to a string (by default)"
-                )
-                if pd.isnull(value):
-                    return ""
-                return str(value)
-
-        elif role == smrt_consts.TABLE_SORT_ROLE:
-
-            if pd.isnull(value):
-                return ""
-            if dtype == smrt_consts.SmartDataTypes.TEXT:
-                return str(value)
-            elif dtype == smrt_consts.SmartDataTypes.FLOAT:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.ACCT:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.INT:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.DATE:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.DATE_TIME:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.BOOL:
-                if value:
-                    return 1
-                else:
-                    return 0
-            elif dtype == smrt_consts.SmartDataTypes.LOCATION:
-                return value
-            else:
-                self.logger.debug(
-                    "An unknown dtype was coverted to a string (by default)"
-                )
-                return str(value)
-
-        elif role == smrt_consts.TABLE_FILTER_ROLE:
-            if pd.isnull(value):
-                return ""
-            if dtype == smrt_consts.SmartDataTypes.TEXT:
-                return str(value)
-            elif dtype == smrt_consts.SmartDataTypes.FLOAT:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.ACCT:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.INT:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.DATE:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.DATE_TIME:
-                return value
-            elif dtype == smrt_consts.SmartDataTypes.BOOL:
-                if value:
-                    return 1
-                else:
-                    return 0
-            else:
-                self.logger.debug(
-                    "An unknown dtype was coverted to a string (by default)"
-                )
-                return str(value)
-
-        elif role == QtCore.Qt.ItemDataRole.EditRole:
-            value = self.smrt_df.data_df.iloc[row, col]
-            return value
-
-        elif role == QtCore.Qt.ItemDataRole.TextAlignmentRole:
-            return QtCore.Qt.AlignmentFlag.AlignCenter
-
-        elif role == smrt_consts.SPN_MIN_VALUE_ROLE:
-            if (
-                dtype == smrt_consts.SmartDataTypes.INT
-                or dtype == smrt_consts.SmartDataTypes.FLOAT
-                or dtype == smrt_consts.SmartDataTypes.ACCT
-            ):
-                return 0
+        if col < 0 or col >= len(self.renderers):
             return None
-
-        elif role == smrt_consts.SPN_MAX_VALUE_ROLE:
-            if (
-                dtype == smrt_consts.SmartDataTypes.INT
-                or dtype == smrt_consts.SmartDataTypes.FLOAT
-                or dtype == smrt_consts.SmartDataTypes.ACCT
-            ):
-                return value
-            return None
-
-        elif role == QtCore.Qt.ItemDataRole.BackgroundRole:
-            if col_name in self.editable_cols:
-                return smrt_consts.EDITABLE_COLUMN_BG_COLOR
-
-        return None
+        return self.renderers[col].data(index.row(), role)
+
+    def build_renderers(self) -> None:
+        self.renderers = [
+            smrt_renderers.create_renderer(
+                col,
+                buffer,
+                value_attrs=self.col_value_attrs.get(buffer.name, None),
+                editable=buffer.name in self.editable_cols,
+                display_cache=self.display_cache,
+            )
+            for col, buffer in enumerate(self.col_store.buffers)
+        ]
 
     def setData(self, index, value, role=...) -> bool:
         if not index.isValid():
@@ -241,7 +516,12 @@ class SmartDataModel(QtCore.QAbstractTableModel):
         row = index.row()
         col = index.column()
         if role == QtCore.Qt.ItemDataRole.EditRole:
-            self.smrt_df.data_df.iloc[row, col] = value
+            self.sync_data_df()
+            self._set_df_values(row, col, value)
+            self.col_store.set_value(row, col, value)
+            if self.display_cache is not None:
+                self.display_cache.invalidate_cell(row, col)
+            self.data_version += 1
             self.dataChanged.emit(index, index, [])
             return True
         return False
@@ -251,8 +531,8 @@ class SmartDataModel(QtCore.QAbstractTableModel):
             return None
         if orientation != QtCore.Qt.Orientation.Horizontal:
             return None
-        if 0 <= section < self.smrt_df.data_df.shape[1]:
-            return str(self.smrt_df.data_df.columns[section])
+        if 0 <= section < self.col_store.column_count:
+            return str(self.col_store.col_names[section])
         return None
 
     def flags(self, index: QModelIndex) -> QtCore.Qt.ItemFlag:
@@ -260,7 +540,7 @@ class SmartDataModel(QtCore.QAbstractTableModel):
             return QtCore.Qt.ItemFlag.NoItemFlags
         col = index.column()
         flags = QtCore.Qt.ItemFlag.ItemIsEnabled | QtCore.Qt.ItemFlag.ItemIsSelectable
-        col_name = self.smrt_df.data_df.columns[col]
+        col_name = self.col_store.col_names[col]
         if col_name in self.editable_cols:
             flags |= QtCore.Qt.ItemFlag.ItemIsEditable
 
@@ -1,20 +1,98 @@
+import numpy as np
 import pandas as pd
+import pyarrow.feather
 
 import dataclasses
 import datetime
+import logging
+import os
 import typing
 
 from smart_qtable import smrt_consts
 
 
+logger = logging.getLogger('smart_qtable.dataframe')
+
+NULLABLE_INT_TYPES = ['Int8', 'Int16', 'Int32', 'Int64']
+
+
+@dataclasses.dataclass
+class SmartMemoryReport:
+
+    before_bytes: int = 0
+    after_bytes: int = 0
+    # column name -> (dtype before, dtype after) for every column that was converted
+    converted_columns: dict[str, tuple[str, str]] = dataclasses.field(default_factory=dict)
+
+    @property
+    def ratio(self) -> float:
+        if not self.after_bytes:
+            return 1.0
+        return self.before_bytes / self.after_bytes
+
+    def __str__(self) -> str:
+        lines = [f'Memory: {self.before_bytes / 1e6:,.1f} MB -> {self.after_bytes / 1e6:,.1f} MB ({self.ratio:.1f}x)']
+        for col_name, (before, after) in self.converted_columns.items():
+            lines.append(f'  {col_name}: {before} -> {after}')
+        return '\n'.join(lines)
+
+
+def _smallest_nullable_int(values: pd.Series) -> str:
+    for int_type in NULLABLE_INT_TYPES:
+        info = np.iinfo(int_type.lower())
+        if values.empty or (values.min() >= info.min and values.max() <= info.max):
+            return int_type
+    return NULLABLE_INT_TYPES[-1]
+
+
+def compact_column(column: pd.Series, dtype: smrt_consts.SmartDataTypes) -> pd.Series:
+    """
+    Converts a column to the smallest pandas dtype that holds exactly the same values, based on its SmartDataTypes.
+    Args:
+        column: (Series) the column data
+        dtype: (SmartDataTypes) the column's data type
+    Returns:
+        (Series) the compacted column (or the original column if it cannot be compacted)
+    """
+    valid = column.dropna()
+    if dtype == smrt_consts.SmartDataTypes.TEXT:
+        if isinstance(column.dtype, pd.CategoricalDtype) or column.shape[0] == 0:
+            return column
+        if valid.nunique() <= column.shape[0] * smrt_consts.COMPACT_CATEGORY_MAX_RATIO:
+            return column.astype('category')
+    elif dtype == smrt_consts.SmartDataTypes.INT:
+        # nulls (and the blank sentinel) become the missing values of a nullable integer array
+        valid = pd.to_numeric(valid[valid != smrt_consts.SMRT_TBL_BLANK_INT_FLAG])
+        if not pd.api.types.is_integer_dtype(valid) and not (valid == valid.round()).all():
+            return column
+        compacted = column.where(column.notna() & (column != smrt_consts.SMRT_TBL_BLANK_INT_FLAG), None)
+        return compacted.astype(_smallest_nullable_int(valid))
+    elif dtype == smrt_consts.SmartDataTypes.FLOAT:
+        # ACCT columns are left as float64 so currency totals keep their precision
+        if column.dtype != np.float64:
+            return column
+        downcast = column.astype(np.float32)
+        if np.array_equal(downcast.astype(np.float64).to_numpy(), column.to_numpy(), equal_nan=True):
+            return downcast
+    elif dtype == smrt_consts.SmartDataTypes.BOOL:
+        if not valid.map(lambda val: isinstance(val, (bool, np.bool_))).all():
+            return column
+        if valid.shape[0] == column.shape[0]:
+            return column.astype(bool)
+        return column.astype('boolean')
+    return column
+
+
 @dataclasses.dataclass
 class SmartDataFrame:
 
     dtypes: dict[str, smrt_consts.SmartDataTypes]
     data_df: typing.Optional[pd.DataFrame] = None
     refresh_dt: typing.Optional[datetime.datetime] = datetime.datetime.now()
+    compact_memory: dataclasses.InitVar[bool] = False
+    memory_report: typing.Optional[SmartMemoryReport] = dataclasses.field(default=None, init=False, repr=False)
 
-    def __post_init__(self):
+    def __post_init__(self, compact_memory: bool = False):
         if self.dtypes is None:
             raise ValueError('The dtypes parameter is required.')
         if self.data_df is None:
@@ -26,3 +104,97 @@ class SmartDataFrame:
                 if column not in self.data_df.columns:
                     print('column: ', column, ' not in data_df')
                     raise ValueError('The dataframe columns and dtype key columns must match exactly.')
+        if compact_memory:
+            self.memory_report = self.compact_columns()
+
+    def compact_columns(self) -> SmartMemoryReport:
+        """
+        Shrinks data_df by converting each column to the smallest dtype that holds the same values, based on the
+        declared SmartDataTypes: low cardinality TEXT becomes categorical, INT becomes the smallest nullable
+        integer (nulls and SMRT_TBL_BLANK_INT_FLAG become missing values), FLOAT is downcast to float32 when
+        that is lossless and BOOL is packed into bool/boolean.
+        Returns:
+            (SmartMemoryReport) the memory used before and after, and the converted columns
+        """
+        report = SmartMemoryReport(before_bytes=int(self.data_df.memory_usage(deep=True).sum()))
+        for col_name, dtype in self.dtypes.items():
+            column = self.data_df[col_name]
+            try:
+                compacted = compact_column(column, dtype)
+            except (TypeError, ValueError) as err:
+                logger.warning(f'Column \'{col_name}\' could not be compacted: {err}')
+                continue
+            if compacted is not column:
+                self.data_df[col_name] = compacted
+                report.converted_columns[col_name] = (str(column.dtype), str(compacted.dtype))
+        report.after_bytes = int(self.data_df.memory_usage(deep=True).sum())
+        logger.debug(str(report))
+        return report
+
+    @classmethod
+    def from_arrow_file(
+        cls,
+        path: typing.Union[str, os.PathLike],
+        dtypes: dict[str, smrt_consts.SmartDataTypes],
+        refresh_dt: typing.Optional[datetime.datetime] = None,
+    ) -> "SmartDataFrame":
+        """
+        Creates a SmartDataFrame backed by a memory mapped Arrow IPC / Feather file. The data_df columns are
+        Arrow backed (pd.ArrowDtype) views of the file rather than copies, so opening is near instant and data is
+        only read from disk as it is used. To be zero-copy, files must be written uncompressed and in a single
+        record batch (i.e. write_feather(df, path, compression='uncompressed', chunksize=len(df))); compressed
+        files are decompressed into memory and chunked columns are combined the first time they are read.
+        Args:
+            path: the Arrow IPC / Feather file to open
+            dtypes: (dict[str, SmartDataTypes]) the SmartDataTypes of each column in the file
+            refresh_dt: (datetime) when the data was valid (default = now)
+        Returns:
+            (SmartDataFrame) the memory mapped SmartDataFrame
+        """
+        arrow_table = pyarrow.feather.read_table(str(path), memory_map=True)
+        data_df = arrow_table.to_pandas(types_mapper=pd.ArrowDtype)
+        return cls(
+            dtypes=dtypes,
+            data_df=data_df,
+            refresh_dt=refresh_dt or datetime.datetime.now(),
+        )
+
+    def validate_rows(self, new_rows_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Checks that new rows can be appended to data_df: the columns must match the dtypes keys, the index
+        labels must be new and every non-null value must suit its column's SmartDataTypes.
+        Args:
+            new_rows_df: (DataFrame) the rows to be appended
+        Returns:
+            (DataFrame) the new rows with their columns in the same order as data_df
+        """
+        if set(new_rows_df.columns) != set(self.dtypes.keys()) or new_rows_df.shape[1] != len(self.dtypes):
+            raise ValueError('The new rows\' columns and dtype key columns must match exactly.')
+        if not new_rows_df.index.is_unique:
+            raise ValueError('The new rows must have a unique index.')
+        if self.data_df.index.is_unique and (self.data_df.index.get_indexer(new_rows_df.index) >= 0).any():
+            raise ValueError('The new rows\' index labels must not already be in the dataframe.')
+
+        for column, dtype in self.dtypes.items():
+            values = new_rows_df[column].dropna()
+            if values.empty:
+                continue
+            if dtype in (smrt_consts.SmartDataTypes.INT, smrt_consts.SmartDataTypes.FLOAT,
+                         smrt_consts.SmartDataTypes.ACCT):
+                valid = pd.api.types.is_numeric_dtype(values) or values.map(
+                    lambda val: isinstance(val, (int, float, np.number)) and not isinstance(val, bool)
+                ).all()
+            elif dtype in (smrt_consts.SmartDataTypes.DATE, smrt_consts.SmartDataTypes.DATE_TIME):
+                valid = pd.api.types.is_datetime64_any_dtype(values) or values.map(
+                    lambda val: isinstance(val, (datetime.date, np.datetime64))
+                ).all()
+            elif dtype == smrt_consts.SmartDataTypes.BOOL:
+                valid = pd.api.types.is_bool_dtype(values) or values.map(
+                    lambda val: isinstance(val, (bool, np.bool_))
+                ).all()
+            else:
+                valid = True
+            if not valid:
+                raise ValueError(f'Column \'{column}\' has values that are not valid for its {dtype.name} data type.')
+
+        return new_rows_df[list(self.data_df.columns)]
@@ -0,0 +1,294 @@
+import numpy as np
+import pandas as pd
+
+import logging
+import typing
+
+from smart_qtable import smrt_consts
+
+
+logger = logging.getLogger("smart_qtable.dates")
+
+DATE_TYPES = (smrt_consts.SmartDataTypes.DATE, smrt_consts.SmartDataTypes.DATE_TIME)
+
+# DATE columns are held as day numbers, DATE_TIME columns as pandas' native nanosecond timestamps
+DATE_UNITS: dict[smrt_consts.SmartDataTypes, np.dtype] = {
+    smrt_consts.SmartDataTypes.DATE: np.dtype("datetime64[D]"),
+    smrt_consts.SmartDataTypes.DATE_TIME: np.dtype("datetime64[ns]"),
+}
+
+DATE_FORMATS: dict[smrt_consts.SmartDataTypes, str] = {
+    smrt_consts.SmartDataTypes.DATE: "%Y-%m-%d",
+    smrt_consts.SmartDataTypes.DATE_TIME: "%Y-%m-%d %H:%M:%S",
+}
+
+# how a single datetime64 value is read back: DATE values as datetime.date, DATE_TIME values as Timestamps
+DATE_BOXES: dict[smrt_consts.SmartDataTypes, typing.Callable] = {
+    smrt_consts.SmartDataTypes.DATE: np.datetime64.item,
+    smrt_consts.SmartDataTypes.DATE_TIME: pd.Timestamp,
+}
+
+DATE_STATE_TXT: dict[smrt_consts.SmartDateState, str] = {
+    smrt_consts.SmartDateState.BLANK: "",
+    smrt_consts.SmartDateState.UNKNOWN: "UNKNOWN",
+    smrt_consts.SmartDateState.INVALID: "INVALID",
+}
+
+UNKNOWN_DATES = np.array(
+    [smrt_consts.UNKNOWN_DATE, smrt_consts.SORT_ASC_UNKNOWN_DATE], dtype="datetime64[D]"
+)
+INVALID_DATE = np.datetime64(smrt_consts.INVALID_DATE, "D")
+
+_DATE_LIKE_TYPES = ("date", "datetime", "datetime64", "empty")
+
+
+def _to_days(values: np.ndarray) -> np.ndarray:
+    # numpy's own datetime64 cast overflows (without raising) for timestamps close to the nanosecond limits,
+    # so finer units are floored into days with integer arithmetic
+    unit, count = np.datetime_data(values.dtype)
+    if unit in ("Y", "M", "W", "D"):
+        return values.astype(DATE_UNITS[smrt_consts.SmartDataTypes.DATE])
+    per_day = int(np.timedelta64(1, "D") / np.timedelta64(count, unit))
+    days = (values.view(np.int64) // per_day).astype(DATE_UNITS[smrt_consts.SmartDataTypes.DATE])
+    days[np.isnat(values)] = np.datetime64("NaT")
+    return days
+
+
+def to_datetime64(
+    column: pd.Series, dtype: smrt_consts.SmartDataTypes
+) -> typing.Optional[np.ndarray]:
+    """
+    Converts the values of a DATE or DATE_TIME column into a datetime64 array (days for DATE, nanoseconds
+    for DATE_TIME). Nulls become NaT.
+    Args:
+        column: (Series) the column data
+        dtype: (SmartDataTypes) DATE or DATE_TIME
+    Returns:
+        (ndarray) the converted values, or None when the column holds anything other than naive dates/times
+        or a value that does not fit the target unit
+    """
+    target = DATE_UNITS[dtype]
+    if isinstance(column.dtype, np.dtype) and column.dtype.kind == "M":
+        if column.dtype == target:
+            return column.to_numpy(copy=True)
+        if dtype == smrt_consts.SmartDataTypes.DATE:
+            return _to_days(column.to_numpy())
+    elif pd.api.types.infer_dtype(column, skipna=True) not in _DATE_LIKE_TYPES:
+        return None
+
+    try:
+        # pandas (unlike numpy) raises when a value does not fit into a nanosecond timestamp
+        converted = pd.to_datetime(column, errors="raise")
+        if not isinstance(converted.dtype, np.dtype):
+            # time zone aware
+            return None
+        if dtype == smrt_consts.SmartDataTypes.DATE_TIME:
+            return converted.astype(target).to_numpy(copy=True)
+        return _to_days(converted.to_numpy())
+    except (TypeError, ValueError, OverflowError):
+        if dtype == smrt_consts.SmartDataTypes.DATE_TIME:
+            return None
+    # dates before 1677 or after 2262 still fit into days, numpy converts them (slowly) one at a time
+    values = column.to_numpy(dtype=object, copy=True)
+    values[column.isnull().to_numpy()] = None
+    try:
+        return np.array(values, dtype=target)
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+def date_parts(values: np.ndarray, with_time: bool = False) -> list[np.ndarray]:
+    """
+    Splits (not NaT) datetime64 values into their calendar parts in one pass.
+    Args:
+        values: (ndarray) the datetime64 values
+        with_time: (bool) whether to split out the time of day as well
+    Returns:
+        (list[ndarray]) int64 arrays of the years, months and days (then the hours, minutes and seconds with_time)
+    """
+    days = _to_days(values)
+    months = days.astype("datetime64[M]")
+    parts = [
+        months.astype("datetime64[Y]").astype(np.int64) + 1970,
+        months.astype(np.int64) % 12 + 1,
+        (days - months).astype(np.int64) + 1,
+    ]
+    if with_time:
+        seconds = (values - days) // np.timedelta64(1, "s")
+        parts += [seconds // 3600, seconds // 60 % 60, seconds % 60]
+    return parts
+
+
+def date_states(
+    values: np.ndarray,
+    null_mask: np.ndarray,
+    dtype: smrt_consts.SmartDataTypes,
+    value_attrs: smrt_consts.SmartValueAttributes = None,
+    display: bool = False,
+) -> np.ndarray:
+    """
+    Works out the SmartDateState of every value of a datetime64 column at once.
+    Args:
+        values: (ndarray) the datetime64 values
+        null_mask: (ndarray) True where the value is null
+        dtype: (SmartDataTypes) DATE or DATE_TIME. The min/max value attributes only apply to DATE columns.
+        value_attrs: (SmartValueAttributes) optional value attributes for the column
+        display: (bool) the states the table shows rather than the ones the filter tree groups the values by.
+            The table only shows the UNKNOWN/INVALID sentinels as such in DATE_TIME columns, and REQUIRED nulls
+            as UNKNOWN in DATE columns.
+    Returns:
+        (ndarray) an int8 array of SmartDateState values
+    """
+    val_flags = smrt_consts.SmartValueFlags.NO_FLAG if value_attrs is None else value_attrs.flags
+    states = np.zeros(values.shape[0], dtype=np.int8)
+    # later assignments take priority over earlier ones
+    if dtype == smrt_consts.SmartDataTypes.DATE:
+        if val_flags & smrt_consts.SmartValueFlags.MAX_EXPECTED_VALUE:
+            states[values > np.datetime64(value_attrs.max_value)] = smrt_consts.SmartDateState.BLANK
+        if val_flags & smrt_consts.SmartValueFlags.MAX_VALID_VALUE:
+            states[values > np.datetime64(value_attrs.max_value)] = smrt_consts.SmartDateState.INVALID
+        if val_flags & smrt_consts.SmartValueFlags.MIN_VALID_VALUE:
+            states[values < np.datetime64(value_attrs.min_value)] = smrt_consts.SmartDateState.INVALID
+    if not display or dtype == smrt_consts.SmartDataTypes.DATE_TIME:
+        states[values == INVALID_DATE] = smrt_consts.SmartDateState.INVALID
+        states[np.isin(values, UNKNOWN_DATES)] = smrt_consts.SmartDateState.UNKNOWN
+    if val_flags & smrt_consts.SmartValueFlags.REQUIRED and not (
+        display and dtype == smrt_consts.SmartDataTypes.DATE_TIME
+    ):
+        states[null_mask] = smrt_consts.SmartDateState.UNKNOWN
+    else:
+        states[null_mask] = smrt_consts.SmartDateState.BLANK
+    return states
+
+
+def date_state(
+    value: typing.Any,
+    dtype: smrt_consts.SmartDataTypes,
+    value_attrs: smrt_consts.SmartValueAttributes = None,
+    display: bool = False,
+) -> smrt_consts.SmartDateState:
+    # the one value at a time version of date_states (display as there), for values that could not be converted
+    # to datetime64
+    val_flags = smrt_consts.SmartValueFlags.NO_FLAG if value_attrs is None else value_attrs.flags
+    if pd.isnull(value):
+        if val_flags & smrt_consts.SmartValueFlags.REQUIRED and not (
+            display and dtype == smrt_consts.SmartDataTypes.DATE_TIME
+        ):
+            return smrt_consts.SmartDateState.UNKNOWN
+        return smrt_consts.SmartDateState.BLANK
+    if not display or dtype == smrt_consts.SmartDataTypes.DATE_TIME:
+        if value in (
+            smrt_consts.UNKNOWN_DATE,
+            smrt_consts.UNKNOWN_DATETIME,
+            smrt_consts.SORT_ASC_UNKNOWN_DATE,
+            smrt_consts.SORT_ASC_UNKNOWN_DATETIME,
+        ):
+            return smrt_consts.SmartDateState.UNKNOWN
+        if value in (smrt_consts.INVALID_DATE, smrt_consts.INVALID_DATETIME):
+            return smrt_consts.SmartDateState.INVALID
+    if dtype == smrt_consts.SmartDataTypes.DATE:
+        try:
+            if val_flags & smrt_consts.SmartValueFlags.MIN_VALID_VALUE and value < value_attrs.min_value:
+                return smrt_consts.SmartDateState.INVALID
+            if val_flags & smrt_consts.SmartValueFlags.MAX_VALID_VALUE and value > value_attrs.max_value:
+                return smrt_consts.SmartDateState.INVALID
+            if val_flags & smrt_consts.SmartValueFlags.MAX_EXPECTED_VALUE and value > value_attrs.max_value:
+                return smrt_consts.SmartDateState.BLANK
+        except TypeError:
+            pass
+    return smrt_consts.SmartDateState.VALID
+
+
+def series_date_states(
+    column: pd.Series,
+    dtype: smrt_consts.SmartDataTypes,
+    value_attrs: smrt_consts.SmartValueAttributes = None,
+) -> np.ndarray:
+    """
+    Works out the SmartDateState of every value of a column, whatever the column holds. Columns that convert
+    to datetime64 are done in one vectorized pass.
+    Args:
+        column: (Series) the column data
+        dtype: (SmartDataTypes) DATE or DATE_TIME
+        value_attrs: (SmartValueAttributes) optional value attributes for the column
+    Returns:
+        (ndarray) an int8 array of SmartDateState values
+    """
+    values = to_datetime64(column, dtype)
+    if values is None:
+        return np.array([date_state(value, dtype, value_attrs) for value in column], dtype=np.int8)
+    return date_states(values, np.isnat(values), dtype, value_attrs)
+
+
+def format_date(
+    value: np.datetime64,
+    state: int,
+    dtype: smrt_consts.SmartDataTypes,
+    box: typing.Callable = None,
+) -> str:
+    # (values that are already dates or datetimes need no box)
+    if state != smrt_consts.SmartDateState.VALID:
+        return DATE_STATE_TXT[state]
+    try:
+        return (value if box is None else box(value)).strftime(DATE_FORMATS[dtype])
+    except (ValueError, AttributeError):
+        logger.warning(f"An error occurred when interpreting '{value}' as a date.")
+        return "UNKNOWN"
+
+
+def format_dates(
+    values: np.ndarray,
+    states: np.ndarray,
+    dtype: smrt_consts.SmartDataTypes,
+    box: typing.Callable,
+) -> np.ndarray:
+    """
+    Formats an entire datetime64 column into display strings. The result matches format_date element for
+    element.
+    Args:
+        values: (ndarray) the datetime64 values
+        states: (ndarray) the SmartDateState of each value
+        dtype: (SmartDataTypes) DATE or DATE_TIME
+        box: (Callable) converts a datetime64 value to an object with a strftime method
+    Returns:
+        (ndarray) an object array of display strings, one per row
+    """
+    display = np.full(values.shape[0], "", dtype=object)
+    for state, state_txt in DATE_STATE_TXT.items():
+        display[states == state] = state_txt
+    valid = states == smrt_consts.SmartDateState.VALID
+    # numpy writes ISO 8601 strings for 4 digit years, which strftime does not zero pad
+    years = values.astype("datetime64[Y]").astype(np.int64) + 1970
+    iso = valid & (years >= 1000) & (years <= 9999)
+    if dtype == smrt_consts.SmartDataTypes.DATE:
+        display[iso] = np.datetime_as_string(values[iso], unit="D").astype(object)
+    else:
+        display[iso] = np.char.replace(np.datetime_as_string(values[iso], unit="s"), "T", " ").astype(object)
+    for pos in np.flatnonzero(valid & ~iso):
+        display[pos] = format_date(values[pos], states[pos], dtype, box)
+    return display
+
+
+def format_date_series(
+    column: pd.Series,
+    dtype: smrt_consts.SmartDataTypes,
+    value_attrs: smrt_consts.SmartValueAttributes = None,
+) -> np.ndarray:
+    """
+    Formats a DATE or DATE_TIME column into display strings, whatever the column holds. Columns that convert to
+    datetime64 are done with format_dates, anything else one value at a time with format_date.
+    Args:
+        column: (Series) the column data
+        dtype: (SmartDataTypes) DATE or DATE_TIME
+        value_attrs: (SmartValueAttributes) optional value attributes for the column
+    Returns:
+        (ndarray) an object array of display strings, one per row
+    """
+    values = to_datetime64(column, dtype)
+    if values is None:
+        return np.array(
+            [format_date(value, date_state(value, dtype, value_attrs, display=True), dtype) for value in column],
+            dtype=object,
+        )
+    states = date_states(values, np.isnat(values), dtype, value_attrs, display=True)
+    return format_dates(values, states, dtype, DATE_BOXES[dtype])
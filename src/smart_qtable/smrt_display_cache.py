@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+import typing
+
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_dates
+
+
+def format_column(
+    column: pd.Series,
+    dtype: smrt_consts.SmartDataTypes,
+    value_attrs: smrt_consts.SmartValueAttributes = None,
+) -> np.ndarray:
+    """
+    Formats an entire column into display strings in a single pass. The result matches the built in
+    renderers' display_value element for element.
+    Args:
+        column: (Series) the column data
+        dtype: (SmartDataTypes) the data type of the column
+        value_attrs: (SmartValueAttributes) optional value attributes for the column
+    Returns:
+        (ndarray) an object array of display strings, one per row
+    """
+    if dtype in smrt_dates.DATE_TYPES:
+        # (dates are formatted in one place, the same way as a datetime64 column of the column store)
+        return smrt_dates.format_date_series(column, dtype, value_attrs)
+    valid = column.notnull().to_numpy()
+    display = np.full(column.shape[0], "", dtype=object)
+    if not valid.any():
+        return display
+
+    if dtype == smrt_consts.SmartDataTypes.TEXT:
+        display[valid] = column[valid].astype(str).to_numpy()
+    elif dtype == smrt_consts.SmartDataTypes.FLOAT:
+        display[valid] = column[valid].map("{:.2f}".format).to_numpy()
+    elif dtype == smrt_consts.SmartDataTypes.ACCT:
+        display[valid] = column[valid].map("$ {:,.2f}".format).to_numpy()
+    elif dtype == smrt_consts.SmartDataTypes.INT:
+        valid &= (column != smrt_consts.SMRT_TBL_BLANK_INT_FLAG).to_numpy(dtype=bool, na_value=False)
+        display[valid] = column[valid].map("{:,}".format).to_numpy()
+    elif dtype == smrt_consts.SmartDataTypes.BOOL:
+        truthy = column[valid].astype(bool).to_numpy()
+        display[valid] = np.where(truthy, "TRUE", "FALSE")
+    else:
+        display[valid] = column[valid].astype(str).to_numpy()
+
+    return display
+
+
+class SmartDisplayCache:
+    """
+    A per-column cache of formatted display strings for a SmartDataModel.
+
+    Columns are formatted by their renderer (see SmartCellRenderer.cached_display_role) the first time any of their
+    cells is painted and then served as a plain array lookup. Individual cells can be invalidated after an edit,
+    which causes the renderer to format just that cell again the next time it is requested.
+    """
+
+    def __init__(self):
+        self._columns: dict[int, np.ndarray] = {}
+
+    def reset(self) -> None:
+        self._columns.clear()
+
+    def column(self, col: int) -> typing.Optional[np.ndarray]:
+        # the cached strings of a column (None for the invalidated cells), None if the column is not cached
+        return self._columns.get(col, None)
+
+    def set_column(self, col: int, col_cache: np.ndarray) -> np.ndarray:
+        self._columns[col] = col_cache
+        return col_cache
+
+    def invalidate_cell(self, row: int, col: int) -> None:
+        col_cache = self._columns.get(col, None)
+        if col_cache is not None:
+            col_cache[row] = None
+
+    def invalidate_cells(self, rows: np.ndarray, col: int) -> None:
+        col_cache = self._columns.get(col, None)
+        if col_cache is not None:
+            col_cache[rows] = None
+
+    def invalidate_column(self, col: int) -> None:
+        self._columns.pop(col, None)
+
+    def remove_row(self, row: int) -> None:
+        for col, col_cache in self._columns.items():
+            self._columns[col] = np.delete(col_cache, row)
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        for col, col_cache in self._columns.items():
+            self._columns[col] = np.delete(col_cache, rows)
+
+    def append_rows(self, count: int) -> None:
+        # new rows are formatted on demand, exactly like an invalidated cell
+        for col, col_cache in self._columns.items():
+            self._columns[col] = np.concatenate([col_cache, np.full(count, None, dtype=object)])
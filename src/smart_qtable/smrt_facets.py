@@ -0,0 +1,75 @@
+import numpy as np
+
+import typing
+
+
+class SmartFacetMasks:
+    """
+    Leave-one-out ANDs of a set of named boolean masks (the proxy's per column filter masks): for any one of the
+    masks, the AND of all of the others. This is what a column's filter popup offers values from, the rows passing
+    every filter but the column's own.
+
+    The masks are kept in a fixed order with their running prefix and suffix ANDs, so each leave-one-out mask is a
+    single AND of a prefix and a suffix rather than an AND of every other mask. The products are built the first time
+    they are needed for a set of masks; rows changed in place are brought up to date with update_rows.
+    """
+
+    def __init__(self):
+        self.names: list[str] = []
+        # the masks the products were built from (held on to, so a mask replaced by a new array is noticed)
+        self.masks: list[np.ndarray] = []
+        # prefix[i] is the AND of masks[:i], suffix[i] the AND of masks[i:] (None for no masks, i.e. every row)
+        self.prefix: list[typing.Optional[np.ndarray]] = [None]
+        self.suffix: list[typing.Optional[np.ndarray]] = [None]
+
+    def is_valid_for(self, masks: dict[str, np.ndarray]) -> bool:
+        return list(masks) == self.names and all(
+            mask is built_mask for mask, built_mask in zip(masks.values(), self.masks)
+        )
+
+    def build(self, masks: dict[str, np.ndarray]) -> None:
+        self.names = list(masks)
+        self.masks = list(masks.values())
+        count = len(self.masks)
+        self.prefix = [None] * (count + 1)
+        self.suffix = [None] * (count + 1)
+        for pos, mask in enumerate(self.masks):
+            self.prefix[pos + 1] = mask.copy() if self.prefix[pos] is None else self.prefix[pos] & mask
+        for pos in reversed(range(count)):
+            mask = self.masks[pos]
+            self.suffix[pos] = mask.copy() if self.suffix[pos + 1] is None else self.suffix[pos + 1] & mask
+
+    def update_rows(self, first_row: int, end_row: int) -> None:
+        """
+        Works out the products again for the rows first_row to end_row (exclusive), after the masks were changed
+        in place for just those rows.
+        """
+        rows = slice(first_row, end_row)
+        count = len(self.masks)
+        if not count:
+            return
+        self.prefix[1][rows] = self.masks[0][rows]
+        for pos in range(1, count):
+            self.prefix[pos + 1][rows] = self.prefix[pos][rows] & self.masks[pos][rows]
+        self.suffix[count - 1][rows] = self.masks[count - 1][rows]
+        for pos in reversed(range(count - 1)):
+            self.suffix[pos][rows] = self.suffix[pos + 1][rows] & self.masks[pos][rows]
+
+    def leave_one_out(self, name: str) -> typing.Optional[np.ndarray]:
+        """
+        Returns the AND of every mask except name's (all of them when name has no mask), None when that leaves no
+        masks at all. The array is owned by the facets, copy it before changing it.
+        """
+        if name not in self.names:
+            return self.prefix[-1]
+        pos = self.names.index(name)
+        before, after = self.prefix[pos], self.suffix[pos + 1]
+        if before is None:
+            return after
+        if after is None:
+            return before
+        return before & after
+
+    def all_masks(self) -> typing.Optional[np.ndarray]:
+        # the AND of every mask, None when there are none
+        return self.prefix[-1]
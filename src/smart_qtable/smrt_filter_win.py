@@ -1,13 +1,17 @@
 import typing
 
 from PyQt6 import QtCore, QtGui, QtWidgets
+import numpy as np
 import pandas as pd
 
 import re
 import datetime
 import locale
+import math
 
 from smart_qtable import smrt_consts
+from smart_qtable import smrt_dates
+from smart_qtable import smrt_range_filter
 
 
 class SmartFilterDialog(QtWidgets.QDialog):
@@ -21,8 +25,25 @@ class SmartFilterDialog(QtWidgets.QDialog):
         self.mode = smrt_consts.SmartFilterMode.TEXT
         self.column_name = "NAME"
         self.column_data: pd.Series = None
+        # the (upper case) text the filter string is matched against for each value of column_data, and the
+        # positions of the values that matched it last
+        self.match_text: pd.Series = None
+        self.match_positions: np.ndarray = None
+        # how many of the rows passing the other columns' filters hold each value of column_data (None if unknown)
+        self.value_counts: typing.Optional[np.ndarray] = None
+        # pattern -> compiled regex (None for patterns that do not compile)
+        self.regex_cache: dict[str, typing.Optional[re.Pattern]] = {}
+        # the values are matched on a worker thread once the user stops typing, only the latest search is shown
+        self.search_timer = QtCore.QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(smrt_consts.FILTER_SEARCH_DELAY_MS)
+        self.search_pool = QtCore.QThreadPool(self)
+        self.search_pool.setMaxThreadCount(1)
+        self.search_worker: typing.Optional[SmartMatchWorker] = None
+        self.search_generation: int = 0
         self.tree_widget_item_changed_enabled = False
         self.current_filter = None
+        self.current_range_filter: typing.Optional[smrt_range_filter.SmartRangeFilter] = None
         self.new_filter = None
         self.float_dict = {}
         self.action_requested = smrt_consts.SmartFilterAction.NO_ACTION
@@ -40,6 +61,11 @@ class SmartFilterDialog(QtWidgets.QDialog):
         self.btnbox.rejected.connect(self.on_cancel_clicked)
         self.cbo_filter_select.currentIndexChanged.connect(self.on_cboFilter_change)
         self.line_edit_filter_string.textChanged.connect(self.on_filter_string_update)
+        self.search_timer.timeout.connect(self.start_search)
+        self.chk_sort_by_count.toggled.connect(self.on_sort_by_count_toggled)
+        self.line_edit_range_min.textChanged.connect(self.on_range_text_update)
+        self.line_edit_range_max.textChanged.connect(self.on_range_text_update)
+        self.histogram.signal_range_selected.connect(self.on_histogram_range_selected)
         self.btn_hide_col.clicked.connect(self.on_hide_col_clicked)
         self.btn_sort_az.clicked.connect(self.on_sort_az_clicked)
         self.btn_sort_za.clicked.connect(self.on_sort_za_clicked)
@@ -287,6 +313,48 @@ class SmartFilterDialog(QtWidgets.QDialog):
         self.line_edit_filter_string.setObjectName("line_edit_filter_string")
         self.dialog_layout.addWidget(self.line_edit_filter_string)
 
+        # busy indicator, shown while a search runs
+        self.progress_search = QtWidgets.QProgressBar(self)
+        self.progress_search.setRange(0, 0)
+        self.progress_search.setTextVisible(False)
+        self.progress_search.setFixedHeight(4)
+        self.progress_search.setObjectName("progress_search")
+        self.progress_search.setVisible(False)
+        self.dialog_layout.addWidget(self.progress_search)
+
+        # lists the values by how often they occur (only offered when the counts are known)
+        self.chk_sort_by_count = QtWidgets.QCheckBox("Most frequent first", self)
+        self.chk_sort_by_count.setFont(font)
+        self.chk_sort_by_count.setObjectName("chk_sort_by_count")
+        self.chk_sort_by_count.setVisible(False)
+        self.dialog_layout.addWidget(self.chk_sort_by_count)
+
+        # range filter (NUMBER and ACCT columns), with a histogram of the values for FLOAT and ACCT columns
+        self.frm_range = QtWidgets.QFrame(self)
+        self.frm_range.setObjectName("frm_range")
+        self.layout_frm_range = QtWidgets.QVBoxLayout(self.frm_range)
+        self.layout_frm_range.setContentsMargins(1, 1, 1, 1)
+        self.layout_frm_range.setSpacing(2)
+        self.histogram = SmartHistogramWidget(parent=self.frm_range)
+        self.layout_frm_range.addWidget(self.histogram)
+        self.layout_frm_range_edits = QtWidgets.QHBoxLayout()
+        self.layout_frm_range_edits.setSpacing(2)
+        self.line_edit_range_min = QtWidgets.QLineEdit(self.frm_range)
+        self.line_edit_range_min.setFont(font)
+        self.line_edit_range_min.setPlaceholderText("\u2265 Min")
+        self.line_edit_range_min.setClearButtonEnabled(True)
+        self.line_edit_range_min.setObjectName("line_edit_range_min")
+        self.layout_frm_range_edits.addWidget(self.line_edit_range_min)
+        self.line_edit_range_max = QtWidgets.QLineEdit(self.frm_range)
+        self.line_edit_range_max.setFont(font)
+        self.line_edit_range_max.setPlaceholderText("\u2264 Max")
+        self.line_edit_range_max.setClearButtonEnabled(True)
+        self.line_edit_range_max.setObjectName("line_edit_range_max")
+        self.layout_frm_range_edits.addWidget(self.line_edit_range_max)
+        self.layout_frm_range.addLayout(self.layout_frm_range_edits)
+        self.frm_range.setVisible(False)
+        self.dialog_layout.addWidget(self.frm_range)
+
         # add the tree view
         self.tree_view = QtWidgets.QTreeView(self)
         self.tree_view.setFont(font)
@@ -296,6 +364,13 @@ class SmartFilterDialog(QtWidgets.QDialog):
         self.tree_view.setHeaderHidden(True)
         self.dialog_layout.addWidget(self.tree_view)
 
+        # shown when the table is lazy and the values only come from the rows loaded so far
+        self.lbl_partial_data = QtWidgets.QLabel(f"{smrt_consts.PARTIAL_DATA_TXT} - more rows may exist", self)
+        self.lbl_partial_data.setFont(font)
+        self.lbl_partial_data.setObjectName("lbl_partial_data")
+        self.lbl_partial_data.setVisible(False)
+        self.dialog_layout.addWidget(self.lbl_partial_data)
+
         self.frm_info_clipping = QtWidgets.QFrame(self)
         self.frm_info_clipping.setFixedHeight(31)
         self.frm_info_clipping.setSizePolicy(
@@ -379,8 +454,48 @@ class SmartFilterDialog(QtWidgets.QDialog):
                     QtWidgets.QDialogButtonBox.StandardButton.Ok
                 ).setEnabled(False)
 
+    def get_range_filter(self) -> typing.Optional[smrt_range_filter.SmartRangeFilter]:
+        """
+        Returns the range typed into the min/max boxes, None if neither holds a number.
+        """
+        if self.frm_range.isHidden():
+            return None
+        bounds = []
+        for line_edit in (self.line_edit_range_min, self.line_edit_range_max):
+            try:
+                bounds.append(locale.atof(line_edit.text().strip()))
+            except ValueError:
+                bounds.append(None)
+        low, high = bounds
+        if low is None and high is None:
+            return None
+        if low is not None and high is not None and low > high:
+            low, high = high, low
+        return smrt_range_filter.SmartRangeFilter(low=low, high=high)
+
     @QtCore.pyqtSlot()
     def on_okay_clicked(self):
+        self.finish_search()
+        range_filter = self.get_range_filter()
+        if range_filter is not None:
+            if range_filter == self.current_range_filter:
+                self.action_requested = smrt_consts.SmartFilterAction.NO_ACTION
+                self.reject()
+            else:
+                self.new_filter = range_filter
+                self.action_requested = smrt_consts.SmartFilterAction.NEW_FILTER
+                self.accept()
+            return
+        if (
+            self.current_range_filter is not None
+            and self.model.is_select_all_checked()
+            and not self.line_edit_filter_string.text()
+        ):
+            # the range was cleared
+            self.action_requested = smrt_consts.SmartFilterAction.CLR_FILTER
+            self.reject()
+            return
+
         self.get_new_filter_vals()
 
         if self.model.is_select_all_checked():
@@ -489,6 +604,11 @@ class SmartFilterDialog(QtWidgets.QDialog):
         self.line_edit_filter_string.clear()
         self.float_dict.clear()
         self.column_name = column_name
+        # a range filter is shown in the min/max boxes, the tree then starts with every value ticked
+        self.current_range_filter = None
+        if isinstance(current_filter, smrt_range_filter.SmartRangeFilter):
+            self.current_range_filter = current_filter
+            current_filter = None
         self.current_filter = current_filter
         self.current_sort = current_sort_order
         self.new_filter = current_filter
@@ -499,6 +619,7 @@ class SmartFilterDialog(QtWidgets.QDialog):
         self.model.flag_user_modded_chk = False
         self.model.flag_init_complete = False
         self.value_attrs = kwargs.get("value_attrs", smrt_consts.SmartValueAttributes())
+        self.lbl_partial_data.setVisible(kwargs.get("partial_data", False))
 
         if (
             self.dtype == smrt_consts.SmartDataTypes.FLOAT
@@ -513,15 +634,29 @@ class SmartFilterDialog(QtWidgets.QDialog):
             self.set_window_mode(smrt_consts.SmartFilterMode.DATE_TIME)
         else:
             self.set_window_mode(smrt_consts.SmartFilterMode.TEXT)
+        self.update_range_frame(column_data)
 
-        if (
+        unique_values = kwargs.get("unique_values", None)
+        if unique_values is not None:
+            # (already sorted, dates newest first)
+            self.column_data = pd.Series(unique_values)
+        elif (
             self.mode == smrt_consts.SmartFilterMode.DATE
             or self.mode == smrt_consts.SmartFilterMode.DATE_TIME
         ):
-            self.column_data = column_data.sort_values(ascending=False).unique()
+            self.column_data = pd.Series(column_data.sort_values(ascending=False).unique())
         else:
-            self.column_data = column_data.sort_values(ascending=True).unique()
-        self.column_data = pd.Series(self.column_data)
+            self.column_data = pd.Series(column_data.sort_values(ascending=True).unique())
+        # (the counts line up with unique_values, so they are only used along with them)
+        self.value_counts = kwargs.get("value_counts", None) if unique_values is not None else None
+        self.chk_sort_by_count.setVisible(
+            self.value_counts is not None
+            and self.mode != smrt_consts.SmartFilterMode.DATE
+            and self.mode != smrt_consts.SmartFilterMode.DATE_TIME
+        )
+        self.match_text = self.build_match_text()
+        self.match_positions = None
+        self.regex_cache.clear()
         if current_sort_order is not None:
             if current_sort_order == QtCore.Qt.SortOrder.AscendingOrder:
                 self.btn_sort_az.setChecked(True)
@@ -533,7 +668,7 @@ class SmartFilterDialog(QtWidgets.QDialog):
             self.btn_sort_az.setChecked(False)
             self.btn_sort_za.setChecked(False)
 
-        if current_filter is not None:
+        if current_filter is not None or self.current_range_filter is not None:
             self.btn_clear_filter.setEnabled(True)
         else:
             self.btn_clear_filter.setEnabled(False)
@@ -542,89 +677,136 @@ class SmartFilterDialog(QtWidgets.QDialog):
         self.on_filter_string_update()
         # self.model.update_data(self.column_data, dtype, self.current_filter, time_resolution=self.time_resolution)
 
-        return self.exec()
+        result = self.exec()
+        self.cancel_search()
+        return result
+
+    def update_range_frame(self, column_data: pd.Series) -> None:
+        show_range = self.mode in (smrt_consts.SmartFilterMode.NUMBER, smrt_consts.SmartFilterMode.ACCT)
+        self.frm_range.setVisible(show_range)
+        if not show_range:
+            return
+        show_histogram = self.dtype in (smrt_consts.SmartDataTypes.FLOAT, smrt_consts.SmartDataTypes.ACCT)
+        self.histogram.setVisible(show_histogram)
+        if show_histogram:
+            values = pd.to_numeric(column_data, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            self.histogram.set_data(values[np.isfinite(values)])
+        range_filter = self.current_range_filter
+        for line_edit, bound, round_up in (
+            (self.line_edit_range_min, None if range_filter is None else range_filter.low, False),
+            (self.line_edit_range_max, None if range_filter is None else range_filter.high, True),
+        ):
+            line_edit.blockSignals(True)
+            line_edit.setText("" if bound is None else self.format_bound(bound, round_up))
+            line_edit.blockSignals(False)
+        self.on_range_text_update()
+        self.resize(198, 520 + self.frm_range.sizeHint().height())
+
+    def format_bound(self, value: float, round_up: bool) -> str:
+        # rounded outwards, so a bound taken from the histogram never cuts off the values at its edge
+        decimals = 2 if self.dtype == smrt_consts.SmartDataTypes.ACCT else 4
+        scale = 10 ** decimals
+        value = (math.ceil(value * scale) if round_up else math.floor(value * scale)) / scale
+        return f"{value:.{decimals}f}".rstrip("0").rstrip(".")
+
+    @QtCore.pyqtSlot()
+    def on_range_text_update(self):
+        range_filter = self.get_range_filter()
+        if range_filter is None:
+            self.histogram.set_selection(None, None)
+        else:
+            self.histogram.set_selection(range_filter.low, range_filter.high)
+
+    @QtCore.pyqtSlot(float, float)
+    def on_histogram_range_selected(self, low: float, high: float):
+        self.line_edit_range_min.setText(self.format_bound(low, False))
+        self.line_edit_range_max.setText(self.format_bound(high, True))
 
     @QtCore.pyqtSlot()
     def on_filter_string_update(self):
         self.flag_user_updated_txt = True
+        self.cancel_search()
+        if self.line_edit_filter_string.text() == "":
+            self.show_matches(None)
+        else:
+            # (restarted by every keystroke)
+            self.search_timer.start()
+
+    @QtCore.pyqtSlot()
+    def start_search(self):
+        self.cancel_search()
+        self.search_generation += 1
+        self.search_worker = SmartMatchWorker(
+            self.match_text, self.search_pattern(self.line_edit_filter_string.text()), self.search_generation
+        )
+        self.search_worker.signals.signal_finished.connect(self.on_search_finished)
+        self.progress_search.setVisible(True)
+        self.search_pool.start(self.search_worker)
+
+    def cancel_search(self) -> None:
+        self.search_timer.stop()
+        if self.search_worker is not None:
+            self.search_worker.cancel()
+            self.search_worker = None
+        self.progress_search.setVisible(False)
+
+    def finish_search(self) -> None:
+        # a search that is still waiting or running is done straight away, so the tree matches the search text
+        if not self.search_timer.isActive() and self.search_worker is None:
+            return
+        self.cancel_search()
+        self.show_matches(
+            np.flatnonzero(match_values(self.match_text, self.search_pattern(self.line_edit_filter_string.text())))
+        )
+
+    @QtCore.pyqtSlot(int, object)
+    def on_search_finished(self, generation: int, match_positions: np.ndarray):
+        # (the results of a search that was cancelled or replaced by a newer one are dropped)
+        if generation != self.search_generation or self.search_worker is None:
+            return
+        self.search_worker = None
+        self.progress_search.setVisible(False)
+        self.show_matches(match_positions)
+
+    @QtCore.pyqtSlot(bool)
+    def on_sort_by_count_toggled(self, checked: bool):
+        # fills the tree again with the same values in the new order
+        match_positions = self.match_positions
+        self.match_positions = None
+        self.show_matches(match_positions)
+
+    def show_matches(self, match_positions: typing.Optional[np.ndarray]) -> None:
+        """
+        Fills the tree with the values of column_data at match_positions, or with every value for None.
+        """
         if self.column_data.size > smrt_consts.FILTER_MAX_ROW_LIMIT:
             self.frm_info_clipping.setVisible(True)
         else:
             self.frm_info_clipping.setVisible(False)
 
-        if self.line_edit_filter_string.text() == "":
+        if match_positions is None:
+            self.match_positions = None
             self.model.update_data(
                 self.column_data,
                 self.dtype,
                 self.current_filter,
                 time_resolution=self.time_resolution,
                 value_attrs=self.value_attrs,
+                counts=self.value_counts,
+                sort_by_count=self.chk_sort_by_count.isChecked(),
             )
-        else:
-            val_flags = self.value_attrs.flags
-            new_tree_data = []
-            for match_item in self.column_data:
-                txt_to_match = ""
-                if pd.isnull(match_item):
-                    if (
-                        val_flags & smrt_consts.SmartValueFlags.REQUIRED
-                    ):
-                        txt_to_match = smrt_consts.UNKNOWN_TXT.upper()
-                    else:
-                        txt_to_match = smrt_consts.BLANKS_TXT.upper()
-                elif self.dtype == smrt_consts.SmartDataTypes.INT and match_item == smrt_consts.SMRT_TBL_BLANK_INT_FLAG:
-                    txt_to_match = smrt_consts.BLANKS_TXT.upper()
-                elif (
-                    match_item == smrt_consts.UNKNOWN_DATE
-                    or match_item == smrt_consts.UNKNOWN_DATETIME
-                ):
-                    txt_to_match = smrt_consts.UNKNOWN_TXT.upper()
-                elif self.dtype == smrt_consts.SmartDataTypes.DATE or (
-                    self.dtype == smrt_consts.SmartDataTypes.DATE_TIME
-                    and not self.time_resolution
-                ):
-                    txt_to_match = match_item.strftime("%Y-%B-%d").upper()
-                    if val_flags & smrt_consts.SmartValueFlags.MIN_VALID_VALUE and match_item < self.value_attrs.min_value:
-                            txt_to_match = smrt_consts.INVALID_TXT.upper()
-                    if val_flags & smrt_consts.SmartValueFlags.MAX_EXPECTED_VALUE and match_item > self.value_attrs.max_value:
-                            txt_to_match = smrt_consts.BLANKS_TXT.upper()
-                    if val_flags & smrt_consts.SmartValueFlags.MAX_VALID_VALUE and match_item > self.value_attrs.max_value:
-                            txt_to_match = smrt_consts.INVALID_TXT.upper()
-
-                elif (
-                    self.dtype == smrt_consts.SmartDataTypes.DATE_TIME
-                    and self.time_resolution
-                ):
-                    txt_to_match = match_item.strftime("%Y-%B-%d %H:%M:%S").upper()
-                else:
-                    txt_to_match = str(match_item).upper()
-                if self.cbo_filter_select.currentText() == "Text Filter":
-                    if self.line_edit_filter_string.text().upper() in txt_to_match:
-                        new_tree_data.append(match_item)
-                elif self.cbo_filter_select.currentText() == "Regex Pattern":
-                    try:
-                        if (
-                            re.search(
-                                self.line_edit_filter_string.text(),
-                                txt_to_match,
-                                flags=3,
-                            )
-                            is not None
-                        ):
-                            new_tree_data.append(match_item)
-                    except re.error:
-                        pass
-            if new_tree_data:
-                new_series = pd.Series(new_tree_data)
-            else:
-                new_series = pd.Series(dtype="int64")
+        # (a search that matches the same values leaves the tree, and what the user ticked in it, alone)
+        elif self.match_positions is None or not np.array_equal(match_positions, self.match_positions):
+            self.match_positions = match_positions
             self.model.update_data(
-                new_series,
+                self.column_data.iloc[match_positions],
                 self.dtype,
                 self.current_filter,
                 time_resolution=self.time_resolution,
                 user_has_match_data=True,
                 value_attrs=self.value_attrs,
+                counts=None if self.value_counts is None else self.value_counts[match_positions],
+                sort_by_count=self.chk_sort_by_count.isChecked(),
             )
         if self.model.flag_max_exceeded:
             self.frm_info_clipping.setVisible(True)
@@ -636,11 +818,198 @@ class SmartFilterDialog(QtWidgets.QDialog):
         # else:
         #     self.btnbox.button(QtWidgets.QDialogButtonBox.StandardButton.Ok).setEnabled(True)
 
+    def build_match_text(self) -> pd.Series:
+        """
+        Works out the text each value of column_data is matched against (upper cased): the value as shown in the
+        tree, or the name of the node it is listed under for blanks, unknown and invalid values.
+        """
+        column_data = self.column_data
+        val_flags = self.value_attrs.flags
+        null_txt = (
+            smrt_consts.UNKNOWN_TXT
+            if val_flags & smrt_consts.SmartValueFlags.REQUIRED
+            else smrt_consts.BLANKS_TXT
+        )
+        if self.dtype in smrt_dates.DATE_TYPES:
+            if self.dtype == smrt_consts.SmartDataTypes.DATE_TIME and self.time_resolution:
+                date_format = "%Y-%B-%d %H:%M:%S"
+            else:
+                date_format = "%Y-%B-%d"
+            states = smrt_dates.series_date_states(column_data, self.dtype, self.value_attrs)
+            valid = states == smrt_consts.SmartDateState.VALID
+            match_text = pd.Series(null_txt, index=column_data.index, dtype=object)
+            match_text[states == smrt_consts.SmartDateState.UNKNOWN] = smrt_consts.UNKNOWN_TXT
+            match_text[states == smrt_consts.SmartDateState.INVALID] = smrt_consts.INVALID_TXT
+            # (a date over its expected maximum is shown with the blanks)
+            match_text[states == smrt_consts.SmartDateState.BLANK] = smrt_consts.BLANKS_TXT
+            values = smrt_dates.to_datetime64(column_data, self.dtype)
+            if values is not None:
+                match_text[valid] = pd.Series(values[valid]).dt.strftime(date_format).to_numpy()
+            else:
+                match_text[valid] = column_data[valid].map(lambda date: date.strftime(date_format)).to_numpy()
+            return match_text.str.upper()
+
+        match_text = column_data.astype(str)
+        null_mask = column_data.isnull().to_numpy()
+        match_text[null_mask] = null_txt
+        if self.dtype == smrt_consts.SmartDataTypes.INT:
+            match_text[(column_data == smrt_consts.SMRT_TBL_BLANK_INT_FLAG).to_numpy()] = smrt_consts.BLANKS_TXT
+        return match_text.str.upper()
+
+    def search_pattern(self, filter_string: str) -> typing.Union[str, re.Pattern, None]:
+        """
+        Returns what match_values looks for: the upper case text for a text filter, or the compiled regex (None if
+        the pattern does not compile).
+        """
+        if self.cbo_filter_select.currentText() != "Regex Pattern":
+            return filter_string.upper()
+        if filter_string not in self.regex_cache:
+            try:
+                self.regex_cache[filter_string] = re.compile(filter_string, flags=re.IGNORECASE)
+            except re.error:
+                self.regex_cache[filter_string] = None
+        return self.regex_cache[filter_string]
+
     @QtCore.pyqtSlot()
     def on_cboFilter_change(self):
         self.line_edit_filter_string.clear()
 
 
+def match_values(
+    match_text: pd.Series,
+    pattern: typing.Union[str, re.Pattern, None],
+    is_cancelled: typing.Callable[[], bool] = None,
+) -> typing.Optional[np.ndarray]:
+    """
+    Matches a search against the (upper case) text of each value of a column, FILTER_SEARCH_CHUNK_SIZE values at a
+    time.
+    Args:
+        match_text: (Series) the text of each value
+        pattern: (str | Pattern) the text to look for, or a compiled regex to search with. None matches nothing.
+        is_cancelled: (Callable) checked between chunks, the search stops when it returns True
+    Returns:
+        (ndarray) a boolean array saying which values match, None if the search was cancelled
+    """
+    matches = np.zeros(match_text.shape[0], dtype=bool)
+    if pattern is None:
+        return matches
+    is_regex = isinstance(pattern, re.Pattern)
+    for first in range(0, match_text.shape[0], smrt_consts.FILTER_SEARCH_CHUNK_SIZE):
+        if is_cancelled is not None and is_cancelled():
+            return None
+        end = first + smrt_consts.FILTER_SEARCH_CHUNK_SIZE
+        matches[first:end] = match_text.iloc[first:end].str.contains(pattern, regex=is_regex).to_numpy(dtype=bool)
+    return matches
+
+
+class SmartMatchSignals(QtCore.QObject):
+
+    signal_finished = QtCore.pyqtSignal(int, object)
+
+
+class SmartMatchWorker(QtCore.QRunnable):
+    """
+    Runs match_values on a thread pool, emitting the positions of the matching values with the search's generation
+    (so the dialog can tell an outdated result from the latest one). A cancelled search emits nothing.
+    """
+
+    def __init__(self, match_text: pd.Series, pattern: typing.Union[str, re.Pattern, None], generation: int):
+        super().__init__()
+        self.match_text = match_text
+        self.pattern = pattern
+        self.generation = generation
+        self.flag_cancelled: bool = False
+        self.signals = SmartMatchSignals()
+
+    def cancel(self) -> None:
+        self.flag_cancelled = True
+
+    def run(self) -> None:
+        matches = match_values(self.match_text, self.pattern, lambda: self.flag_cancelled)
+        if matches is not None and not self.flag_cancelled:
+            self.signals.signal_finished.emit(self.generation, np.flatnonzero(matches))
+
+
+class SmartHistogramWidget(QtWidgets.QWidget):
+    """
+    A bar chart of how a numeric column's values are spread out, with the bars inside the current range highlighted.
+    Dragging across the bars selects a range.
+    """
+
+    signal_range_selected = QtCore.pyqtSignal(float, float)
+
+    def __init__(self, **kwargs):
+        parent = kwargs.get('parent', None)
+        super().__init__(parent)
+        self.counts: np.ndarray = np.empty(0, dtype=np.int64)
+        self.edges: np.ndarray = np.empty(0, dtype=np.float64)
+        self.selection: tuple[typing.Optional[float], typing.Optional[float]] = (None, None)
+        self.drag_start_bin: typing.Optional[int] = None
+        self.setFixedHeight(60)
+        self.setMouseTracking(False)
+
+    def set_data(self, values: np.ndarray) -> None:
+        if not values.shape[0]:
+            self.counts = np.empty(0, dtype=np.int64)
+            self.edges = np.empty(0, dtype=np.float64)
+        else:
+            self.counts, self.edges = np.histogram(values, bins=smrt_consts.FILTER_HISTOGRAM_BINS)
+        self.update()
+
+    def set_selection(self, low: typing.Optional[float], high: typing.Optional[float]) -> None:
+        self.selection = (low, high)
+        self.update()
+
+    def bin_at(self, x: float) -> int:
+        bins = self.counts.shape[0]
+        return min(max(int(x * bins / max(self.width(), 1)), 0), bins - 1)
+
+    def is_bin_selected(self, bin_num: int) -> bool:
+        low, high = self.selection
+        if low is None and high is None:
+            return False
+        return (low is None or self.edges[bin_num + 1] >= low) and (high is None or self.edges[bin_num] <= high)
+
+    def paintEvent(self, event: QtGui.QPaintEvent) -> None:
+        painter = QtGui.QPainter(self)
+        palette = self.palette()
+        painter.fillRect(self.rect(), palette.color(QtGui.QPalette.ColorRole.Base))
+        bins = self.counts.shape[0]
+        if not bins or not self.counts.max():
+            return
+        bar_width = self.width() / bins
+        max_count = self.counts.max()
+        for bin_num, count in enumerate(self.counts):
+            if not count:
+                continue
+            bar_height = max(int(round(count / max_count * (self.height() - 2))), 1)
+            color = palette.color(
+                QtGui.QPalette.ColorRole.Highlight if self.is_bin_selected(bin_num) else QtGui.QPalette.ColorRole.Mid
+            )
+            painter.fillRect(
+                QtCore.QRectF(bin_num * bar_width + 1, self.height() - bar_height, max(bar_width - 1, 1), bar_height),
+                color,
+            )
+
+    def mousePressEvent(self, event: QtGui.QMouseEvent) -> None:
+        if not self.counts.shape[0]:
+            return
+        self.drag_start_bin = self.bin_at(event.position().x())
+        self.select_bins(self.drag_start_bin, self.drag_start_bin)
+
+    def mouseMoveEvent(self, event: QtGui.QMouseEvent) -> None:
+        if self.drag_start_bin is None:
+            return
+        self.select_bins(self.drag_start_bin, self.bin_at(event.position().x()))
+
+    def mouseReleaseEvent(self, event: QtGui.QMouseEvent) -> None:
+        self.drag_start_bin = None
+
+    def select_bins(self, first_bin: int, last_bin: int) -> None:
+        first_bin, last_bin = min(first_bin, last_bin), max(first_bin, last_bin)
+        self.signal_range_selected.emit(float(self.edges[first_bin]), float(self.edges[last_bin + 1]))
+
+
 class TreeItemNode:
 
     def __init__(self, name, parent=None, **kwargs):
@@ -649,9 +1018,13 @@ class TreeItemNode:
         self.children = []
         self.date_data: smrt_consts.DateTimeNodeData = kwargs.get("date_data", None)
         self.is_checkable = kwargs.get("is_checkable", True)
-        self.check_state: QtCore.Qt.CheckState = kwargs.get(
-            "check_state", QtCore.Qt.CheckState.Checked.value
+        # (the default is only looked up when needed, the enum lookup is slow next to the rest of a node)
+        check_state = kwargs.get("check_state", None)
+        self.check_state: QtCore.Qt.CheckState = (
+            QtCore.Qt.CheckState.Checked.value if check_state is None else check_state
         )
+        # the number of rows holding the node's value(s), None when the counts are not known
+        self.count: typing.Optional[int] = kwargs.get("count", None)
 
     def get_or_create_child(self, name, **kwargs):
         date_data = kwargs.get("date_data", None)
@@ -697,6 +1070,8 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
         super().__init__(parent)
 
         self.data_series: pd.Series = None
+        # the SmartDateState of each value of data_series (DATE and DATE_TIME columns only)
+        self.date_states: np.ndarray = None
         self.dtype: smrt_consts.SmartDataTypes = smrt_consts.SmartDataTypes.TEXT
         self.current_filter: list = None
         self.user_has_match_data: bool = False
@@ -730,37 +1105,20 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
         current_filter: list = None,
         **kwargs,
     ):
-
-        def update_parent_nodes(node):
-            if node == self.root:
-                return
-            all_checked = True
-            all_unchecked = True
-            for child in node.children:
-                all_checked = (
-                    all_checked
-                    and child.check_state == QtCore.Qt.CheckState.Checked.value
-                )
-                all_unchecked = (
-                    all_unchecked
-                    and child.check_state == QtCore.Qt.CheckState.Unchecked.value
-                )
-            if all_checked:
-                node.check_state = QtCore.Qt.CheckState.Checked.value
-            elif all_unchecked:
-                node.check_state = QtCore.Qt.CheckState.Unchecked.value
-            else:
-                node.check_state = QtCore.Qt.CheckState.PartiallyChecked
-            update_parent_nodes(node.parent)
-
         self.dtype = dtype
         self.time_resolution = kwargs.get("time_resolution", False)
         self.current_filter = current_filter
         self.user_has_match_data = kwargs.get("user_has_match_data", False)
+        # how many rows hold each value of data (in the same order), and whether to list the most frequent first
+        counts: typing.Optional[np.ndarray] = kwargs.get("counts", None)
+        sort_by_count: bool = kwargs.get("sort_by_count", False)
         self.value_attrs = kwargs.get("value_attrs", smrt_consts.SmartValueAttributes())
         self.beginResetModel()
 
         self.data_series = data
+        self.date_states = None
+        if data is not None and self.dtype in smrt_dates.DATE_TYPES:
+            self.date_states = smrt_dates.series_date_states(data, self.dtype, self.value_attrs)
         self.select_all_node = None
         self.add_to_current_node = None
         self.unknown_node = None
@@ -795,101 +1153,51 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
             unknowns_present: bool = False
             blanks_present: bool = False
             invalid_present: bool = False
+            unknown_count, blank_count, invalid_count = 0, 0, 0
 
             count = 0
             self.flag_max_exceeded = False
-            value_flags = self.value_attrs.flags
             if (
                 self.dtype == smrt_consts.SmartDataTypes.DATE
                 or self.dtype == smrt_consts.SmartDataTypes.DATE_TIME
             ):
-                for date in data:
-                    count += 1
-                    if count > smrt_consts.FILTER_MAX_ROW_LIMIT:
-                        self.flag_max_exceeded = True
-                        break
-                    if pd.isnull(date):
-                        if value_flags & smrt_consts.SmartValueFlags.REQUIRED:
-                            unknowns_present = True
-                        else:
-                            blanks_present = True
-                    elif (
-                        date == smrt_consts.UNKNOWN_DATE
-                        or date == smrt_consts.UNKNOWN_DATETIME
-                        or date == smrt_consts.SORT_ASC_UNKNOWN_DATETIME
-                        or date == smrt_consts.SORT_ASC_UNKNOWN_DATE
-                    ):
-                        unknowns_present = True
-                    elif (
-                        date == smrt_consts.INVALID_DATE
-                        or date == smrt_consts.INVALID_DATETIME
-                    ):
-                        invalid_present = True
-                    elif value_flags & smrt_consts.SmartValueFlags.MIN_VALID_VALUE and dtype == smrt_consts.SmartDataTypes.DATE and date < self.value_attrs.min_value:
-                            invalid_present = True
-                    elif value_flags & smrt_consts.SmartValueFlags.MAX_VALID_VALUE and dtype == smrt_consts.SmartDataTypes.DATE and date > self.value_attrs.max_value:
-                            invalid_present = True
-                    elif value_flags & smrt_consts.SmartValueFlags.MAX_EXPECTED_VALUE and dtype == smrt_consts.SmartDataTypes.DATE and date > self.value_attrs.max_value:
-                            blanks_present = True
-                    else:
-                        # date = pd.to_datetime(date)
-                        year, month, day = date.year, date.month, date.day
-                        year_node = self.root.get_or_create_child(
-                            year, date_data=smrt_consts.DateTimeNodeData.YEAR
-                        )
-                        month_node = year_node.get_or_create_child(
-                            month, date_data=smrt_consts.DateTimeNodeData.MONTH
-                        )
-                        day_node = month_node.get_or_create_child(
-                            day, date_data=smrt_consts.DateTimeNodeData.DAY
-                        )
-                        if (
-                            self.dtype == smrt_consts.SmartDataTypes.DATE_TIME
-                            and self.time_resolution
-                        ):
-                            hour, minute, second = date.hour, date.minute, date.second
-                            day_node = month_node.get_or_create_child(
-                                day, date_data=smrt_consts.DateTimeNodeData.DAY
-                            )
-                            hour_node = day_node.get_or_create_child(
-                                hour, date_data=smrt_consts.DateTimeNodeData.HOUR
-                            )
-                            minute_node = hour_node.get_or_create_child(
-                                minute, date_data=smrt_consts.DateTimeNodeData.MIN
-                            )
-                            second_node = minute_node.get_or_create_child(
-                                second, date_data=smrt_consts.DateTimeNodeData.SEC
-                            )
-                        if (
-                            not self.user_has_match_data
-                            and self.current_filter
-                            and date not in self.current_filter
-                        ):
-                            if not (
-                                self.time_resolution
-                                and self.dtype == smrt_consts.SmartDataTypes.DATE_TIME
-                            ):
-                                day_node.check_state = (
-                                    QtCore.Qt.CheckState.Unchecked.value
-                                )
-                                update_parent_nodes(day_node.parent)
-                            else:
-                                second_node.check_state = (
-                                    QtCore.Qt.CheckState.Unchecked.value
-                                )
-                                update_parent_nodes(second_node.parent)
+                # the state of every date is worked out in one pass, only valid dates are added to the tree
+                if data.size > smrt_consts.FILTER_MAX_ROW_LIMIT:
+                    self.flag_max_exceeded = True
+                tree_data = data.iloc[:smrt_consts.FILTER_MAX_ROW_LIMIT]
+                tree_states = self.date_states[:smrt_consts.FILTER_MAX_ROW_LIMIT]
+                unknowns_present = bool((tree_states == smrt_consts.SmartDateState.UNKNOWN).any())
+                blanks_present = bool((tree_states == smrt_consts.SmartDateState.BLANK).any())
+                invalid_present = bool((tree_states == smrt_consts.SmartDateState.INVALID).any())
+                valid = tree_states == smrt_consts.SmartDateState.VALID
+                if counts is not None:
+                    tree_counts = counts[:smrt_consts.FILTER_MAX_ROW_LIMIT]
+                    unknown_count = int(tree_counts[tree_states == smrt_consts.SmartDateState.UNKNOWN].sum())
+                    blank_count = int(tree_counts[tree_states == smrt_consts.SmartDateState.BLANK].sum())
+                    invalid_count = int(tree_counts[tree_states == smrt_consts.SmartDateState.INVALID].sum())
+                    self.build_date_nodes(tree_data[valid], tree_counts[valid])
+                else:
+                    self.build_date_nodes(tree_data[valid])
 
             else:
+                if counts is not None and sort_by_count:
+                    # the most frequent values first (values with the same count keep their order)
+                    order = np.argsort(-counts, kind="stable")
+                    data = data.iloc[order]
+                    counts = counts[order]
                 for item in data:
                     count += 1
                     if count > smrt_consts.FILTER_MAX_ROW_LIMIT:
                         self.flag_max_exceeded = True
                         break
+                    item_count = None if counts is None else int(counts[count - 1])
                     if pd.isnull(item) or (self.dtype == smrt_consts.SmartDataTypes.INT and item == smrt_consts.SMRT_TBL_BLANK_INT_FLAG):
                         blanks_present = True
+                        if item_count is not None:
+                            blank_count += item_count
                     else:
                         item_node = TreeItemNode(
-                            item, parent=self.root, is_checkable=True
+                            item, parent=self.root, is_checkable=True, count=item_count
                         )
                         self.root.children.append(item_node)
                         if (
@@ -902,7 +1210,8 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
                             item_node.check_state = QtCore.Qt.CheckState.Checked.value
             if unknowns_present:
                 self.unknown_node = TreeItemNode(
-                    smrt_consts.UNKNOWN_TXT, parent=self.root, is_checkable=True
+                    smrt_consts.UNKNOWN_TXT, parent=self.root, is_checkable=True,
+                    count=None if counts is None else unknown_count,
                 )
                 self.root.children.append(self.unknown_node)
                 if (
@@ -917,7 +1226,8 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
 
             if blanks_present:
                 self.blanks_node = TreeItemNode(
-                    smrt_consts.BLANKS_TXT, parent=self.root, is_checkable=True
+                    smrt_consts.BLANKS_TXT, parent=self.root, is_checkable=True,
+                    count=None if counts is None else blank_count,
                 )
                 self.root.children.append(self.blanks_node)
                 if (
@@ -929,7 +1239,8 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
 
             if invalid_present:
                 self.invalid_node = TreeItemNode(
-                    smrt_consts.INVALID_TXT, parent=self.root, is_checkable=True
+                    smrt_consts.INVALID_TXT, parent=self.root, is_checkable=True,
+                    count=None if counts is None else invalid_count,
                 )
                 self.root.children.append(self.invalid_node)
                 if (
@@ -953,6 +1264,104 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
         if not self.flag_init_complete:
             self.flag_init_complete = True
 
+    def build_date_nodes(self, dates: pd.Series, counts: np.ndarray = None) -> None:
+        """
+        Adds the year > month > day (> hour > minute > second with time_resolution) nodes for some valid dates to
+        the tree. The dates are split into their parts and grouped one level at a time, so each node is made once
+        (in the order the dates first reach it) and the check states and counts are worked out for whole levels.
+        Args:
+            dates: (Series) the valid dates, in the order to list them
+            counts: (ndarray) how many rows hold each date (None if not known)
+        """
+        with_time = self.dtype == smrt_consts.SmartDataTypes.DATE_TIME and self.time_resolution
+        date_values = smrt_dates.to_datetime64(dates, self.dtype)
+        if date_values is not None:
+            parts = smrt_dates.date_parts(date_values, with_time=with_time)
+        else:
+            # (time zone aware values and the like) the parts are read one date at a time
+            attr_names = ["year", "month", "day"] + (["hour", "minute", "second"] if with_time else [])
+            parts = [np.array([getattr(date, attr_name) for date in dates], dtype=np.int64) for attr_name in attr_names]
+        level_data = [
+            smrt_consts.DateTimeNodeData.YEAR,
+            smrt_consts.DateTimeNodeData.MONTH,
+            smrt_consts.DateTimeNodeData.DAY,
+            smrt_consts.DateTimeNodeData.HOUR,
+            smrt_consts.DateTimeNodeData.MIN,
+            smrt_consts.DateTimeNodeData.SEC,
+        ]
+
+        # the node of each date on every level: a level's nodes are its parents' nodes split by the next part
+        # (factorize numbers them in the order they are first seen)
+        levels: list[tuple[np.ndarray, np.ndarray]] = []
+        node_codes = np.zeros(len(dates), dtype=np.int64)
+        for part in parts:
+            node_codes, _ = pd.factorize(node_codes * 64 + part if levels else part)
+            levels.append((node_codes, np.unique(node_codes, return_index=True)[1]))
+
+        # the leaves are unticked when any of their dates is left out by the current filter
+        leaf_codes, leaf_firsts = levels[-1]
+        checked = np.ones(leaf_firsts.shape[0], dtype=bool)
+        if not self.user_has_match_data and self.current_filter:
+            filter_dates = [value for value in self.current_filter if isinstance(value, (datetime.date, np.datetime64))]
+            filter_values = smrt_dates.to_datetime64(pd.Series(filter_dates, dtype=object), self.dtype)
+            if date_values is not None and filter_values is not None:
+                is_filtered = np.isin(date_values, filter_values)
+            else:
+                is_filtered = np.array([date in self.current_filter for date in dates], dtype=bool)
+            checked = np.bincount(leaf_codes, weights=~is_filtered, minlength=checked.shape[0]) == 0
+        leaf_counts = None if counts is None else np.bincount(leaf_codes, weights=counts, minlength=checked.shape[0])
+
+        # check states and counts from the leaves up: ticked when every child is, unticked when none is
+        check_states = [None] * len(levels)
+        level_counts = [None] * len(levels)
+        check_states[-1] = np.where(
+            checked, QtCore.Qt.CheckState.Checked.value, QtCore.Qt.CheckState.Unchecked.value
+        )
+        level_counts[-1] = leaf_counts
+        for level in reversed(range(len(levels) - 1)):
+            # (the parent of each child node is the parent of the first date under it)
+            parent_codes = levels[level][0][levels[level + 1][1]]
+            node_count = levels[level][1].shape[0]
+            child_states = check_states[level + 1]
+            all_children = np.bincount(parent_codes, minlength=node_count)
+            checked_children = np.bincount(
+                parent_codes, weights=child_states == QtCore.Qt.CheckState.Checked.value, minlength=node_count
+            )
+            unchecked_children = np.bincount(
+                parent_codes, weights=child_states == QtCore.Qt.CheckState.Unchecked.value, minlength=node_count
+            )
+            check_states[level] = np.select(
+                [checked_children == all_children, unchecked_children == all_children],
+                [QtCore.Qt.CheckState.Checked.value, QtCore.Qt.CheckState.Unchecked.value],
+                QtCore.Qt.CheckState.PartiallyChecked.value,
+            )
+            if leaf_counts is not None:
+                level_counts[level] = np.bincount(parent_codes, weights=level_counts[level + 1], minlength=node_count)
+
+        parent_nodes = None
+        for level, (node_codes, firsts) in enumerate(levels):
+            names = parts[level][firsts].tolist()
+            parents = (
+                [self.root] * len(names) if parent_nodes is None
+                else [parent_nodes[code] for code in levels[level - 1][0][firsts]]
+            )
+            level_states = check_states[level].tolist()
+            level_count_list = (
+                [None] * len(names) if level_counts[level] is None else level_counts[level].astype(np.int64).tolist()
+            )
+            nodes = []
+            for name, parent, check_state, count in zip(names, parents, level_states, level_count_list):
+                node = TreeItemNode(
+                    name,
+                    parent=parent,
+                    date_data=level_data[level],
+                    check_state=check_state,
+                    count=count,
+                )
+                parent.children.append(node)
+                nodes.append(node)
+            parent_nodes = nodes
+
     def index(self, row, column, parent=QtCore.QModelIndex()):
         # print(f'Index method: {row}, {column}, {parent}')
         if not self.hasIndex(row, column, parent):
@@ -996,6 +1405,12 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
         if role != QtCore.Qt.ItemDataRole.DisplayRole:
             return
         node = self.get_node(index)
+        node_text = self.node_text(node)
+        if node_text is None or node.count is None:
+            return node_text
+        return f"{node_text} ({node.count:,})"
+
+    def node_text(self, node: TreeItemNode) -> typing.Optional[str]:
         if (
             node.name == smrt_consts.SELECT_ALL_TXT
             or node.name == smrt_consts.SELECT_ALL_RESULTS
@@ -1182,17 +1597,14 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
         return index.internalPointer() if index.isValid() else self.root
 
     def get_checked_nodes(self, current_sort):
-        invalid_max_dates: pd.Series = None
-        invalid_min_dates: pd.Series = None
-        blank_max_dates: pd.Series = None
+        invalid_dates: pd.Series = None
+        blank_dates: pd.Series = None
         value_flags = self.value_attrs.flags
-        if self.dtype == smrt_consts.SmartDataTypes.DATE:
-            if value_flags & smrt_consts.SmartValueFlags.MIN_VALID_VALUE:
-                invalid_min_dates = self.data_series[self.data_series < self.value_attrs.min_value]
-            if value_flags & smrt_consts.SmartValueFlags.MAX_EXPECTED_VALUE:
-                blank_max_dates = self.data_series[self.data_series > self.value_attrs.max_value]
-            if value_flags & smrt_consts.SmartValueFlags.MAX_VALID_VALUE:
-                invalid_max_dates = self.data_series[self.data_series > self.value_attrs.max_value]
+        if self.date_states is not None:
+            # dates that are out of range are listed under (Invalid) or (Blanks), so they are filtered with them
+            not_null = self.data_series.notna().to_numpy()
+            invalid_dates = self.data_series[not_null & (self.date_states == smrt_consts.SmartDateState.INVALID)]
+            blank_dates = self.data_series[not_null & (self.date_states == smrt_consts.SmartDateState.BLANK)]
         results = []
 
         for node in self.root.children:
@@ -1205,12 +1617,13 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
                     None not in results
                     and self.blanks_node.check_state
                     == QtCore.Qt.CheckState.Checked.value
+                    and not (self.date_states is not None and value_flags & smrt_consts.SmartValueFlags.REQUIRED)
                 ):
+                    # (nulls in a REQUIRED date column are listed as unknown, not blank)
                     results.append(None)
-                if value_flags & smrt_consts.SmartValueFlags.MAX_EXPECTED_VALUE and self.blanks_node.check_state == QtCore.Qt.CheckState.Checked.value:
-                    if blank_max_dates is not None and not blank_max_dates.empty:
-                        for _, val in blank_max_dates.items():
-                            results.append(val)
+                if self.blanks_node.check_state == QtCore.Qt.CheckState.Checked.value:
+                    if blank_dates is not None and not blank_dates.empty:
+                        results.extend(blank_dates.tolist())
                 if self.dtype == smrt_consts.SmartDataTypes.INT:
                     results.append(smrt_consts.SMRT_TBL_BLANK_INT_FLAG)
             elif self.unknown_node and node == self.unknown_node:
@@ -1218,25 +1631,19 @@ class SmartTreeModel(QtCore.QAbstractItemModel):
                     if self.dtype == smrt_consts.SmartDataTypes.DATE:
                         results.append(smrt_consts.UNKNOWN_DATE)
                         results.append(smrt_consts.SORT_ASC_UNKNOWN_DATE)
-                        if value_flags & smrt_consts.SmartValueFlags.REQUIRED and None not in results:
-                            results.append(None)
                     elif self.dtype == smrt_consts.SmartDataTypes.DATE_TIME:
                         results.append(smrt_consts.UNKNOWN_DATETIME)
                         results.append(smrt_consts.SORT_ASC_UNKNOWN_DATETIME)
+                    if value_flags & smrt_consts.SmartValueFlags.REQUIRED and None not in results:
+                        results.append(None)
             elif self.invalid_node and node == self.invalid_node:
                 if self.invalid_node.check_state == QtCore.Qt.CheckState.Checked.value:
                     if self.dtype == smrt_consts.SmartDataTypes.DATE:
                         results.append(smrt_consts.INVALID_DATE)
-                        if value_flags & smrt_consts.SmartValueFlags.MIN_VALID_VALUE:
-                            if invalid_min_dates is not None and not invalid_min_dates.empty:
-                                for _, val in invalid_min_dates.items():
-                                    results.append(val)
-                        if value_flags & smrt_consts.SmartValueFlags.MAX_VALID_VALUE:
-                            if invalid_max_dates is not None and not invalid_max_dates.empty:
-                                for _, val in invalid_max_dates.items():
-                                    results.append(val)
                     elif self.dtype == smrt_consts.SmartDataTypes.DATE_TIME:
                         results.append(smrt_consts.INVALID_DATETIME)
+                    if invalid_dates is not None and not invalid_dates.empty:
+                        results.extend(invalid_dates.tolist())
             elif node.check_state == QtCore.Qt.CheckState.Unchecked.value:
                 pass
             else:
@@ -2,13 +2,35 @@ import numpy as np
 from PyQt6 import QtCore, QtGui, QtWidgets
 import pandas as pd
 
+import logging
 import typing
 
 from smart_qtable import smrt_consts
+from smart_qtable import smrt_data_model
+from smart_qtable import smrt_dates
+from smart_qtable import smrt_facets
+from smart_qtable import smrt_range_filter
+from smart_qtable import smrt_search_index
+from smart_qtable import smrt_sort
+from smart_qtable import smrt_value_counts
+from smart_qtable import smrt_value_index
 
 
-class SmartProxyModel(QtCore.QSortFilterProxyModel):
+class SmartProxyModel(QtCore.QAbstractProxyModel):
+    """
+    Sorts and filters the rows, and hides the columns, of a SmartDataModel.
 
+    The proxy works on whole columns of the model's column store instead of asking the model for one value at a
+    time. The filters are a boolean mask over the source rows. The sort is a single permutation of every source
+    row (shown or not), worked out in one numpy pass from each sort column's ranks (cached per column until the
+    column is edited). The rows shown are the sorted rows that pass the filters, held in a pair of arrays mapping
+    proxy rows to source rows and back, so a filter change re-uses the sort and only has to re-apply the mask.
+
+    Edits that move rows or show/hide them are applied together once the event loop is idle (in the order the
+    rows were already in until then). Rows removed from the model are taken out of the mappings straight away.
+    """
+
+    logger = logging.getLogger("smart_qtable.proxy")
     signal_filter_changed = QtCore.pyqtSignal()
     signal_sort_changed = QtCore.pyqtSignal()
     signal_hidden_columns_changed = QtCore.pyqtSignal()
@@ -20,42 +42,914 @@ class SmartProxyModel(QtCore.QSortFilterProxyModel):
         self.table_sort_order: dict[str, QtCore.Qt.SortOrder] = {}
         self.table_filters: dict[str, list[typing.Any]] = {}
         self.hidden_cols: list[str] = []
-        self.filter_mask: pd.Series = None
-        self.setSortRole(smrt_consts.TABLE_SORT_ROLE)
+        # one mask per filtered column, and the AND of all of them (None until it is next needed)
+        self.column_masks: dict[str, np.ndarray] = {}
+        self.filter_mask: np.ndarray = None
+        # inverted indexes of the (low cardinality) columns filtered on so far, None for columns that cannot be
+        # indexed
+        self.flag_value_index: bool = kwargs.get('value_index', True)
+        self.value_indexes: dict[str, typing.Optional[smrt_value_index.SmartValueIndex]] = {}
+        # the rows of each column with a range filter, sorted by value
+        self.range_indexes: dict[str, smrt_range_filter.SmartRangeIndex] = {}
+        # the quick search text, and the rows with it in one of their shown cells (None until it is next needed)
+        self.search_text: str = ""
+        self.search_mask: typing.Optional[np.ndarray] = None
+        # trigram indexes of the display strings of each source column searched so far
+        self.search_indexes: dict[int, smrt_search_index.SmartSearchIndex] = {}
+        # the sorted unique values of each column among the rows passing the other columns' filters (for the header
+        # filter popup), with the filter state they were worked out for. Dropped whenever the model's data changes.
+        self.unique_cache: dict[str, tuple[tuple, pd.Series]] = {}
+        # leave-one-out ANDs of the column masks (and the search), for the rows passing all filters but one
+        self.facets = smrt_facets.SmartFacetMasks()
+        # the value counts of each column opened in a filter popup, over the rows passing the other filters
+        self.value_counts: dict[str, smrt_value_counts.SmartValueCounts] = {}
+
+        # every source row (filtered out or not) in sort order, None when the table is not sorted
+        self.sorted_rows: typing.Optional[np.ndarray] = None
+        # the model's data_version when sorted_rows was worked out
+        self.sorted_rows_version: int = -1
+        # a sort column was edited, the rows are re-sorted the next time the mapping is updated
+        self.flag_sort_outdated: bool = False
+        # the sort ranks of each column sorted on so far
+        self.sort_cache = smrt_sort.SmartSortCache()
+        # proxy row -> source row, and source row -> proxy row (-1 for rows that are filtered out)
+        self.proxy_to_source: np.ndarray = np.empty(0, dtype=np.int64)
+        self.source_to_proxy: np.ndarray = np.empty(0, dtype=np.int64)
+        # proxy column -> source column, and source column -> proxy column (-1 for hidden columns)
+        self.proxy_to_source_cols: list[int] = []
+        self.source_to_proxy_cols: list[int] = []
+        # runs of rows removed from the model that the mappings have not been renumbered for yet. The model
+        # removes runs from the bottom up, so the renumbering is done once for all of them.
+        self.pending_removals: list[tuple[int, int]] = []
+
+        self.mapping_update_timer = QtCore.QTimer(self)
+        self.mapping_update_timer.setSingleShot(True)
+        self.mapping_update_timer.setInterval(0)
+        self.mapping_update_timer.timeout.connect(self.update_mapping)
+
+    # ----- QAbstractProxyModel -----
+
+    def setSourceModel(self, source_model: smrt_data_model.SmartDataModel) -> None:
+        old_model = self.sourceModel()
+        if old_model is not None:
+            for signal, slot in self._source_connections(old_model):
+                signal.disconnect(slot)
+        self.beginResetModel()
+        super().setSourceModel(source_model)
+        if source_model is not None:
+            for signal, slot in self._source_connections(source_model):
+                signal.connect(slot)
+        self.on_model_reset()
+        self.endResetModel()
+
+    def _source_connections(self, source_model: smrt_data_model.SmartDataModel) -> list[tuple]:
+        return [
+            (source_model.dataChanged, self.on_source_data_changed),
+            (source_model.rowsInserted, self.on_source_rows_inserted),
+            (source_model.rowsAboutToBeRemoved, self.on_source_rows_about_to_be_removed),
+            (source_model.rowsRemoved, self.on_source_rows_removed),
+            (source_model.modelAboutToBeReset, self.beginResetModel),
+            (source_model.modelReset, self.on_source_reset),
+            # the model only ever adds or removes rows, anything else is treated as a reset
+            (source_model.layoutAboutToBeChanged, self.beginResetModel),
+            (source_model.layoutChanged, self.on_source_reset),
+            (source_model.columnsAboutToBeInserted, self.beginResetModel),
+            (source_model.columnsInserted, self.on_source_reset),
+            (source_model.columnsAboutToBeRemoved, self.beginResetModel),
+            (source_model.columnsRemoved, self.on_source_reset),
+        ]
+
+    def index(self, row: int, column: int, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> QtCore.QModelIndex:
+        if parent.isValid() or row < 0 or column < 0:
+            return QtCore.QModelIndex()
+        if row >= self.rowCount() or column >= len(self.proxy_to_source_cols):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index: QtCore.QModelIndex = None) -> typing.Any:
+        if index is None:
+            return super().parent()
+        return QtCore.QModelIndex()
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        self.apply_pending_removals()
+        return self.proxy_to_source.shape[0]
+
+    def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.proxy_to_source_cols)
+
+    def hasChildren(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> bool:
+        if parent.isValid():
+            return False
+        return self.rowCount() > 0 and self.columnCount() > 0
+
+    def mapToSource(self, proxy_index: QtCore.QModelIndex) -> QtCore.QModelIndex:
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QtCore.QModelIndex()
+        self.apply_pending_removals()
+        return self.sourceModel().index(
+            int(self.proxy_to_source[proxy_index.row()]), self.proxy_to_source_cols[proxy_index.column()]
+        )
 
+    def mapFromSource(self, source_index: QtCore.QModelIndex) -> QtCore.QModelIndex:
+        if not source_index.isValid():
+            return QtCore.QModelIndex()
+        self.apply_pending_removals()
+        source_row = source_index.row()
+        source_col = source_index.column()
+        if source_row >= self.source_to_proxy.shape[0] or source_col >= len(self.source_to_proxy_cols):
+            return QtCore.QModelIndex()
+        row = int(self.source_to_proxy[source_row])
+        col = self.source_to_proxy_cols[source_col]
+        if row < 0 or col < 0:
+            return QtCore.QModelIndex()
+        return self.createIndex(row, col)
 
-    def lessThan(self, left_idx: QtCore.QModelIndex, right_idx: QtCore.QModelIndex) -> bool:
-        left_sort_value = self.sourceModel().data(left_idx, smrt_consts.TABLE_SORT_ROLE)
-        right_sort_value = self.sourceModel().data(right_idx, smrt_consts.TABLE_SORT_ROLE)
-        # if pd.isnull(left_sort_value) and pd.isnull(right_sort_value):
-        #     return False
-        # if pd.isnull(left_sort_value):
-        #     return True
-        # if pd.isnull(right_sort_value):
-        #     return False
-        return left_sort_value < right_sort_value
+    def mapSelectionToSource(self, proxy_selection: QtCore.QItemSelection) -> QtCore.QItemSelection:
+        # each range is mapped with one slice of the mapping, rather than index by index
+        source_selection = QtCore.QItemSelection()
+        if self.sourceModel() is None:
+            return source_selection
+        self.apply_pending_removals()
+        for sel_range in proxy_selection:
+            rows = np.unique(self.proxy_to_source[sel_range.top():sel_range.bottom() + 1])
+            cols = np.unique(self.proxy_to_source_cols[sel_range.left():sel_range.right() + 1])
+            self._add_selection_runs(source_selection, self.sourceModel(), rows, cols)
+        return source_selection
+
+    def mapSelectionFromSource(self, source_selection: QtCore.QItemSelection) -> QtCore.QItemSelection:
+        proxy_selection = QtCore.QItemSelection()
+        self.apply_pending_removals()
+        for sel_range in source_selection:
+            rows = self.source_to_proxy[sel_range.top():sel_range.bottom() + 1]
+            cols = np.asarray(self.source_to_proxy_cols[sel_range.left():sel_range.right() + 1], dtype=np.int64)
+            self._add_selection_runs(proxy_selection, self, np.unique(rows[rows >= 0]), np.unique(cols[cols >= 0]))
+        return proxy_selection
+
+    @staticmethod
+    def _add_selection_runs(
+            selection: QtCore.QItemSelection, model: QtCore.QAbstractItemModel, rows: np.ndarray, cols: np.ndarray
+    ) -> None:
+        col_runs = smrt_data_model.contiguous_runs(cols)
+        for first_row, last_row in smrt_data_model.contiguous_runs(rows):
+            for first_col, last_col in col_runs:
+                selection.append(
+                    QtCore.QItemSelectionRange(model.index(first_row, first_col), model.index(last_row, last_col))
+                )
+
+    def source_rows_for_selection(self, proxy_selection: QtCore.QItemSelection) -> np.ndarray:
+        """
+        Returns the (sorted, unique) source rows covered by a selection of the proxy's rows.
+        """
+        self.apply_pending_removals()
+        slices = [self.proxy_to_source[sel_range.top():sel_range.bottom() + 1] for sel_range in proxy_selection]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(slices))
+
+    def headerData(self, section: int, orientation: QtCore.Qt.Orientation, role: int = QtCore.Qt.ItemDataRole.DisplayRole) -> typing.Any:
+        if self.sourceModel() is None:
+            return None
+        if orientation == QtCore.Qt.Orientation.Horizontal:
+            if 0 <= section < len(self.proxy_to_source_cols):
+                return self.sourceModel().headerData(self.proxy_to_source_cols[section], orientation, role)
+            return None
+        return super().headerData(section, orientation, role)
+
+    def sort(self, column: int, order: QtCore.Qt.SortOrder = QtCore.Qt.SortOrder.AscendingOrder) -> None:
+        # (for views with sorting enabled) sorts on the one column
+        if column < 0:
+            self.clear_sort()
+            return
+        self.clear_sort(apply_sort=False)
+        self.set_sort_for_column(self.headerData(column, QtCore.Qt.Orientation.Horizontal), order)
+
+    # ----- source model signals -----
 
     def on_model_reset(self):
+        # the model's data was replaced, everything is worked out again from scratch
+        self.mapping_update_timer.stop()
+        self.unique_cache.clear()
+        self.pending_removals.clear()
+        self.sorted_rows = None
+        self.sort_cache.reset()
+        self.update_columns(emit_signals=False)
+        if self.sourceModel() is None:
+            self.set_mapping(np.empty(0, dtype=np.int64), 0)
+            return
         self.create_filter_mask()
+        self.set_mapping(self.build_mapping(), self.sourceModel().rowCount())
+
+    def on_source_reset(self) -> None:
+        self.on_model_reset()
+        self.endResetModel()
+
+    def on_source_data_changed(
+        self, top_left: QtCore.QModelIndex, bottom_right: QtCore.QModelIndex, roles: list[int] = ()
+    ) -> None:
+        if not top_left.isValid() or not bottom_right.isValid():
+            return
+        self.apply_pending_removals()
+        self.unique_cache.clear()
+        first_row, last_row = top_left.row(), bottom_right.row()
+        first_col, last_col = top_left.column(), bottom_right.column()
+        source_model = self.sourceModel()
+        self.update_column_indexes(first_row, last_row, first_col, last_col)
+
+        # (rows that are only tombstoned are re-filtered, the data_version does not change for them)
+        for col in range(first_col, last_col + 1):
+            self.sort_cache.invalidate_column(col, source_model.data_version)
+        if source_model.data_version != self.sorted_rows_version and any(
+            first_col <= col <= last_col for col in self.sort_columns()
+        ):
+            self.flag_sort_outdated = True
+
+        if last_row >= self.source_to_proxy.shape[0]:
+            self.mapping_update_timer.start()
+            return
+        rows = slice(first_row, last_row + 1)
+        proxy_rows = self.source_to_proxy[rows]
+        self.update_filter_mask()
+        self.refilter_rows(first_row, last_row, first_col, last_col)
+        self.update_value_counts(first_row, last_row, first_col, last_col)
+        accepted = self.filter_mask[rows]
+        if source_model.tombstone_mask is not None:
+            accepted = accepted & ~source_model.tombstone_mask[rows]
+        if self.flag_sort_outdated or not np.array_equal(accepted, proxy_rows >= 0):
+            self.mapping_update_timer.start()
+
+        proxy_rows = proxy_rows[proxy_rows >= 0]
+        proxy_cols = [
+            self.source_to_proxy_cols[col]
+            for col in range(first_col, last_col + 1)
+            if self.source_to_proxy_cols[col] >= 0
+        ]
+        if len(proxy_rows) and proxy_cols:
+            self.dataChanged.emit(
+                self.index(int(proxy_rows.min()), min(proxy_cols)),
+                self.index(int(proxy_rows.max()), max(proxy_cols)),
+                list(roles),
+            )
+
+    def on_source_rows_inserted(self, parent: QtCore.QModelIndex, first: int, last: int) -> None:
+        if parent.isValid():
+            return
+        self.apply_pending_removals()
+        self.unique_cache.clear()
+        if first != self.source_to_proxy.shape[0]:
+            # the model only appends rows, rows inserted anywhere else reset the proxy
+            self.beginResetModel()
+            self.on_model_reset()
+            self.endResetModel()
+            return
+
+        self.source_to_proxy = np.concatenate(
+            [self.source_to_proxy, np.full(last - first + 1, -1, dtype=np.int64)]
+        )
+        self.append_search_rows(first)
+        # the new rows' values can fall anywhere between the ranks already worked out
+        self.sort_cache.reset()
+        if self.sorted_rows is not None or self.flag_sort_outdated:
+            # the new rows are sorted in with the rest
+            self.flag_sort_outdated = True
+            self.update_mapping()
+            return
+
+        # not sorted: the new rows that pass the filters go to the bottom of the table
+        self.update_filter_mask()
+        accepted = self.filter_mask[first:last + 1]
+        tombstone_mask = self.sourceModel().tombstone_mask
+        if tombstone_mask is not None:
+            accepted = accepted & ~tombstone_mask[first:last + 1]
+        new_rows = np.flatnonzero(accepted) + first
+        if not len(new_rows):
+            return
+        first_proxy_row = self.proxy_to_source.shape[0]
+        self.beginInsertRows(QtCore.QModelIndex(), first_proxy_row, first_proxy_row + len(new_rows) - 1)
+        self.proxy_to_source = np.concatenate([self.proxy_to_source, new_rows])
+        self.source_to_proxy[new_rows] = np.arange(first_proxy_row, self.proxy_to_source.shape[0])
+        self.endInsertRows()
+
+    def on_source_rows_about_to_be_removed(self, parent: QtCore.QModelIndex, first: int, last: int) -> None:
+        if parent.isValid():
+            return
+        if self.pending_removals and last >= min(run_first for run_first, _ in self.pending_removals):
+            self.apply_pending_removals()
+
+        proxy_rows = self.source_to_proxy[first:last + 1]
+        proxy_rows = np.sort(proxy_rows[proxy_rows >= 0])
+        if not len(proxy_rows):
+            return
+        runs = smrt_data_model.contiguous_runs(proxy_rows)
+        if len(runs) > 1:
+            keep = np.ones(self.proxy_to_source.shape[0], dtype=bool)
+            keep[proxy_rows] = False
+            self.change_layout(self.proxy_to_source[keep])
+            return
+        first_proxy_row, last_proxy_row = runs[0]
+        self.beginRemoveRows(QtCore.QModelIndex(), first_proxy_row, last_proxy_row)
+        self.proxy_to_source = np.delete(self.proxy_to_source, np.s_[first_proxy_row:last_proxy_row + 1])
+        self.source_to_proxy[first:last + 1] = -1
+        self.source_to_proxy[self.source_to_proxy > last_proxy_row] -= last_proxy_row - first_proxy_row + 1
+        self.endRemoveRows()
+
+    def on_source_rows_removed(self, parent: QtCore.QModelIndex, first: int, last: int) -> None:
+        if parent.isValid():
+            return
+        self.pending_removals.append((first, last))
+        self.unique_cache.clear()
+
+    def apply_pending_removals(self) -> None:
+        """
+        Renumbers the mappings (and the cached sort and filter mask) for the rows removed from the model.
+        """
+        if not self.pending_removals:
+            return
+        removed = np.concatenate([np.arange(first, last + 1) for first, last in self.pending_removals])
+        removed.sort()
+        self.pending_removals.clear()
+        row_count = self.source_to_proxy.shape[0]
+        self.source_to_proxy = np.delete(self.source_to_proxy, removed)
+        self.proxy_to_source = self.proxy_to_source - np.searchsorted(removed, self.proxy_to_source)
+        if self.sorted_rows is not None:
+            is_removed = np.zeros(row_count, dtype=bool)
+            is_removed[removed] = True
+            sorted_rows = self.sorted_rows[~is_removed[self.sorted_rows]]
+            self.sorted_rows = sorted_rows - np.searchsorted(removed, sorted_rows)
+        self.sort_cache.remove_rows(removed)
+        # the indexes cover the model's first rows, and are only ever extended at the end (up to the model's row
+        # count). One that is behind on appended rows cannot be renumbered, it would line up with the wrong rows
+        # afterwards, so it is dropped and built again the next time it is needed.
+        for col_name, value_index in list(self.value_indexes.items()):
+            if value_index is None:
+                continue
+            if len(value_index) == row_count:
+                value_index.remove_rows(removed)
+            else:
+                self.value_indexes.pop(col_name)
+        for col_name, range_index in list(self.range_indexes.items()):
+            if len(range_index) == row_count:
+                range_index.remove_rows(removed)
+            else:
+                self.range_indexes.pop(col_name)
+        for col, search_index in list(self.search_indexes.items()):
+            if len(search_index) == row_count:
+                search_index.remove_rows(removed)
+            else:
+                self.search_indexes.pop(col)
+        if self.search_mask is not None and self.search_mask.shape[0] == row_count:
+            self.search_mask = np.delete(self.search_mask, removed)
+        for col_name, value_counts in list(self.value_counts.items()):
+            if len(value_counts) == row_count:
+                value_counts.remove_rows(removed)
+            else:
+                self.value_counts.pop(col_name)
+        for col_name, mask in self.column_masks.items():
+            if mask.shape[0] == row_count:
+                self.column_masks[col_name] = np.delete(mask, removed)
+        if self.filter_mask is not None and self.filter_mask.shape[0] == row_count:
+            self.filter_mask = np.delete(self.filter_mask, removed)
+
+    # ----- mapping -----
+
+    def sort_columns(self) -> list[int]:
+        """
+        Returns the source columns of the table's sort, the primary sort column first.
+        """
+        col_names = self.sourceModel().col_store.col_names
+        return [
+            col_names.index(col_name)
+            for col_name in self.table_sort_order
+            if col_name in col_names and col_name not in self.hidden_cols
+        ]
+
+    def sort_source_rows(self) -> typing.Optional[np.ndarray]:
+        """
+        Works out the order of every source row for the table's sort.
+        Returns:
+            (ndarray) the source rows in sort order, or None when the table is not sorted
+        """
+        source_model = self.sourceModel()
+        sort_columns = self.sort_columns()
+        if not sort_columns:
+            return None
+        descending = [
+            self.table_sort_order[source_model.col_store.col_names[col]] == QtCore.Qt.SortOrder.DescendingOrder
+            for col in sort_columns
+        ]
+        sorted_rows = self.sort_cache.sort_rows(
+            [source_model.renderers[col] for col in sort_columns], descending, source_model.data_version
+        )
+        self.logger.debug(f"Sorted {sorted_rows.shape[0]:,} rows on {len(sort_columns)} columns.")
+        return sorted_rows
+
+    def build_mapping(self) -> np.ndarray:
+        """
+        Returns the source rows to show, in the order to show them: the sorted rows that pass the filters.
+        """
+        self.apply_pending_removals()
+        source_model = self.sourceModel()
+        self.update_filter_mask()
+        accepted = self.filter_mask
+        if source_model.tombstone_mask is not None:
+            accepted = accepted & ~source_model.tombstone_mask
+        if (
+            self.sorted_rows is None
+            or self.flag_sort_outdated
+            or self.sorted_rows.shape[0] != accepted.shape[0]
+        ):
+            self.sorted_rows = self.sort_source_rows()
+            self.sorted_rows_version = source_model.data_version
+            self.flag_sort_outdated = False
+        if self.sorted_rows is None:
+            return np.flatnonzero(accepted)
+        return self.sorted_rows[accepted[self.sorted_rows]]
+
+    def set_mapping(self, proxy_to_source: np.ndarray, source_row_count: int) -> None:
+        self.proxy_to_source = proxy_to_source.astype(np.int64, copy=False)
+        self.source_to_proxy = np.full(source_row_count, -1, dtype=np.int64)
+        self.source_to_proxy[self.proxy_to_source] = np.arange(self.proxy_to_source.shape[0], dtype=np.int64)
+
+    def update_mapping(self) -> None:
+        """
+        Re-applies the filters and the sort to the model's rows, signalling the views with as little as possible:
+        nothing when no row moved, a single insert or removal when that is all that changed and a layout change
+        otherwise.
+        """
+        self.mapping_update_timer.stop()
+        if self.sourceModel() is None:
+            return
+        self.install_mapping(self.build_mapping())
+
+    def install_mapping(self, proxy_to_source: np.ndarray) -> None:
+        old_mapping = self.proxy_to_source
+        if np.array_equal(old_mapping, proxy_to_source):
+            return
+        source_row_count = self.source_to_proxy.shape[0]
+        new_count = proxy_to_source.shape[0]
+        old_count = old_mapping.shape[0]
+        if new_count != old_count:
+            if new_count < old_count:
+                shorter, longer = proxy_to_source, old_mapping
+            else:
+                shorter, longer = old_mapping, proxy_to_source
+            in_shorter = np.zeros(source_row_count, dtype=bool)
+            in_shorter[shorter] = True
+            kept = in_shorter[longer]
+            runs = smrt_data_model.contiguous_runs(np.flatnonzero(~kept))
+            if len(runs) == 1 and np.array_equal(longer[kept], shorter):
+                first_proxy_row, last_proxy_row = runs[0]
+                if new_count < old_count:
+                    self.beginRemoveRows(QtCore.QModelIndex(), first_proxy_row, last_proxy_row)
+                    self.set_mapping(proxy_to_source, source_row_count)
+                    self.endRemoveRows()
+                else:
+                    self.beginInsertRows(QtCore.QModelIndex(), first_proxy_row, last_proxy_row)
+                    self.set_mapping(proxy_to_source, source_row_count)
+                    self.endInsertRows()
+                return
+        self.change_layout(proxy_to_source)
+
+    def change_layout(self, proxy_to_source: np.ndarray) -> None:
+        # persistent indexes (the selection, the current cell...) follow their source rows, or become invalid
+        # when their row is no longer shown
+        self.layoutAboutToBeChanged.emit()
+        persistent_indexes = self.persistentIndexList()
+        source_rows = [int(self.proxy_to_source[index.row()]) for index in persistent_indexes]
+        self.set_mapping(proxy_to_source, self.source_to_proxy.shape[0])
+        new_indexes = []
+        for index, source_row in zip(persistent_indexes, source_rows):
+            row = int(self.source_to_proxy[source_row])
+            new_indexes.append(self.createIndex(row, index.column()) if row >= 0 else QtCore.QModelIndex())
+        self.changePersistentIndexList(persistent_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def update_columns(self, **kwargs) -> None:
+        """
+        Works out which of the model's columns are shown (every column with a name, that is not hidden).
+        Args:
+            emit_signals: (bool) signal the views with a remove/insert per column that is hidden/shown
+                (default True)
+        """
+        emit_signals = kwargs.get('emit_signals', True)
+        source_model = self.sourceModel()
+        new_cols = []
+        if source_model is not None:
+            for col in range(source_model.columnCount()):
+                column_name = source_model.headerData(
+                    col, QtCore.Qt.Orientation.Horizontal, QtCore.Qt.ItemDataRole.DisplayRole
+                )
+                if column_name and column_name not in self.hidden_cols:
+                    new_cols.append(col)
+        if not emit_signals:
+            self._set_columns(new_cols)
+            return
+
+        for proxy_col in reversed(range(len(self.proxy_to_source_cols))):
+            if self.proxy_to_source_cols[proxy_col] in new_cols:
+                continue
+            self.beginRemoveColumns(QtCore.QModelIndex(), proxy_col, proxy_col)
+            self._set_columns(self.proxy_to_source_cols[:proxy_col] + self.proxy_to_source_cols[proxy_col + 1:])
+            self.endRemoveColumns()
+        for proxy_col, col in enumerate(new_cols):
+            if proxy_col < len(self.proxy_to_source_cols) and self.proxy_to_source_cols[proxy_col] == col:
+                continue
+            self.beginInsertColumns(QtCore.QModelIndex(), proxy_col, proxy_col)
+            self._set_columns(self.proxy_to_source_cols[:proxy_col] + [col] + self.proxy_to_source_cols[proxy_col:])
+            self.endInsertColumns()
+
+    def _set_columns(self, proxy_to_source_cols: list[int]) -> None:
+        self.proxy_to_source_cols = proxy_to_source_cols
+        source_col_count = 0 if self.sourceModel() is None else self.sourceModel().columnCount()
+        self.source_to_proxy_cols = [-1] * source_col_count
+        for proxy_col, col in enumerate(proxy_to_source_cols):
+            self.source_to_proxy_cols[col] = proxy_col
+
+    # ----- filters -----
 
     def create_filter_mask(self) -> None:
-        model_df = self.sourceModel().smrt_df.data_df
-        model_dtypes = self.sourceModel().smrt_df.dtypes
-        if model_df is None:
-            self.filter_mask = pd.Series()
-            return
-        self.filter_mask = pd.Series(True, index=model_df.index)
-        if not self.table_filters:
-            return
-        for col_name, df_filter in self.table_filters.items():
-            if None in df_filter:
-                df_filter.remove(None)
-                filt = pd.isnull(model_df[col_name]) | model_df[col_name].isin(df_filter)
-                df_filter.append(None)
+        # every filtered column's mask is built again from scratch
+        self.column_masks.clear()
+        self.value_indexes.clear()
+        self.range_indexes.clear()
+        self.search_indexes.clear()
+        self.search_mask = None
+        self.filter_mask = None
+        self.facets = smrt_facets.SmartFacetMasks()
+        self.value_counts.clear()
+        if self.sourceModel() is not None:
+            self.update_filter_mask()
+
+    def build_column_mask(self, col_name: str, first_row: int, end_row: int = None) -> np.ndarray:
+        """
+        Evaluates one column's filter on the model's column store.
+        Args:
+            col_name: (str) the filtered column
+            first_row: (int) the first source row to evaluate
+            end_row: (int) the source row to stop before (default: the end of the model)
+        Returns:
+            (ndarray) a boolean array saying which of the rows pass the column's filter
+        """
+        col_store = self.sourceModel().col_store
+        end_row = col_store.row_count if end_row is None else end_row
+        if col_name not in col_store.col_names:
+            return np.ones(max(end_row - first_row, 0), dtype=bool)
+        df_filter = self.table_filters[col_name]
+        buffer = col_store.buffers[col_store.col_names.index(col_name)]
+        if isinstance(df_filter, smrt_range_filter.SmartRangeFilter):
+            if first_row == 0 and end_row == col_store.row_count:
+                # two binary searches on the column's sorted values
+                return self.range_index(col_name).mask(df_filter)
+            return smrt_range_filter.range_mask(df_filter, buffer, first_row, end_row)
+        filt_vals = [filt_val for filt_val in df_filter if filt_val is not None]
+        date_vals = None
+        if getattr(buffer, "states", None) is not None:
+            date_vals = smrt_dates.to_datetime64(pd.Series(filt_vals, dtype=object), buffer.dtype)
+        value_index = self.value_index(col_name)
+        if value_index is not None:
+            # an OR of the bitmaps of the filter's values (null is a value like any other)
+            return value_index.isin(
+                filt_vals if date_vals is None else date_vals, len(filt_vals) < len(df_filter), first_row, end_row
+            )
+        if date_vals is not None:
+            # the filter's dates are matched against the column's datetime64 values directly
+            filt = np.isin(buffer.values[first_row:end_row], date_vals)
+        else:
+            values = pd.Series(buffer.array(first_row, end_row), copy=False)
+            filt = values.isin(filt_vals).to_numpy(dtype=bool, na_value=False)
+        if len(filt_vals) < len(df_filter):
+            filt |= buffer.null_mask[first_row:end_row]
+        return filt
+
+    def value_index(self, col_name: str) -> typing.Optional[smrt_value_index.SmartValueIndex]:
+        """
+        Returns the value index of a column, indexing it the first time it is filtered on. Returns None if value
+        indexes are turned off or the column cannot be indexed.
+        """
+        if not self.flag_value_index:
+            return None
+        col_store = self.sourceModel().col_store
+        buffer = col_store.buffers[col_store.col_names.index(col_name)]
+        if col_name in self.value_indexes and self.value_indexes[col_name] is None:
+            return None
+        value_index = self.value_indexes.get(col_name, None)
+        if value_index is None or not value_index.is_valid_for(buffer.array()):
+            value_index = smrt_value_index.SmartValueIndex.build(buffer.array(), buffer.null_mask)
+        elif len(value_index) < col_store.row_count:
+            # rows were appended since the column was indexed
+            if not value_index.update_rows(buffer.array(), buffer.null_mask, len(value_index), col_store.row_count):
+                value_index = None
+        self.value_indexes[col_name] = value_index
+        return value_index
+
+    def range_index(self, col_name: str) -> smrt_range_filter.SmartRangeIndex:
+        """
+        Returns the range index of a column, sorting the column's values if they changed since it was last indexed.
+        """
+        col_store = self.sourceModel().col_store
+        range_index = self.range_indexes.get(col_name, None)
+        if range_index is None or len(range_index) != col_store.row_count:
+            range_index = smrt_range_filter.SmartRangeIndex.from_buffer(
+                col_store.buffers[col_store.col_names.index(col_name)], self.sourceModel().data_version
+            )
+            self.range_indexes[col_name] = range_index
+        return range_index
+
+    def search_index(self, col: int) -> smrt_search_index.SmartSearchIndex:
+        """
+        Returns the search index of a source column, indexing its display strings the first time it is searched.
+        """
+        source_model = self.sourceModel()
+        row_count = source_model.col_store.row_count
+        renderer = source_model.renderers[col]
+        search_index = self.search_indexes.get(col, None)
+        if search_index is not None and len(search_index) < row_count:
+            # rows were appended since the column was indexed
+            if not search_index.update_rows(len(search_index), renderer.display_strings(len(search_index))):
+                search_index = None
+        if search_index is None or len(search_index) != row_count:
+            search_index = smrt_search_index.SmartSearchIndex(renderer.display_strings())
+            self.search_indexes[col] = search_index
+        return search_index
+
+    def append_search_rows(self, first_row: int) -> None:
+        # (rows were appended from first_row on) the search indexes are kept in step with the model, so they can
+        # be renumbered when rows are removed before the next search
+        source_model = self.sourceModel()
+        for col, search_index in list(self.search_indexes.items()):
+            if len(search_index) != first_row or not search_index.update_rows(
+                first_row, source_model.renderers[col].display_strings(first_row)
+            ):
+                self.search_indexes.pop(col)
+
+    def build_search_mask(self, first_row: int, end_row: int = None) -> np.ndarray:
+        """
+        Evaluates the quick search on the model's rows: a row matches when the display string of any shown column
+        contains the search text.
+        Args:
+            first_row: (int) the first source row to evaluate
+            end_row: (int) the source row to stop before (default: the end of the model)
+        Returns:
+            (ndarray) a boolean array saying which of the rows match the search
+        """
+        end_row = self.sourceModel().col_store.row_count if end_row is None else end_row
+        search_mask = np.zeros(max(end_row - first_row, 0), dtype=bool)
+        for col in self.proxy_to_source_cols:
+            search_mask |= self.search_index(col).match(self.search_text, first_row, end_row)
+        return search_mask
+
+    def update_column_indexes(self, first_row: int, last_row: int, first_col: int, last_col: int) -> None:
+        # (the rows' values changed) the indexed columns in the range are coded again for just the rows, range
+        # indexes are sorted again the next time they are used
+        col_store = self.sourceModel().col_store
+        data_version = self.sourceModel().data_version
+        for col_name in list(self.range_indexes):
+            if (
+                first_col <= col_store.col_names.index(col_name) <= last_col
+                and self.range_indexes[col_name].data_version != data_version
+            ):
+                self.range_indexes.pop(col_name)
+        outdated = []
+        for col_name, value_index in self.value_indexes.items():
+            if value_index is None or not first_col <= col_store.col_names.index(col_name) <= last_col:
+                continue
+            buffer = col_store.buffers[col_store.col_names.index(col_name)]
+            end_row = min(last_row + 1, len(value_index))
+            if first_row >= end_row:
+                continue
+            if not value_index.is_valid_for(buffer.array()) or not value_index.update_rows(
+                buffer.array(), buffer.null_mask, first_row, end_row
+            ):
+                outdated.append(col_name)
+        for col_name in outdated:
+            # built again from scratch the next time the column is filtered on
+            self.value_indexes.pop(col_name)
+        for col in [col for col in self.search_indexes if first_col <= col <= last_col]:
+            search_index = self.search_indexes[col]
+            end_row = min(last_row + 1, len(search_index))
+            if first_row < end_row and not search_index.update_rows(
+                first_row, self.sourceModel().renderers[col].display_strings(first_row, end_row)
+            ):
+                self.search_indexes.pop(col)
+
+    def combine_column_masks(self, first_row: int = 0, end_row: int = None) -> np.ndarray:
+        row_count = self.sourceModel().col_store.row_count
+        end_row = row_count if end_row is None else end_row
+        filter_mask = np.ones(max(end_row - first_row, 0), dtype=bool)
+        for mask in self.column_masks.values():
+            filter_mask &= mask[first_row:end_row]
+        if self.search_text:
+            filter_mask &= self.search_mask[first_row:end_row]
+        return filter_mask
+
+    def update_filter_mask(self) -> None:
+        """
+        Brings the filter mask up to date: the masks of newly filtered columns are built and rows appended to the
+        model are evaluated. Columns whose masks are already up to date are not looked at again.
+        """
+        row_count = self.sourceModel().col_store.row_count
+        for col_name in self.table_filters:
+            mask = self.column_masks.get(col_name, None)
+            if mask is None:
+                self.column_masks[col_name] = self.build_column_mask(col_name, 0)
+            elif mask.shape[0] < row_count:
+                self.column_masks[col_name] = np.concatenate(
+                    [mask, self.build_column_mask(col_name, mask.shape[0])]
+                )
+        if self.search_text:
+            if self.search_mask is None:
+                self.search_mask = self.build_search_mask(0)
+            elif self.search_mask.shape[0] < row_count:
+                self.search_mask = np.concatenate(
+                    [self.search_mask, self.build_search_mask(self.search_mask.shape[0])]
+                )
+        if self.filter_mask is None:
+            self.filter_mask = self.combine_column_masks()
+        elif self.filter_mask.shape[0] < row_count:
+            # rows were appended, only they need to be combined
+            self.filter_mask = np.concatenate(
+                [self.filter_mask, self.combine_column_masks(self.filter_mask.shape[0])]
+            )
+
+    def refilter_rows(self, first_row: int, last_row: int, first_col: int, last_col: int) -> None:
+        # (the rows' values changed) only the filtered columns in the range are evaluated again, for just the rows
+        col_names = self.sourceModel().col_store.col_names
+        refiltered = False
+        for col_name, mask in self.column_masks.items():
+            if col_name in col_names and first_col <= col_names.index(col_name) <= last_col:
+                mask[first_row:last_row + 1] = self.build_column_mask(col_name, first_row, last_row + 1)
+                refiltered = True
+        if self.search_text and any(first_col <= col <= last_col for col in self.proxy_to_source_cols):
+            self.search_mask[first_row:last_row + 1] = self.build_search_mask(first_row, last_row + 1)
+            refiltered = True
+        if refiltered:
+            self.filter_mask[first_row:last_row + 1] = self.combine_column_masks(first_row, last_row + 1)
+            if self.facets.is_valid_for(self.facet_masks()):
+                self.facets.update_rows(first_row, last_row + 1)
+
+    def rows_accepted(self, first_row: int, last_row: int) -> np.ndarray:
+        """
+        Returns a boolean array saying which of the source rows first_row to last_row (inclusive) pass the
+        table filters.
+        """
+        self.update_filter_mask()
+        return self.filter_mask[first_row:last_row + 1]
+
+    def accepted_source_rows(self) -> np.ndarray:
+        """
+        Returns the source rows that pass the table filters (and are not tombstoned), in source order.
+        """
+        self.update_filter_mask()
+        accepted = self.filter_mask
+        tombstone_mask = self.sourceModel().tombstone_mask
+        if tombstone_mask is not None:
+            accepted = accepted & ~tombstone_mask
+        return np.flatnonzero(accepted)
+
+    def other_filters_key(self, col_name: str) -> tuple:
+        # the filter state of every column but col_name (copied, a filter list can be changed in place later on)
+        other_filters = tuple(
+            (name, tuple(df_filter) if isinstance(df_filter, list) else df_filter)
+            for name, df_filter in self.table_filters.items()
+            if name != col_name
+        )
+        if not self.search_text:
+            return other_filters
+        return other_filters + (("", self.search_text, tuple(self.proxy_to_source_cols)),)
+
+    def other_filters_mask(self, col_name: str) -> np.ndarray:
+        """
+        Returns a boolean array saying which source rows pass every table filter except col_name's (and are not
+        tombstoned), i.e. the rows whose values are offered by the column's filter popup.
+        """
+        self.apply_pending_removals()
+        self.update_filter_mask()
+        facet_masks = self.facet_masks()
+        if not self.facets.is_valid_for(facet_masks):
+            self.facets.build(facet_masks)
+        source_model = self.sourceModel()
+        mask = self.facets.leave_one_out(col_name)
+        if mask is None:
+            mask = np.ones(source_model.col_store.row_count, dtype=bool)
+        else:
+            mask = mask.copy()
+        if source_model.tombstone_mask is not None:
+            mask &= ~source_model.tombstone_mask
+        return mask
+
+    def other_filters_rows(self, col_name: str, first_row: int, end_row: int) -> np.ndarray:
+        # other_filters_mask for just the rows first_row to end_row
+        mask = np.ones(max(end_row - first_row, 0), dtype=bool)
+        for name, facet_mask in self.facet_masks().items():
+            if name != col_name:
+                mask &= facet_mask[first_row:end_row]
+        tombstone_mask = self.sourceModel().tombstone_mask
+        if tombstone_mask is not None:
+            mask &= ~tombstone_mask[first_row:end_row]
+        return mask
+
+    def column_value_counts(self, col_name: str) -> typing.Optional[smrt_value_counts.SmartValueCounts]:
+        """
+        Returns the value counts of a column over the rows passing the other columns' filters, coding the column
+        the first time and counting again only when the other filters changed. Returns None if the column's values
+        cannot be counted.
+        """
+        self.apply_pending_removals()
+        self.update_filter_mask()
+        col_store = self.sourceModel().col_store
+        buffer = col_store.buffers[col_store.col_names.index(col_name)]
+        filter_key = self.other_filters_key(col_name)
+        value_counts = self.value_counts.get(col_name, None)
+        if value_counts is not None and not value_counts.is_valid_for(buffer.array()):
+            value_counts = None
+        elif value_counts is not None and len(value_counts) < col_store.row_count:
+            # rows were appended since the column was coded
+            first_row, end_row = len(value_counts), col_store.row_count
+            counted = self.other_filters_rows(col_name, first_row, end_row)
+            if not value_counts.update_rows(first_row, end_row, counted, buffer.array(), buffer.null_mask):
+                value_counts = None
+        if value_counts is None:
+            value_counts = smrt_value_counts.SmartValueCounts.build(buffer.array(), buffer.null_mask)
+            if value_counts is None:
+                self.value_counts.pop(col_name, None)
+                return None
+        if value_counts.filter_key != filter_key:
+            value_counts.recount(self.other_filters_mask(col_name), filter_key)
+        self.value_counts[col_name] = value_counts
+        return value_counts
+
+    def value_counts_for(self, col_name: str, values: pd.Series) -> typing.Optional[np.ndarray]:
+        """
+        Returns how many of the rows passing the other columns' filters hold each of the given values of a column
+        (i.e. the column_uniques), or None if the column's values cannot be counted.
+        """
+        value_counts = self.column_value_counts(col_name)
+        if value_counts is None:
+            return None
+        col_store = self.sourceModel().col_store
+        buffer = col_store.buffers[col_store.col_names.index(col_name)]
+        null_mask = values.isnull().to_numpy()
+        if getattr(buffer, "states", None) is not None:
+            # (the column store holds dates as datetime64)
+            keys = smrt_dates.to_datetime64(values, buffer.dtype)
+            if keys is None:
+                return None
+            null_mask |= np.isnat(keys)
+        else:
+            keys = values.to_numpy()
+        return value_counts.counts_for(keys, null_mask)
+
+    def update_value_counts(self, first_row: int, last_row: int, first_col: int, last_col: int) -> None:
+        # (the rows' values changed, and the filter masks were brought up to date for them) the rows are counted
+        # again, and coded again for the counted columns in the range
+        col_store = self.sourceModel().col_store
+        for col_name, value_counts in list(self.value_counts.items()):
+            end_row = min(last_row + 1, len(value_counts))
+            if first_row >= end_row:
+                continue
+            buffer = col_store.buffers[col_store.col_names.index(col_name)]
+            values, null_mask = None, None
+            if first_col <= col_store.col_names.index(col_name) <= last_col:
+                if not value_counts.is_valid_for(buffer.array()):
+                    self.value_counts.pop(col_name)
+                    continue
+                values, null_mask = buffer.array(), buffer.null_mask
+            if value_counts.filter_key == self.other_filters_key(col_name):
+                counted = self.other_filters_rows(col_name, first_row, end_row)
             else:
-                filt = model_df[col_name].isin(df_filter)
-            self.filter_mask = self.filter_mask & filt
+                # (counted again from scratch the next time they are needed)
+                counted = value_counts.counted[first_row:end_row]
+            if not value_counts.update_rows(first_row, end_row, counted, values, null_mask):
+                self.value_counts.pop(col_name)
 
+    def facet_masks(self) -> dict[str, np.ndarray]:
+        # the column masks, with the quick search as one more facet (under "", which no shown column is called)
+        if not self.search_text:
+            return self.column_masks
+        return {**self.column_masks, "": self.search_mask}
+
+    def column_uniques(self, column: pd.Series, descending: bool = False) -> pd.Series:
+        """
+        Returns the sorted unique values of a column among the rows passing the other columns' filters. The result
+        is cached until the model's data or the other columns' filters change.
+        Args:
+            column: (Series) the column of the model's dataframe, in source row order
+            descending: (bool) sort the values in descending order
+        Returns:
+            (Series) the unique values (nulls last)
+        """
+        key = (self.other_filters_key(column.name), descending)
+        cached = self.unique_cache.get(column.name, None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        uniques = pd.Series(column[self.other_filters_mask(column.name)].unique())
+        uniques = uniques.sort_values(ascending=not descending, ignore_index=True)
+        self.unique_cache[column.name] = (key, uniques)
+        return uniques
 
     def set_hidden_cols(self, new_hidden_cols: list[str]) -> None:
         self.hidden_cols.clear()
@@ -65,44 +959,83 @@ class SmartProxyModel(QtCore.QSortFilterProxyModel):
                 self.set_filter_for_column(col, None)
             if col in self.table_sort_order:
                 self.set_sort_for_column(col, None)
-        self.invalidateColumnsFilter()
+        self.update_columns()
+        self.refresh_search()
         self.signal_hidden_columns_changed.emit()
 
     def clear_hidden_cols(self) -> None:
         self.hidden_cols.clear()
-        self.invalidateColumnsFilter()
+        self.update_columns()
+        self.refresh_search()
         self.signal_hidden_columns_changed.emit()
 
-    def filterAcceptsColumn(self, source_column, source_parent):
-        column_name = self.sourceModel().headerData(section=source_column, orientation=QtCore.Qt.Orientation.Horizontal,
-                                                    role=QtCore.Qt.ItemDataRole.DisplayRole)
-        if column_name:
-            return column_name not in self.hidden_cols
-        return False
-
-    def filterAcceptsRow(self, source_row, source_parent):
-        return self.filter_mask.iloc[source_row]
-
     def set_filter_for_column(self, col_name: str, new_filter: list):
+        # only the changed column's mask is evaluated, the others are re-used
         if not new_filter:
             if col_name in self.table_filters:
                 self.table_filters.pop(col_name)
-                self.create_filter_mask()
-                self.invalidateRowsFilter()
+                self.column_masks.pop(col_name, None)
+                self.filter_mask = None
+                self.update_mapping()
                 self.signal_filter_changed.emit()
             return
 
+        if self.sourceModel() is not None:
+            self.update_filter_mask()
+        previous_filter = self.table_filters.get(col_name, None)
         self.table_filters[col_name] = new_filter
-        self.create_filter_mask()
-        self.invalidateRowsFilter()
+        self.column_masks.pop(col_name, None)
+        if previous_filter is not None:
+            # (a filter that was widened cannot be AND-ed on top of the old mask)
+            self.filter_mask = None
+        if self.sourceModel() is not None and self.filter_mask is not None:
+            column_mask = self.build_column_mask(col_name, 0)
+            self.column_masks[col_name] = column_mask
+            self.filter_mask = self.filter_mask & column_mask
+        self.update_mapping()
+        self.signal_filter_changed.emit()
+
+    def set_search_text(self, text: str) -> None:
+        """
+        Shows only the rows with text (ignoring case) in one of their shown cells, on top of the column filters. An
+        empty text turns the search off.
+        """
+        if text == self.search_text:
+            return
+        # (a longer search only narrows down the rows already shown, so it can be AND-ed on top of the old mask)
+        narrowed = bool(self.search_text) and self.search_text.upper() in text.upper()
+        self.search_text = text
+        self.search_mask = None
+        if not narrowed:
+            self.filter_mask = None
+        if self.sourceModel() is not None:
+            self.apply_pending_removals()
+            had_filter_mask = self.filter_mask is not None
+            self.update_filter_mask()
+            if had_filter_mask and self.search_text:
+                self.filter_mask = self.filter_mask & self.search_mask
+        self.update_mapping()
+        self.signal_filter_changed.emit()
+
+    def refresh_search(self) -> None:
+        # (the shown columns changed) the search is evaluated again on the new columns
+        if not self.search_text:
+            return
+        self.search_mask = None
+        self.filter_mask = None
+        self.update_mapping()
         self.signal_filter_changed.emit()
 
     def clear_filters(self) -> None:
         self.table_filters.clear()
-        self.create_filter_mask()
-        self.invalidateRowsFilter()
+        self.column_masks.clear()
+        self.facets = smrt_facets.SmartFacetMasks()
+        self.filter_mask = None
+        self.update_mapping()
         self.signal_filter_changed.emit()
 
+    # ----- sorting -----
+
     def set_sort_for_column(self, col_name: str, sort_order: QtCore.Qt.SortOrder):
         if not sort_order:
             if col_name in self.table_sort_order:
@@ -116,19 +1049,11 @@ class SmartProxyModel(QtCore.QSortFilterProxyModel):
         self.signal_sort_changed.emit()
 
     def apply_sort(self) -> None:
-        # self.sort(-1)
-        model_df = self.sourceModel().smrt_df.data_df
-        if model_df is None:
+        if self.sourceModel() is None:
             return
-        if not self.table_sort_order:
-            self.sort(-1)
-            return
-        adjusted_columns = [col_name for col_name in model_df.columns if col_name not in self.hidden_cols]
-        for cn, so in reversed(self.table_sort_order.items()):
-            if cn not in adjusted_columns:
-                continue
-            self.sort(adjusted_columns.index(cn), so)
-
+        # the rows are sorted again from scratch, the filters are applied on top of the new order
+        self.sorted_rows = None
+        self.update_mapping()
 
     def clear_sort(self, **kwargs) -> None:
         apply_sort = kwargs.get('apply_sort', True)
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+import dataclasses
+import typing
+
+from smart_qtable import smrt_column_store
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_dates
+
+
+@dataclasses.dataclass(frozen=True)
+class SmartRangeFilter:
+    """
+    A filter keeping the rows of a numeric or date column whose value lies between low and high (both inclusive).
+    Leaving out low or high gives a <= or >= filter.
+
+    Nulls, and the sentinel values that stand in for them (the INT blank flag, the unknown and invalid dates), are
+    never inside a range; include_nulls keeps them as well.
+    """
+
+    low: typing.Any = None
+    high: typing.Any = None
+    include_nulls: bool = False
+
+    def __str__(self) -> str:
+        if self.low is None:
+            return f"<= {self.high}"
+        if self.high is None:
+            return f">= {self.low}"
+        return f"{self.low} - {self.high}"
+
+    def bounds(self, values: np.ndarray) -> tuple[typing.Any, typing.Any]:
+        """
+        Returns low and high converted so they compare with the (range_values) values, None for an open end.
+        """
+        return _to_bound(self.low, values.dtype), _to_bound(self.high, values.dtype)
+
+
+def _to_bound(bound: typing.Any, dtype: np.dtype) -> typing.Any:
+    if bound is None:
+        return None
+    if dtype.kind == "M":
+        # (a DATE column floors the bound into days, which keeps the inclusive comparisons right)
+        return pd.Timestamp(bound).to_datetime64().astype(dtype)
+    if dtype.kind == "m":
+        return pd.Timedelta(bound).to_timedelta64().astype(dtype)
+    return float(bound)
+
+
+def range_values(buffer: smrt_column_store.SmartColumnBuffer) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns a column's values as an array that can be compared with a range, and a mask of the rows that can be
+    inside a range at all (not null and not a sentinel value).
+    Args:
+        buffer: (SmartColumnBuffer) the column's buffer in the column store
+    Returns:
+        (tuple[ndarray, ndarray]) the float64 or datetime64 values, and the mask of the valid rows
+    """
+    # (a categorical column's values are its codes, so it is compared by its categories' values)
+    values = buffer.values if buffer.categorical_dtype is None else buffer.as_objects()
+    valid = ~buffer.null_mask
+    if getattr(buffer, "states", None) is not None:
+        # (the buffer's states are the ones the table shows, a DATE column shows its sentinels as plain dates)
+        states = smrt_dates.date_states(values, buffer.null_mask, buffer.dtype, buffer.value_attrs)
+        return values, states == smrt_consts.SmartDateState.VALID
+    if values.dtype.kind == "O":
+        series = pd.Series(values, copy=False)
+        if buffer.dtype in smrt_dates.DATE_TYPES:
+            values = pd.to_datetime(series, errors="coerce").to_numpy()
+            valid &= ~np.isnat(values)
+        else:
+            values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            valid &= ~np.isnan(values)
+    elif values.dtype.kind not in "fmM":
+        values = values.astype(np.float64)
+    if buffer.dtype == smrt_consts.SmartDataTypes.INT and values.dtype.kind == "f":
+        valid &= values != smrt_consts.SMRT_TBL_BLANK_INT_FLAG
+    return values, valid
+
+
+def range_mask(
+    range_filter: SmartRangeFilter, buffer: smrt_column_store.SmartColumnBuffer, first_row: int = 0,
+    end_row: int = None
+) -> np.ndarray:
+    """
+    Evaluates a range filter on some of a column's rows, comparing every value.
+    Args:
+        range_filter: (SmartRangeFilter) the filter
+        buffer: (SmartColumnBuffer) the column's buffer in the column store
+        first_row: (int) the first row to evaluate
+        end_row: (int) the row to stop before (default: the end of the column)
+    Returns:
+        (ndarray) a boolean array saying which of the rows pass the filter
+    """
+    values, valid = range_values(buffer)
+    values, valid = values[first_row:end_row], valid[first_row:end_row]
+    low, high = range_filter.bounds(values)
+    mask = valid.copy()
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    if range_filter.include_nulls:
+        mask |= ~valid
+    return mask
+
+
+class SmartRangeIndex:
+    """
+    The valid rows of a column (see range_values) in ascending order of their values, with the sorted values next to
+    them, so the rows inside a range are found with two binary searches instead of comparing every value.
+    """
+
+    def __init__(self, values: np.ndarray, valid: np.ndarray, data_version: int = -1):
+        # the model's data_version when the column was indexed
+        self.data_version = data_version
+        valid_rows = np.flatnonzero(valid)
+        self.order = valid_rows[np.argsort(values[valid_rows])]
+        self.sorted_values = values[self.order]
+        self.invalid_rows = np.flatnonzero(~valid)
+        self.row_count = values.shape[0]
+
+    @classmethod
+    def from_buffer(cls, buffer: smrt_column_store.SmartColumnBuffer, data_version: int = -1) -> "SmartRangeIndex":
+        return cls(*range_values(buffer), data_version=data_version)
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def rows_between(self, low: typing.Any, high: typing.Any) -> np.ndarray:
+        """
+        Returns the rows with a value between low and high (both inclusive, None for an open end), in value order.
+        """
+        first = 0 if low is None else np.searchsorted(self.sorted_values, low, side="left")
+        end = self.sorted_values.shape[0] if high is None else np.searchsorted(self.sorted_values, high, side="right")
+        return self.order[first:end]
+
+    def mask(self, range_filter: SmartRangeFilter) -> np.ndarray:
+        mask = np.zeros(self.row_count, dtype=bool)
+        mask[self.rows_between(*range_filter.bounds(self.sorted_values))] = True
+        if range_filter.include_nulls:
+            mask[self.invalid_rows] = True
+        return mask
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """
+        Takes (sorted, unique) rows out of the index. The remaining rows keep their order.
+        """
+        is_removed = np.zeros(self.row_count, dtype=bool)
+        is_removed[rows] = True
+        keep = ~is_removed[self.order]
+        self.order = self.order[keep] - np.searchsorted(rows, self.order[keep])
+        self.sorted_values = self.sorted_values[keep]
+        invalid_rows = self.invalid_rows[~is_removed[self.invalid_rows]]
+        self.invalid_rows = invalid_rows - np.searchsorted(rows, invalid_rows)
+        self.row_count -= rows.shape[0]
@@ -0,0 +1,345 @@
+import numpy as np
+from PyQt6 import QtCore
+import pandas as pd
+
+import logging
+import typing
+
+from smart_qtable import smrt_column_store
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_dates
+from smart_qtable import smrt_display_cache
+from smart_qtable import smrt_sort
+
+
+NUMBER_FORMATS: dict[smrt_consts.SmartDataTypes, str] = {
+    smrt_consts.SmartDataTypes.FLOAT: "{:.2f}",
+    smrt_consts.SmartDataTypes.ACCT: "$ {:,.2f}",
+    smrt_consts.SmartDataTypes.INT: "{:,}",
+}
+
+
+class SmartCellRenderer:
+    """
+    Renders the cells of a single column for every item data role the SmartDataModel supports.
+
+    A renderer is built once per column (when the model is created or its data is reset) with the column's
+    value attributes already resolved. It compiles a role -> callable map, so answering a data() call is a
+    single dictionary lookup and call. Roles missing from the map return None.
+
+    Subclass this (and register it with register_renderer) to change how a SmartDataTypes is shown, sorted
+    or filtered. The proxy model sorts whole columns at once with sort_keys, which goes through sort_value one
+    value at a time by default; the built in renderers override it with a vectorized version, so override
+    sort_keys as well when overriding their sort_value.
+    """
+
+    logger = logging.getLogger("smart_qtable.renderer")
+
+    def __init__(
+        self,
+        col: int,
+        buffer: smrt_column_store.SmartColumnBuffer,
+        **kwargs
+    ):
+        self.col: int = col
+        self.buffer: smrt_column_store.SmartColumnBuffer = buffer
+        self.dtype: smrt_consts.SmartDataTypes = buffer.dtype
+        self.value_attrs: typing.Optional[smrt_consts.SmartValueAttributes] = kwargs.get("value_attrs", None)
+        self.editable: bool = kwargs.get("editable", False)
+        self.display_cache: typing.Optional[smrt_display_cache.SmartDisplayCache] = kwargs.get(
+            "display_cache", None
+        )
+        self.role_map: dict[int, typing.Callable[[int], typing.Any]] = self.build_role_map()
+
+    def build_role_map(self) -> dict[int, typing.Callable[[int], typing.Any]]:
+        role_map = {
+            QtCore.Qt.ItemDataRole.DisplayRole: self.display_role,
+            smrt_consts.TABLE_SORT_ROLE: self.sort_role,
+            smrt_consts.TABLE_FILTER_ROLE: self.filter_role,
+            QtCore.Qt.ItemDataRole.EditRole: self.value,
+            QtCore.Qt.ItemDataRole.TextAlignmentRole: self.alignment_role,
+        }
+        if self.display_cache is not None:
+            role_map[QtCore.Qt.ItemDataRole.DisplayRole] = self.cached_display_role
+        if self.editable:
+            role_map[QtCore.Qt.ItemDataRole.BackgroundRole] = self.background_role
+        return role_map
+
+    def data(self, row: int, role: int) -> typing.Any:
+        role_func = self.role_map.get(role, None)
+        if role_func is None:
+            return None
+        return role_func(row)
+
+    def value(self, row: int) -> typing.Any:
+        return self.buffer.get(row)
+
+    # ----- role callables -----
+
+    def display_role(self, row: int) -> str:
+        return self.display_value(self.value(row))
+
+    def cached_display_role(self, row: int) -> str:
+        col_cache = self.display_cache.column(self.col)
+        if col_cache is None:
+            col_cache = self.display_cache.set_column(self.col, self.display_strings())
+        display_val = col_cache[row]
+        if display_val is None:
+            # (an edited or appended cell)
+            display_val = self.display_role(row)
+            col_cache[row] = display_val
+        return display_val
+
+    def sort_role(self, row: int) -> typing.Any:
+        if self.buffer.null_mask[row]:
+            return ""
+        return self.sort_value(self.value(row))
+
+    def filter_role(self, row: int) -> typing.Any:
+        if self.buffer.null_mask[row]:
+            return ""
+        return self.filter_value(self.value(row))
+
+    def alignment_role(self, row: int) -> QtCore.Qt.AlignmentFlag:
+        return QtCore.Qt.AlignmentFlag.AlignCenter
+
+    def background_role(self, row: int) -> typing.Any:
+        return smrt_consts.EDITABLE_COLUMN_BG_COLOR
+
+    # ----- value conversions (override these in subclasses) -----
+
+    def display_value(self, value: typing.Any) -> str:
+        if pd.isnull(value):
+            return ""
+        return str(value)
+
+    def sort_value(self, value: typing.Any) -> typing.Any:
+        return str(value)
+
+    def filter_value(self, value: typing.Any) -> typing.Any:
+        return str(value)
+
+    # ----- whole column sorting -----
+
+    def sort_keys(self) -> np.ndarray:
+        """
+        Ranks every row of the column for sorting: rows with equal sort values share a rank and nulls rank below
+        every value, so ordering the rows by rank orders them the same way as sort_role.
+        Returns:
+            (ndarray) an int64 array with the sort rank of each row
+        """
+        buffer = self.buffer
+        not_null = np.flatnonzero(~buffer.null_mask)
+        sort_values = np.empty(not_null.shape[0], dtype=object)
+        for pos, row in enumerate(not_null):
+            sort_values[pos] = self.sort_value(self.value(row))
+        ranks = np.full(buffer.null_mask.shape[0], -1, dtype=np.int64)
+        ranks[not_null] = smrt_sort.dense_ranks(sort_values)
+        return ranks
+
+    # ----- whole column display -----
+
+    def display_strings(self, first_row: int = 0, end_row: int = None) -> np.ndarray:
+        """
+        Returns the display strings (DisplayRole) of a run of rows, formatted in one pass unless a subclass changed
+        how single values are shown.
+        Args:
+            first_row: (int) the first row to format
+            end_row: (int) the row to stop before (default: the end of the column)
+        Returns:
+            (ndarray) an object array of display strings
+        """
+        if (
+            type(self).display_value not in BUILT_IN_DISPLAY_VALUES
+            or type(self).display_role not in BUILT_IN_DISPLAY_ROLES
+        ):
+            rows = range(*slice(first_row, end_row).indices(self.buffer.values.shape[0]))
+            display = np.empty(len(rows), dtype=object)
+            for pos, row in enumerate(rows):
+                display[pos] = self.display_role(row)
+            return display
+        return smrt_display_cache.format_column(
+            pd.Series(self.buffer.array(first_row, end_row), copy=False), self.dtype, self.value_attrs
+        )
+
+
+class TextRenderer(SmartCellRenderer):
+
+    def sort_keys(self) -> np.ndarray:
+        buffer = self.buffer
+        if buffer.categorical_dtype is not None:
+            # the categories are ranked (as text, like sort_value) and each row takes the rank of its code
+            categories = buffer.categorical_dtype.categories.to_numpy(dtype=object)
+            category_ranks = smrt_sort.dense_ranks(np.array([str(value) for value in categories], dtype=object))
+            # (the null code, -1, picks the -1 on the end)
+            return np.append(category_ranks, -1)[buffer.values]
+        values = buffer.values[~buffer.null_mask]
+        if values.dtype.kind != "O" or pd.api.types.infer_dtype(values, skipna=False) != "string":
+            # (sort_value turns anything that is not already text into a string)
+            return super().sort_keys()
+        return smrt_sort.null_ranks(buffer.values, buffer.null_mask)
+
+
+class NumberRenderer(SmartCellRenderer):
+
+    def __init__(
+        self,
+        col: int,
+        buffer: smrt_column_store.SmartColumnBuffer,
+        **kwargs
+    ):
+        # the number format (and whether the blank int flag applies) is worked out once for the column
+        self.number_format: typing.Callable[[typing.Any], str] = NUMBER_FORMATS.get(buffer.dtype, "{}").format
+        self.blank_int_flag: bool = buffer.dtype == smrt_consts.SmartDataTypes.INT
+        super().__init__(col, buffer, **kwargs)
+
+    def build_role_map(self) -> dict[int, typing.Callable[[int], typing.Any]]:
+        role_map = super().build_role_map()
+        role_map[smrt_consts.SPN_MIN_VALUE_ROLE] = self.spin_min_role
+        role_map[smrt_consts.SPN_MAX_VALUE_ROLE] = self.value
+        return role_map
+
+    def spin_min_role(self, row: int) -> int:
+        return 0
+
+    def display_value(self, value: typing.Any) -> str:
+        if pd.isnull(value):
+            return ""
+        if self.blank_int_flag and value == smrt_consts.SMRT_TBL_BLANK_INT_FLAG:
+            return ""
+        return self.number_format(value)
+
+    def sort_value(self, value: typing.Any) -> typing.Any:
+        return value
+
+    def filter_value(self, value: typing.Any) -> typing.Any:
+        return value
+
+    def sort_keys(self) -> np.ndarray:
+        buffer = self.buffer
+        null_mask = buffer.null_mask
+        if self.dtype == smrt_consts.SmartDataTypes.INT:
+            # the blank int flag is shown as an empty cell, so it is sorted with the nulls
+            # (compared only where there is a value, objects columns can hold pd.NA)
+            null_mask = null_mask.copy()
+            null_mask[~null_mask] = buffer.values[~null_mask] == smrt_consts.SMRT_TBL_BLANK_INT_FLAG
+        return smrt_sort.null_ranks(buffer.values, null_mask)
+
+
+class DateRenderer(SmartCellRenderer):
+
+    def display_role(self, row: int) -> str:
+        # the state (blank, unknown, invalid...) of each row was worked out by the column buffer
+        states = self.buffer.states
+        if states is None:
+            return super().display_role(row)
+        return smrt_dates.format_date(self.buffer.values[row], states[row], self.dtype, self.buffer.box)
+
+    def display_value(self, value: typing.Any) -> str:
+        # (only used for columns that could not be converted to datetime64, see display_role)
+        state = smrt_dates.date_state(value, self.dtype, self.value_attrs, display=True)
+        return smrt_dates.format_date(value, state, self.dtype)
+
+    def display_strings(self, first_row: int = 0, end_row: int = None) -> np.ndarray:
+        states = self.buffer.states
+        if states is None or type(self).display_role is not DateRenderer.display_role:
+            return super().display_strings(first_row, end_row)
+        return smrt_dates.format_dates(
+            self.buffer.values[first_row:end_row], states[first_row:end_row], self.dtype, self.buffer.box
+        )
+
+    def sort_value(self, value: typing.Any) -> typing.Any:
+        return value
+
+    def filter_value(self, value: typing.Any) -> typing.Any:
+        return value
+
+    def sort_keys(self) -> np.ndarray:
+        states = self.buffer.states
+        if states is None:
+            return super().sort_keys()
+        # (like sort_value) every date ranks by its stored value, whatever it is shown as: the UNKNOWN and INVALID
+        # sentinels keep their place among the dates (SORT_ASC_UNKNOWN_DATE after all of them) and only nulls rank
+        # below every date
+        return smrt_sort.null_ranks(self.buffer.values, self.buffer.null_mask)
+
+
+class BoolRenderer(SmartCellRenderer):
+
+    def display_value(self, value: typing.Any) -> str:
+        if pd.isnull(value):
+            return ""
+        if value:
+            return "TRUE"
+        return "FALSE"
+
+    def sort_value(self, value: typing.Any) -> int:
+        if value:
+            return 1
+        return 0
+
+    def filter_value(self, value: typing.Any) -> int:
+        if value:
+            return 1
+        return 0
+
+    def sort_keys(self) -> np.ndarray:
+        buffer = self.buffer
+        if buffer.values.dtype.kind != "b":
+            return super().sort_keys()
+        ranks = buffer.values.astype(np.int64)
+        ranks[buffer.null_mask] = -1
+        return ranks
+
+
+class LocationRenderer(SmartCellRenderer):
+
+    def sort_value(self, value: typing.Any) -> typing.Any:
+        return value
+
+
+# the built in ways of showing a single value, which smrt_display_cache.format_column (and, for datetime64 columns,
+# DateRenderer.display_strings) match for a whole column at once
+BUILT_IN_DISPLAY_VALUES = frozenset(
+    renderer_type.display_value
+    for renderer_type in (SmartCellRenderer, TextRenderer, NumberRenderer, DateRenderer, BoolRenderer, LocationRenderer)
+)
+BUILT_IN_DISPLAY_ROLES = frozenset([SmartCellRenderer.display_role, DateRenderer.display_role])
+
+RENDERER_TYPES: dict[smrt_consts.SmartDataTypes, type[SmartCellRenderer]] = {
+    smrt_consts.SmartDataTypes.TEXT: TextRenderer,
+    smrt_consts.SmartDataTypes.INT: NumberRenderer,
+    smrt_consts.SmartDataTypes.FLOAT: NumberRenderer,
+    smrt_consts.SmartDataTypes.ACCT: NumberRenderer,
+    smrt_consts.SmartDataTypes.DATE: DateRenderer,
+    smrt_consts.SmartDataTypes.DATE_TIME: DateRenderer,
+    smrt_consts.SmartDataTypes.BOOL: BoolRenderer,
+    smrt_consts.SmartDataTypes.LOCATION: LocationRenderer,
+}
+
+
+def register_renderer(
+    dtype: smrt_consts.SmartDataTypes, renderer_type: type[SmartCellRenderer]
+) -> None:
+    """
+    Registers the renderer class used for every column of the given data type. Models built (or reset)
+    after registering will use it.
+    Args:
+        dtype: (SmartDataTypes) the data type to render
+        renderer_type: (type[SmartCellRenderer]) the renderer class to use
+    """
+    if not issubclass(renderer_type, SmartCellRenderer):
+        raise ValueError("Renderers must be subclasses of SmartCellRenderer.")
+    RENDERER_TYPES[dtype] = renderer_type
+
+
+def create_renderer(
+    col: int, buffer: smrt_column_store.SmartColumnBuffer, **kwargs
+) -> SmartCellRenderer:
+    renderer_type = RENDERER_TYPES.get(buffer.dtype, None)
+    if renderer_type is None:
+        SmartCellRenderer.logger.debug(
+            f"Column '{buffer.name}' has no renderer for its dtype. Values will be coverted to strings (by default)"
+        )
+        renderer_type = SmartCellRenderer
+    return renderer_type(col, buffer, **kwargs)
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+
+import itertools
+import typing
+
+
+class SmartRowIndex:
+    """
+    A two way map between the index labels of a SmartDataModel's rows and their positions in the model.
+
+    position -> label is a plain list lookup. label -> position is a dictionary, built the first time a label
+    is looked up and then kept up to date as rows are appended or removed, so keyed lookups cost O(1) instead of
+    going through DataFrame.index every time.
+
+    Labels do not have to be unique. A label used by more than one row resolves to the first of those rows in
+    position() and get_indexer(); positions() returns all of them.
+    """
+
+    def __init__(self, index: pd.Index = None):
+        self.labels: list[typing.Any] = []
+        # label -> first position, None until the first lookup
+        self._positions: typing.Optional[dict[typing.Any, int]] = None
+        # label -> every position, only for labels used by more than one row
+        self._duplicates: dict[typing.Any, list[int]] = {}
+        if index is not None:
+            self.reset(index)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def reset(self, index: typing.Optional[pd.Index]) -> None:
+        self.labels = [] if index is None else index.tolist()
+        self._positions = None
+        self._duplicates = {}
+
+    def _build(self) -> None:
+        positions = dict(zip(self.labels, range(len(self.labels))))
+        self._duplicates = {}
+        if len(positions) < len(self.labels):
+            positions = {}
+            self._add_positions(positions, 0, self.labels)
+        self._positions = positions
+
+    def _add_positions(self, positions: dict[typing.Any, int], first_row: int, labels: list[typing.Any]) -> None:
+        for row, label in enumerate(labels, first_row):
+            first = positions.setdefault(label, row)
+            if first != row:
+                self._duplicates.setdefault(label, [first]).append(row)
+
+    @property
+    def positions_map(self) -> dict[typing.Any, int]:
+        if self._positions is None:
+            self._build()
+        return self._positions
+
+    @property
+    def is_unique(self) -> bool:
+        if self._positions is None:
+            self._build()
+        return not self._duplicates
+
+    def label(self, row: int) -> typing.Any:
+        return self.labels[row]
+
+    def position(self, label: typing.Any) -> int:
+        """
+        Returns the position of the (first) row with the given label. Raises a KeyError if there is none.
+        """
+        row = self.positions_map.get(label, None)
+        if row is None:
+            raise KeyError(label)
+        return row
+
+    def positions(self, label: typing.Any) -> list[int]:
+        """
+        Returns the positions of every row with the given label. Raises a KeyError if there are none.
+        """
+        if self._positions is None:
+            self._build()
+        rows = self._duplicates.get(label, None)
+        if rows is not None:
+            return list(rows)
+        return [self.position(label)]
+
+    def get_indexer(self, labels: typing.Iterable[typing.Any]) -> np.ndarray:
+        """
+        Returns the position of the (first) row of each label, -1 for labels that are not in the index.
+        """
+        positions_map = self.positions_map
+        labels = list(labels)
+        return np.fromiter((positions_map.get(label, -1) for label in labels), dtype=np.int64, count=len(labels))
+
+    def get_all_positions(self, labels: typing.Iterable[typing.Any]) -> np.ndarray:
+        """
+        Returns the sorted positions of every row with one of the labels. Raises a KeyError listing (up to 5 of)
+        the labels that are not in the index.
+        """
+        labels = list(labels)
+        rows = self.get_indexer(labels)
+        if (rows < 0).any():
+            missing = [label for label, row in zip(labels, rows) if row < 0]
+            raise KeyError(f"{missing[:5]} not found in the table's index.")
+        if self._duplicates:
+            rows = np.concatenate(
+                [rows] + [self._duplicates[label] for label in set(labels) if label in self._duplicates]
+            )
+        return np.unique(rows)
+
+    def append(self, labels: typing.Iterable[typing.Any]) -> None:
+        first_row = len(self.labels)
+        labels = list(labels)
+        self.labels.extend(labels)
+        if self._positions is not None:
+            self._add_positions(self._positions, first_row, labels)
+
+    def remove(self, rows: np.ndarray) -> None:
+        """
+        Removes the rows at the given (sorted, unique) positions. Only the rows after the first removed row
+        have to be renumbered.
+        """
+        if not len(rows):
+            return
+        keep = np.ones(len(self.labels), dtype=bool)
+        keep[rows] = False
+        first_row = int(rows[0])
+        if self._positions is not None and not self._duplicates:
+            for row in rows:
+                del self._positions[self.labels[row]]
+        self.labels = list(itertools.compress(self.labels, keep))
+        if self._positions is None:
+            return
+        if self._duplicates:
+            # the groups of repeated labels would all need renumbering, rebuild on the next lookup instead
+            self._positions = None
+            return
+        self._positions.update(zip(self.labels[first_row:], range(first_row, len(self.labels))))
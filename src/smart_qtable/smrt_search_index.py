@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+import typing
+
+# strings longer than this are not broken into trigrams, they are checked directly on every search
+TRIGRAM_MAX_LENGTH = 32
+# strings are broken into trigrams this many at a time, which bounds the memory used while building
+TRIGRAM_CHUNK_SIZE = 65536
+# strings added by edits are checked directly until there are this many of them, then the index is built again
+MAX_UNINDEXED_STRINGS = 4096
+
+
+def trigram_keys(text: str) -> np.ndarray:
+    """
+    Returns the (unique) trigrams of a string, each packed into an int64 from its three code points.
+    """
+    code_points = [ord(char) for char in text]
+    return np.unique(np.array(
+        [(a << 42) | (b << 21) | c for a, b, c in zip(code_points, code_points[1:], code_points[2:])],
+        dtype=np.int64,
+    ))
+
+
+def _chunk_trigrams(strings: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    # the strings are laid out as a (string, code point) matrix so every trigram is worked out at once. Returns
+    # each trigram with the position of its string in strings.
+    fixed = strings.astype(str)
+    width = fixed.dtype.itemsize // 4
+    if width < 3:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+    code_points = fixed.view(np.uint32).reshape(fixed.shape[0], width).astype(np.int64)
+    keys = (code_points[:, :-2] << 42) | (code_points[:, 1:-1] << 21) | code_points[:, 2:]
+    lengths = np.char.str_len(fixed)
+    in_string = np.arange(width - 2)[np.newaxis, :] < (lengths - 2)[:, np.newaxis]
+    positions = np.broadcast_to(np.arange(fixed.shape[0], dtype=np.int32)[:, np.newaxis], keys.shape)
+    return keys[in_string], positions[in_string]
+
+
+class SmartSearchIndex:
+    """
+    A trigram index over the display strings of one column of a SmartDataModel, for case insensitive substring
+    searches.
+
+    Every distinct string is stored once (upper cased) with the rows coded by string. Each trigram maps to the
+    (sorted) list of strings containing it, so a search only checks the strings that hold all of the search
+    text's trigrams. Text shorter than a trigram is checked against every distinct string, which is still much
+    less than every row for most columns. A search that extends the previous one only re-checks the previous
+    matches.
+    """
+
+    def __init__(self, display_strings: np.ndarray):
+        codes, uniques = pd.factorize(display_strings, use_na_sentinel=False)
+        self.codes: np.ndarray = codes.astype(np.int32)
+        self.strings: np.ndarray = pd.Series(uniques, dtype=object).str.upper().to_numpy(dtype=object)
+        # string -> id, only built once rows are edited or appended
+        self._ids: typing.Optional[dict[str, int]] = None
+        # ids of the strings without trigrams in the index (too long, or added since the index was built)
+        self.unindexed: np.ndarray = np.empty(0, dtype=np.int32)
+        # the number of strings added by update_rows
+        self.added_count: int = 0
+        self._last_text: str = ""
+        self._last_matches: typing.Optional[np.ndarray] = None
+        self._build_trigrams()
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def _build_trigrams(self) -> None:
+        lengths = pd.Series(self.strings, dtype=object).str.len().to_numpy()
+        short_ids = np.flatnonzero(lengths <= TRIGRAM_MAX_LENGTH).astype(np.int32)
+        self.unindexed = np.flatnonzero(lengths > TRIGRAM_MAX_LENGTH).astype(np.int32)
+        all_keys, all_ids = [], []
+        for first in range(0, short_ids.shape[0], TRIGRAM_CHUNK_SIZE):
+            chunk_ids = short_ids[first:first + TRIGRAM_CHUNK_SIZE]
+            keys, positions = _chunk_trigrams(self.strings[chunk_ids])
+            all_keys.append(keys)
+            all_ids.append(chunk_ids[positions])
+        keys = np.concatenate(all_keys) if all_keys else np.empty(0, dtype=np.int64)
+        ids = np.concatenate(all_ids) if all_ids else np.empty(0, dtype=np.int32)
+        # sorted by trigram then string, with repeats of a trigram within a string dropped
+        order = np.lexsort((ids, keys))
+        keys, ids = keys[order], ids[order]
+        is_first = np.ones(keys.shape[0], dtype=bool)
+        is_first[1:] = (keys[1:] != keys[:-1]) | (ids[1:] != ids[:-1])
+        keys, ids = keys[is_first], ids[is_first]
+        key_starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])) if keys.shape[0] else keys
+        self.keys: np.ndarray = keys[key_starts]
+        self.offsets: np.ndarray = np.append(key_starts, keys.shape[0])
+        self.postings: np.ndarray = ids
+
+    def string_ids(self, text: str) -> np.ndarray:
+        """
+        Returns the ids of the distinct strings containing text (which must already be upper case).
+        """
+        if self._last_matches is not None and self._last_text and self._last_text in text:
+            # anything containing the new text also contains the previous one
+            candidates = self._last_matches
+        elif len(text) < 3:
+            candidates = None
+        else:
+            candidates = None
+            for key in trigram_keys(text):
+                pos = np.searchsorted(self.keys, key)
+                if pos == self.keys.shape[0] or self.keys[pos] != key:
+                    candidates = np.empty(0, dtype=np.int32)
+                    break
+                posting = self.postings[self.offsets[pos]:self.offsets[pos + 1]]
+                candidates = posting if candidates is None else np.intersect1d(candidates, posting, assume_unique=True)
+                if not candidates.shape[0]:
+                    break
+            candidates = np.union1d(candidates, self.unindexed)
+        if candidates is None:
+            strings = self.strings
+            candidates = np.arange(strings.shape[0])
+        else:
+            strings = self.strings[candidates]
+        matches = candidates[pd.Series(strings, dtype=object).str.contains(text, regex=False).to_numpy(dtype=bool)]
+        self._last_text = text
+        self._last_matches = matches
+        return matches
+
+    def match(self, text: str, first_row: int = 0, end_row: int = None) -> np.ndarray:
+        """
+        Works out which rows' display strings contain text (ignoring case).
+        Args:
+            text: (str) the text to search for
+            first_row: (int) the first row to check
+            end_row: (int) the row to stop before (default: the last row of the index)
+        Returns:
+            (ndarray) a boolean array for the rows first_row to end_row
+        """
+        is_match = np.zeros(self.strings.shape[0], dtype=bool)
+        is_match[self.string_ids(text.upper())] = True
+        return is_match[self.codes[first_row:end_row]]
+
+    def update_rows(self, first_row: int, display_strings: np.ndarray) -> bool:
+        """
+        Codes rows again after they were edited, or codes rows appended to the model.
+        Args:
+            first_row: (int) the first row to code
+            display_strings: (ndarray) the display strings of the rows from first_row on
+        Returns:
+            (bool) False if too many new strings were added since the index was built (it should be built again)
+        """
+        if self._ids is None:
+            self._ids = dict(zip(self.strings, range(self.strings.shape[0])))
+        upper = pd.Series(display_strings, dtype=object).str.upper().to_numpy(dtype=object)
+        new_strings = [string for string in dict.fromkeys(upper) if string not in self._ids]
+        if new_strings:
+            if self.added_count + len(new_strings) > MAX_UNINDEXED_STRINGS:
+                return False
+            self.added_count += len(new_strings)
+            first_id = self.strings.shape[0]
+            self._ids.update(zip(new_strings, range(first_id, first_id + len(new_strings))))
+            self.strings = np.concatenate([self.strings, np.array(new_strings, dtype=object)])
+            self.unindexed = np.append(self.unindexed, np.arange(first_id, self.strings.shape[0], dtype=np.int32))
+            self._last_matches = None
+        end_row = first_row + upper.shape[0]
+        if end_row > self.codes.shape[0]:
+            self.codes = np.concatenate([self.codes, np.empty(end_row - self.codes.shape[0], dtype=np.int32)])
+        self.codes[first_row:end_row] = np.fromiter(
+            (self._ids[string] for string in upper), dtype=np.int32, count=upper.shape[0]
+        )
+        return True
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """
+        Takes (sorted, unique) rows out of the index. The distinct strings are kept.
+        """
+        self.codes = np.delete(self.codes, rows)
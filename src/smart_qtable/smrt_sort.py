@@ -0,0 +1,176 @@
+import numpy as np
+import pandas as pd
+
+import math
+import numbers
+import typing
+
+
+def _mixed_key(value: typing.Any) -> tuple:
+    # numbers sort together (whatever their type), anything else is grouped by type
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return 0, "", value
+    return 1, type(value).__name__, value
+
+
+def dense_ranks(values: np.ndarray) -> np.ndarray:
+    """
+    Ranks the values from 0 (the smallest) to the number of unique values - 1. Equal values share a rank.
+    Args:
+        values: (ndarray) the values to rank, without nulls
+    Returns:
+        (ndarray) an int64 array with the rank of each value
+    """
+    try:
+        codes, _ = pd.factorize(values, sort=True)
+        return codes.astype(np.int64, copy=False)
+    except TypeError:
+        pass
+    # values that cannot be compared with each other (i.e. numbers and dates in one object column)
+    codes, uniques = pd.factorize(values, sort=False)
+    try:
+        order = sorted(range(len(uniques)), key=lambda pos: _mixed_key(uniques[pos]))
+    except TypeError:
+        order = sorted(range(len(uniques)), key=lambda pos: (type(uniques[pos]).__name__, str(uniques[pos])))
+    ranks = np.empty(len(uniques), dtype=np.int64)
+    ranks[order] = np.arange(len(uniques), dtype=np.int64)
+    return ranks[codes]
+
+
+def null_ranks(values: np.ndarray, null_mask: np.ndarray) -> np.ndarray:
+    """
+    Ranks the values of a column with dense_ranks, giving every null a rank of -1 so nulls sort before any value.
+    """
+    ranks = np.full(values.shape[0], -1, dtype=np.int64)
+    not_null = ~null_mask
+    ranks[not_null] = dense_ranks(values[not_null])
+    return ranks
+
+
+def sort_rows(keys: list[np.ndarray], descending: list[bool]) -> np.ndarray:
+    """
+    Works out the order of the rows for a multi column sort in one (stable) pass.
+    Args:
+        keys: (list[ndarray]) the integer sort ranks of each column, the primary sort column first
+        descending: (list[bool]) whether each column is sorted in descending order
+    Returns:
+        (ndarray) the row numbers in sorted order. Rows that tie on every key keep their original order.
+    """
+    # ranks are flipped rather than the result reversed, so ties stay in their original order when descending
+    sort_keys = []
+    for key, desc in zip(keys, descending):
+        if not len(key):
+            return np.empty(0, dtype=np.int64)
+        key_min, key_max = int(key.min()), int(key.max())
+        sort_keys.append((key_max - key if desc else key - key_min, key_max - key_min + 1))
+    if len(sort_keys) == 1:
+        return np.argsort(sort_keys[0][0], kind="stable")
+    if math.prod(span for _, span in sort_keys) < np.iinfo(np.int64).max:
+        # the ranks of every column fit into a single int64, which sorts much faster than a lexsort
+        combined = np.zeros(sort_keys[0][0].shape[0], dtype=np.int64)
+        for key, span in sort_keys:
+            combined *= span
+            combined += key
+        return np.argsort(combined, kind="stable")
+    # np.lexsort treats its last key as the primary one
+    return np.lexsort([key for key, _ in sort_keys[::-1]])
+
+
+def reverse_order(order: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """
+    Turns a stable ascending order of the rows into a stable descending one, without sorting again: the order is
+    reversed and each run of equal ranks is flipped back, so tied rows keep their original order.
+    Args:
+        order: (ndarray) the row numbers sorted (stably) by ascending rank
+        ranks: (ndarray) the rank of every row
+    Returns:
+        (ndarray) the row numbers sorted (stably) by descending rank
+    """
+    reversed_order = order[::-1]
+    row_count = reversed_order.shape[0]
+    if not row_count:
+        return reversed_order.copy()
+    sorted_ranks = ranks[reversed_order]
+    starts = np.flatnonzero(np.concatenate([[True], sorted_ranks[1:] != sorted_ranks[:-1]]))
+    ends = np.concatenate([starts[1:], [row_count]])
+    group_starts = np.repeat(starts, ends - starts)
+    group_ends = np.repeat(ends - 1, ends - starts)
+    return reversed_order[group_starts + group_ends - np.arange(row_count)]
+
+
+class SmartSortCache:
+    """
+    Caches the sort ranks of the columns of a SmartDataModel, and the ascending order of the rows for each column
+    sorted on its own, so switching between sort columns only ranks a column the first time it is sorted on.
+
+    A multi column sort is then a sort over small integers, and sorting on one column is a cached argsort (reversed
+    for a descending sort). Each column is computed lazily and invalidated on its own when it is edited.
+    """
+
+    def __init__(self):
+        self._ranks: dict[int, np.ndarray] = {}
+        self._orders: dict[int, np.ndarray] = {}
+        # the model's data_version when each column was ranked
+        self._versions: dict[int, int] = {}
+
+    def reset(self) -> None:
+        self._ranks.clear()
+        self._orders.clear()
+        self._versions.clear()
+
+    def ranks(self, renderer: typing.Any, data_version: int) -> np.ndarray:
+        """
+        Returns the sort ranks of the renderer's column (see SmartCellRenderer.sort_keys), ranking it if needed.
+        """
+        col_ranks = self._ranks.get(renderer.col, None)
+        if col_ranks is None:
+            col_ranks = renderer.sort_keys()
+            if len(col_ranks):
+                # shifted to start at 0 so the ranks fit in an int32 (there are never more ranks than rows)
+                col_ranks = (col_ranks - col_ranks.min()).astype(np.int32)
+            self._ranks[renderer.col] = col_ranks
+            self._versions[renderer.col] = data_version
+        return col_ranks
+
+    def ascending_order(self, renderer: typing.Any, data_version: int) -> np.ndarray:
+        order = self._orders.get(renderer.col, None)
+        if order is None:
+            order = np.argsort(self.ranks(renderer, data_version), kind="stable")
+            self._orders[renderer.col] = order
+        return order
+
+    def sort_rows(self, renderers: list[typing.Any], descending: list[bool], data_version: int) -> np.ndarray:
+        """
+        Works out the order of the rows for a sort on the renderers' columns (the primary sort column first).
+        """
+        if len(renderers) == 1:
+            order = self.ascending_order(renderers[0], data_version)
+            if descending[0]:
+                return reverse_order(order, self._ranks[renderers[0].col])
+            return order.copy()
+        return sort_rows([self.ranks(renderer, data_version) for renderer in renderers], descending)
+
+    def invalidate_column(self, col: int, data_version: int = None) -> None:
+        """
+        Drops the cached ranks of a column, unless they were worked out at the given data_version (i.e. the rows
+        were only re-filtered, not edited).
+        """
+        if data_version is not None and self._versions.get(col, None) == data_version:
+            return
+        self._ranks.pop(col, None)
+        self._orders.pop(col, None)
+        self._versions.pop(col, None)
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """
+        Takes (sorted, unique) rows removed from the model out of the cache. The ranks of the remaining rows
+        still order them correctly.
+        """
+        for col, col_ranks in self._ranks.items():
+            is_removed = np.zeros(col_ranks.shape[0], dtype=bool)
+            is_removed[rows] = True
+            self._ranks[col] = col_ranks[~is_removed]
+            order = self._orders.get(col, None)
+            if order is not None:
+                order = order[~is_removed[order]]
+                self._orders[col] = order - np.searchsorted(rows, order)
@@ -287,10 +287,33 @@ class SmartSummaryWidget(QtWidgets.QWidget):
 
         attr_widget.selected_val = new_val
 
+    def set_partial_data(self, partial_data: bool) -> None:
+        # lazy tables only summarize the rows that have been loaded so far
+        self.lbl_partial_data.setVisible(partial_data)
+
+    def add_to_attr_total(self, attr_name: str, delta: int | float):
+        attr_widget = self.find_attr_widget(attr_name)
+        attr_widget.total_val = attr_widget.total_val + delta
+
+    def add_to_attr_filtered(self, attr_name: str, delta: int | float):
+        attr_widget = self.find_attr_widget(attr_name)
+        attr_widget.filtered_val = attr_widget.filtered_val + delta
+
+    def find_attr_widget(self, attr_name: str) -> AttrSummaryWidget:
+        for attr_widget in self.attr_widgets:
+            if attr_widget.attr_name.lower() == attr_name.lower():
+                return attr_widget
+
+        raise ValueError(f'The desired attribute widget could not be located for name: {attr_name}')
+
     def setup_summary_widget_ui(self):
         self.setObjectName('smart_summary_widget')
         self.main_layout = QtWidgets.QHBoxLayout(self)
         self.main_layout.setSpacing(2)
         self.main_layout.setContentsMargins(0, 0, 0, 0)
+        self.lbl_partial_data = QtWidgets.QLabel(f'({smrt_consts.PARTIAL_DATA_TXT})', parent=self)
+        self.lbl_partial_data.setObjectName('lbl_partial_data')
+        self.lbl_partial_data.setVisible(False)
+        self.main_layout.addWidget(self.lbl_partial_data)
         self.setLayout(self.main_layout)
 
@@ -1,4 +1,5 @@
 from PyQt6 import QtCore, QtWidgets, QtGui, QtPrintSupport
+import numpy as np
 import pandas as pd
 import win32com.client
 
@@ -23,6 +24,7 @@ from frameless_dialog import frmls_msgbx
 from smart_qtable import smrt_summary_widget
 from smart_qtable import smrt_proxy_model
 from smart_qtable import smrt_dataframe
+from smart_qtable import smrt_dates
 
 
 class SmartTable(QtWidgets.QWidget):
@@ -62,7 +64,9 @@ class SmartTable(QtWidgets.QWidget):
                 table_name: (str) an optional name for this table (default = 'Table_{id}')
                 data_df: (Dataframe) initial table data (default = empty dataframe with columns derived by the dtypes
                     keys)
-                table_flags: (SmartTableFlags) any SmartTableFlags set for this table (default = NO_FLAGS)
+                table_flags: (SmartTableFlags) any SmartTableFlags set for this table (default = NO_FLAGS). With
+                    ITERATIVE_REFRESH, assigning smrt_df only updates the rows that changed and keeps the sorting,
+                    filters and selection.
                 editors: (dict[str, QStyledItemDelegate]) a dictionary mapping column names to specified item
                     delegates (default = empty dict)
                 table_mode: (SmartTableMode) the specified mode for this table (default = DATA_MODE)
@@ -78,6 +82,14 @@ class SmartTable(QtWidgets.QWidget):
                     is false, where the max is then 3 columns. (default = empty list)
                 sum_record_count: (bool) flag to indicate whether to summarize the total number of records in the table.
                     This counts as 1 of the 3 max summary columns for the table. (default = True)
+                display_cache: (bool) format each column's display strings once and serve them from a cache rather
+                    than formatting every cell on every paint. Recommended for large tables. (default = False)
+                row_provider: (Callable | Iterable) makes the table lazy - rows are pulled in chunks as the user
+                    scrolls. Either a callable taking (first_row, row_count) that returns a DataFrame (empty/None
+                    when exhausted) or an iterable of DataFrame chunks. Summaries and filter lists only cover the
+                    rows loaded so far. (default = None)
+                fetch_chunk_size: (int) the number of rows requested from a callable row_provider at a time
+                    (default = DEFAULT_FETCH_CHUNK_SIZE)
         """
 
         usr_data_path = os.getenv('USR_DATA_PATH')
@@ -102,6 +114,11 @@ class SmartTable(QtWidgets.QWidget):
         self.view_dict: dict[str, smrt_tbl_view.SmartTableView] = {}
         self.flag_respond_to_view_cmb: bool = False
         self.flag_respond_to_col_move: bool = True
+        self.flag_respond_to_data_changes: bool = True
+        # model changes often arrive as bursts of signals, so the summaries are recalculated once per burst
+        self.summary_update_timer = QtCore.QTimer(self)
+        self.summary_update_timer.setSingleShot(True)
+        self.summary_update_timer.setInterval(0)
         self.flag_excel_available: bool = True
         self.table_hdr = smrt_hdr_view.ExcelHeaderView(parent=self.table_view, sections_moveable=True)
         self.table_model = QtCore.QAbstractTableModel = None
@@ -164,6 +181,9 @@ class SmartTable(QtWidgets.QWidget):
             smrt_df=smrt_df,
             editable_cols=list(self.editors.keys()),
             col_value_attrs=self.col_value_attrs,
+            display_cache=kwargs.get('display_cache', False),
+            row_provider=kwargs.get('row_provider', None),
+            fetch_chunk_size=kwargs.get('fetch_chunk_size', smrt_consts.DEFAULT_FETCH_CHUNK_SIZE),
             parent=self
         )
         self.proxy_model = smrt_proxy_model.SmartProxyModel(parent=self)
@@ -205,6 +225,7 @@ class SmartTable(QtWidgets.QWidget):
         self.btn_print_export.triggered.connect(self.on_print_table_btn)
         self.btn_custom_sort.triggered.connect(self.on_adv_sort_dialog_btn)
         self.btn_clear_filter.triggered.connect(self.on_clr_filters_button)
+        self.line_edit_search.textChanged.connect(self.on_search_text_changed)
         self.btn_custom_filter.triggered.connect(self.on_advanced_filter_button)
         self.btn_export_excel.triggered.connect(self.on_export_to_excel_button)
         self.table_sel_model.selectionChanged.connect(self.on_selection_changed)
@@ -215,12 +236,11 @@ class SmartTable(QtWidgets.QWidget):
         self.proxy_model.signal_sort_changed.connect(self.draw_column_icons)
         self.proxy_model.signal_hidden_columns_changed.connect(self.draw_column_icons)
         self.table_view.doubleClicked.connect(self.on_cell_double_clicked)
-        self.table_model.dataChanged.connect(self.update_summary_totals)
-        self.table_model.dataChanged.connect(self.update_summary_selected)
-        self.table_model.dataChanged.connect(self.update_filter_totals)
-        self.table_model.rowsRemoved.connect(self.update_summary_totals)
-        self.table_model.rowsRemoved.connect(self.update_summary_selected)
-        self.table_model.rowsRemoved.connect(self.update_filter_totals)
+        self.summary_update_timer.timeout.connect(self.update_all_summaries)
+        self.table_model.dataChanged.connect(self.on_model_data_changed)
+        self.table_model.rowsRemoved.connect(self.on_model_data_changed)
+        self.table_model.rowsInserted.connect(self.on_model_data_changed)
+        self.table_model.signal_all_rows_fetched.connect(self.on_model_data_changed)
 
         self.set_current_view(self.default_view)
 
@@ -238,11 +258,20 @@ class SmartTable(QtWidgets.QWidget):
 
     @property
     def smrt_df(self) -> smrt_dataframe.SmartDataFrame:
+        if self.table_model is not None:
+            # rows streamed in with append_rows are merged into the dataframe when it is next needed
+            self.table_model.sync_data_df()
         return self.__smrt_df
 
     @smrt_df.setter
     def smrt_df(self, new_smrt_df: smrt_dataframe.SmartDataFrame) -> None:
 
+        if self.table_flags & smrt_consts.SmartTableFlags.ITERATIVE_REFRESH:
+            if self.refresh_smrt_df(new_smrt_df):
+                return
+            self.logger.info(f'{self.table_name}: the new data could not be diffed against the current data. '
+                             f'The table will be reset.')
+
         self.__smrt_df = new_smrt_df
         self.proxy_model.clear_sort()
         self.proxy_model.clear_filters()
@@ -254,6 +283,63 @@ class SmartTable(QtWidgets.QWidget):
         self.set_current_view(self.current_view)
         self.update_summary_totals()
 
+    def refresh_smrt_df(self, new_smrt_df: smrt_dataframe.SmartDataFrame) -> bool:
+        """
+        Updates the table with new data, only touching the rows that were removed, inserted or changed (matched by
+        index label). Sorting, filters and the selection are kept. Used by the smrt_df setter when the table has
+        the ITERATIVE_REFRESH flag.
+        Args:
+            new_smrt_df: (SmartDataFrame) the refreshed data
+        Returns:
+            (bool) False if the data could not be diffed (i.e. the columns changed) and nothing was done
+        """
+        # the summaries are updated once at the end rather than for every removed/changed run of rows
+        self.flag_respond_to_data_changes = False
+        try:
+            refreshed = self.table_model.refresh_smrt_df(new_smrt_df)
+        finally:
+            self.flag_respond_to_data_changes = True
+        if not refreshed:
+            return False
+
+        self.__smrt_df = new_smrt_df
+        self.refresh_dt = new_smrt_df.refresh_dt
+        self.on_selection_changed(QtCore.QItemSelection(), QtCore.QItemSelection())
+        self.update_summary_totals()
+        self.update_filter_totals()
+        return True
+
+    def append_rows(self, chunk_df: pd.DataFrame) -> None:
+        """
+        Appends new rows to the table without resetting it (i.e. for live feeds). Sorting, filters and the
+        selection are kept; the new rows are filtered and sorted into place and only their values are added to
+        the summary totals.
+        Args:
+            chunk_df: (DataFrame) the new rows, with the same columns as the table and new index labels
+        """
+        if chunk_df is None or chunk_df.empty:
+            return
+        first_row = self.table_model.rowCount()
+        self.flag_respond_to_data_changes = False
+        try:
+            self.table_model.append_rows(chunk_df)
+        finally:
+            self.flag_respond_to_data_changes = True
+        # (selection changes made while the rows went in were ignored)
+        self.on_selection_changed(QtCore.QItemSelection(), QtCore.QItemSelection())
+
+        accepted = self.proxy_model.rows_accepted(first_row, self.table_model.rowCount() - 1)
+        filtered = bool(self.proxy_model.table_filters or self.proxy_model.search_text)
+        for col in self.summary_columns:
+            if col.name.lower() == smrt_consts.RECORD_COUNT_NAME.lower():
+                self.summary_widget.add_to_attr_total(col.name, chunk_df.shape[0])
+                if filtered:
+                    self.summary_widget.update_attr_filtered(col.name, self.proxy_model.rowCount())
+                continue
+            self.summary_widget.add_to_attr_total(col.name, chunk_df[col.name].sum())
+            if filtered and col.name in self.current_view.col_order:
+                self.summary_widget.add_to_attr_filtered(col.name, chunk_df[col.name][accepted].sum())
+
     def start_refresh_btn_animation(self):
         self.btn_refresh_data.start()
 
@@ -403,80 +489,120 @@ class SmartTable(QtWidgets.QWidget):
             self.toolbar_table_actions.addWidget(spcr)
 
     def on_selection_changed(self, selected: QtCore.QItemSelection, deselected: QtCore.QItemSelection):
-        self.selected_idxs.clear()
-        for idx in self.table_sel_model.selectedRows():
-            model_idx = self.proxy_model.mapToSource(idx)
-            df_idx = self.smrt_df.data_df.iloc[model_idx.row()].name
-            self.selected_idxs.append(df_idx)
+        if not self.flag_respond_to_data_changes:
+            return
+        # rows are always selected whole, so the selected ranges map straight onto the proxy's row mapping
+        rows = self.proxy_model.source_rows_for_selection(self.table_sel_model.selection())
+        labels = self.table_model.row_index.labels
+        self.selected_idxs = [labels[row] for row in rows.tolist()]
         self.update_summary_selected()
 
+    def on_model_data_changed(self):
+        if not self.flag_respond_to_data_changes:
+            return
+        self.summary_update_timer.start()
+
+    def update_all_summaries(self):
+        self.update_summary_totals()
+        self.update_summary_selected()
+        self.update_filter_totals()
+
     def get_value_at_idx_and_col(self, idx: typing.Any, col_name: str):
-        return self.smrt_df.data_df.loc[idx, col_name]
+        # (the first row with the label, if the index is not unique)
+        return self.table_model.col_store.value(
+            self.table_model.row_index.position(idx), self.table_model.col_store.col_names.index(col_name)
+        )
+
+    def sum_rows(self, col_name: str, rows: np.ndarray) -> typing.Any:
+        """
+        Returns the total of a column over the given model rows. Nulls count as 0.
+        """
+        col_store = self.table_model.col_store
+        buffer = col_store.buffers[col_store.col_names.index(col_name)]
+        rows = rows[~buffer.null_mask[rows]]
+        if not len(rows):
+            return 0
+        return buffer.values[rows].sum()
+
+    def column_total(self, col_name: str) -> typing.Any:
+        """
+        Returns the total of a column over every row of the table (rows waiting to be compacted away are left
+        out). Nulls count as 0. The total is read from the column store, so rows streamed in with append_rows or
+        fetchMore are not merged into the dataframe for it.
+        """
+        col_store = self.table_model.col_store
+        buffer = col_store.buffers[col_store.col_names.index(col_name)]
+        counted = ~buffer.null_mask
+        if self.table_model.tombstone_mask is not None:
+            counted &= ~self.table_model.tombstone_mask
+        return buffer.values[counted].sum()
+
+    def record_count(self) -> int:
+        # the rows of the table, from the column store (see column_total)
+        row_count = self.table_model.col_store.row_count
+        if self.table_model.tombstone_mask is not None:
+            row_count -= int(self.table_model.tombstone_mask.sum())
+        return row_count
 
     def update_summary_selected(self):
         if not self.summary_columns:
             return
 
+        # (the smrt_df property would merge any streamed rows into the dataframe first)
+        no_data = self.__smrt_df.data_df is None
         for col in self.summary_columns:
-            if self.smrt_df.data_df is None:
+            if no_data:
                 self.summary_widget.update_attr_selected(col.name, 0)
             elif col.name.lower() == smrt_consts.RECORD_COUNT_NAME.lower():
-                self.summary_widget.update_attr_selected(col.name, len(self.table_sel_model.selectedRows()))
+                selected_count = len(self.selected_idxs) if self.table_sel_model.hasSelection() else 0
+                self.summary_widget.update_attr_selected(col.name, selected_count)
             elif col.name in self.current_view.hidden_cols:
                 self.summary_widget.update_attr_selected(col.name, 0)
             else:
-                if not self.table_sel_model.selectedRows():
+                if not self.table_sel_model.hasSelection():
                     self.summary_widget.update_attr_selected(col.name, 0)
                 else:
-                    total = 0
-                    for idx in self.selected_idxs:
-                        val = self.smrt_df.data_df.loc[idx, col.name]
-                        if pd.isnull(val):
-                            val = 0
-                        total += val
+                    rows = self.table_model.row_index.get_indexer(self.selected_idxs)
+                    total = self.sum_rows(col.name, rows[rows >= 0])
                     self.summary_widget.update_attr_selected(col.name, total)
 
     def update_summary_totals(self):
         if not self.summary_columns:
             return
 
+        self.summary_widget.set_partial_data(not self.table_model.all_rows_fetched)
+        no_data = self.__smrt_df.data_df is None
         for col in self.summary_columns:
-            if self.smrt_df.data_df is None:
+            if no_data:
                 self.summary_widget.update_attr_total(col.name, 0)
             else:
                 if col.name.lower() == smrt_consts.RECORD_COUNT_NAME.lower():
-                    self.summary_widget.update_attr_total(col.name, self.smrt_df.data_df.shape[0])
+                    self.summary_widget.update_attr_total(col.name, self.record_count())
                 else:
-                    self.summary_widget.update_attr_total(col.name, self.smrt_df.data_df[col.name].sum())
+                    self.summary_widget.update_attr_total(col.name, self.column_total(col.name))
 
     def update_filter_totals(self):
         if not self.summary_columns:
             return
 
+        no_data = self.__smrt_df.data_df is None
         for col in self.summary_columns:
-            if self.smrt_df.data_df is None:
+            if no_data:
                 self.summary_widget.update_attr_filtered(col.name, 0)
-            elif not self.proxy_model.table_filters:
+            elif not self.proxy_model.table_filters and not self.proxy_model.search_text:
                 self.summary_widget.update_attr_filtered(col.name, 0)
             elif col.name.lower() == smrt_consts.RECORD_COUNT_NAME.lower():
                 self.summary_widget.update_attr_filtered(col.name, self.proxy_model.rowCount())
             elif col.name not in self.current_view.col_order:
                 self.summary_widget.update_attr_filtered(col.name, 0)
             else:
-                col_num = self.current_view.col_order.index(col.name)
-                tot_val = 0
-                for row_num in range(self.proxy_model.rowCount()):
-                    df_row = self.proxy_model.mapToSource(self.proxy_model.index(row_num, 0)).row()
-                    df_idx = self.smrt_df.data_df.iloc[df_row].name
-                    val = self.smrt_df.data_df.loc[df_idx, col.name]
-                    if pd.isnull(val):
-                        val = 0
-                    tot_val += val
+                tot_val = self.sum_rows(col.name, self.proxy_model.accepted_source_rows())
                 self.summary_widget.update_attr_filtered(col.name, tot_val)
 
     def create_data_view(self) -> pd.DataFrame:
 
-        data_view = self.smrt_df.data_df.copy(deep=True)
+        # the rows the proxy shows (every filter and the quick search applied)
+        data_view = self.smrt_df.data_df.iloc[self.proxy_model.accepted_source_rows()]
 
         data_view = data_view.loc[:, self.current_view.col_order]
 
@@ -492,20 +618,10 @@ class SmartTable(QtWidgets.QWidget):
             data_view = data_view.sort_values(
                 by=cols,
                 ascending=sort_orders,
-                na_position='last'
+                na_position='last',
+                kind='stable'
             )
 
-        # apply the dataframe filters
-        if self.proxy_model.table_filters:
-            for col_name, df_filter in self.proxy_model.table_filters.items():
-                if None in df_filter:
-                    df_filter.remove(None)
-                    filt = pd.isnull(data_view[col_name]) | data_view[col_name].isin(df_filter)
-                    df_filter.append(None)
-                else:
-                    filt = data_view[col_name].isin(df_filter)
-                data_view = data_view[filt]
-
         return data_view
 
     @QtCore.pyqtSlot()
@@ -717,8 +833,13 @@ class SmartTable(QtWidgets.QWidget):
 
     @QtCore.pyqtSlot()
     def on_clr_filters_button(self):
+        self.line_edit_search.clear()
         self.proxy_model.clear_filters()
 
+    @QtCore.pyqtSlot(str)
+    def on_search_text_changed(self, text: str):
+        self.proxy_model.set_search_text(text.strip())
+
     @QtCore.pyqtSlot()
     def on_export_to_excel_button(self, **kwargs):
         if self.smrt_df.data_df is None or self.smrt_df.data_df.shape[0] == 0:
@@ -810,21 +931,14 @@ class SmartTable(QtWidgets.QWidget):
         if x_pos + filt_width > max_x:
             x_pos = max_x - filt_width
         self.filter_dialog.setGeometry(x_pos, y_pos, filt_width, filt_height)
-        temp_filters = self.proxy_model.table_filters.copy()
-        if col_name in temp_filters:
-            del temp_filters[col_name]
-            # temp_filters.pop(col_name)
-
-        filtered_df = self.smrt_df.data_df.copy(deep=True)
-        if temp_filters:
-            for cn, df_filter in temp_filters.items():
-                if None in df_filter:
-                    df_filter.remove(None)
-                    filt = pd.isnull(filtered_df[cn]) | filtered_df[cn].isin(df_filter)
-                    df_filter.append(None)
-                else:
-                    filt = filtered_df[cn].isin(df_filter)
-                filtered_df = filtered_df[filt]
+        # the column's values in the rows passing every other filter, their (cached) sorted unique values and how
+        # often each occurs in those rows
+        column = self.smrt_df.data_df[col_name]
+        column_data = column[self.proxy_model.other_filters_mask(col_name)]
+        unique_values = self.proxy_model.column_uniques(
+            column, descending=self.smrt_df.dtypes[col_name] in smrt_dates.DATE_TYPES
+        )
+        value_counts = self.proxy_model.value_counts_for(col_name, unique_values)
 
         # show the filter window
         if self.smrt_df.dtypes[col_name] == smrt_consts.SmartDataTypes.DATE_TIME:
@@ -838,13 +952,16 @@ class SmartTable(QtWidgets.QWidget):
 
         value_attrs = self.col_value_attrs.get(col_name, smrt_consts.SmartValueAttributes())
         accepted = self.filter_dialog.show_window(
-            column_data=filtered_df[col_name],
+            column_data=column_data,
             column_name=col_name,
             dtype=self.smrt_df.dtypes[col_name],
             current_filter=curr_filter,
             current_sort_order=curr_sort,
             time_resolution=time_res,
-            value_attrs=value_attrs
+            value_attrs=value_attrs,
+            partial_data=not self.table_model.all_rows_fetched,
+            unique_values=unique_values,
+            value_counts=value_counts,
         )
         self.logger.debug(f'Accepted? {accepted}')
         if accepted and self.filter_dialog.action_requested == smrt_consts.SmartFilterAction.NEW_FILTER:
@@ -1028,6 +1145,12 @@ class SmartTable(QtWidgets.QWidget):
         self.btn_clear_filter.setIcon(QtGui.QIcon(':/clear_filter.PNG'))
         self.btn_clear_filter.setToolTip('Clear ALL Filters')
         self.toolbar_default.addAction(self.btn_clear_filter)
+        self.line_edit_search = QtWidgets.QLineEdit(self.toolbar_default)
+        self.line_edit_search.setPlaceholderText('Search')
+        self.line_edit_search.setClearButtonEnabled(True)
+        self.line_edit_search.setToolTip('Show the rows containing this text in any column')
+        self.line_edit_search.setMaximumWidth(200)
+        self.toolbar_default.addWidget(self.line_edit_search)
         spcr7 = QtWidgets.QWidget(self.toolbar_default)
         spcr7.setSizePolicy(QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Preferred)
         self.toolbar_default.addWidget(spcr7)
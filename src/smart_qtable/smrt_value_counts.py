@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+import typing
+
+# the code of a null value
+NULL_CODE = -1
+
+
+class SmartValueCounts:
+    """
+    How many times each value of one column of a SmartColumnStore occurs among a subset of its rows (for the header
+    filter popup, the rows passing every other column's filter).
+
+    The column is dictionary coded once: each distinct value gets a code and every row holds the code of its value.
+    The counts are a bincount of the codes of the counted rows, so counting a new subset of rows (after the other
+    filters changed) re-uses the codes. Edits, appends and removals adjust the counts for just the rows involved.
+    """
+
+    def __init__(self, uniques: pd.Index, codes: np.ndarray, dtype: np.dtype):
+        # the distinct values in the order they were first seen, and the code (position in uniques) of every row
+        self.uniques = uniques
+        self.codes = codes
+        # the dtype of the column's values when it was coded
+        self.dtype = dtype
+        # the rows counted, and the number of counted rows per code (with the counted nulls kept apart)
+        self.counted: np.ndarray = np.zeros(codes.shape[0], dtype=bool)
+        self.counts: np.ndarray = np.zeros(len(uniques), dtype=np.int64)
+        self.null_count: int = 0
+        # what the counted rows were worked out from (see SmartProxyModel.other_filters_key), None before counting
+        self.filter_key: typing.Optional[tuple] = None
+
+    @classmethod
+    def build(cls, values: np.ndarray, null_mask: np.ndarray) -> typing.Optional["SmartValueCounts"]:
+        """
+        Codes a column's values. Returns None if the column holds values that cannot be hashed.
+        """
+        try:
+            codes, uniques = pd.factorize(values[~null_mask])
+        except TypeError:
+            return None
+        all_codes = np.full(values.shape[0], NULL_CODE, dtype=np.int32)
+        all_codes[~null_mask] = codes
+        return cls(pd.Index(uniques), all_codes, values.dtype)
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def is_valid_for(self, values: np.ndarray) -> bool:
+        return values.dtype == self.dtype and values.shape[0] >= self.codes.shape[0]
+
+    def _bincount(self, codes: np.ndarray) -> tuple[np.ndarray, int]:
+        # the number of times each (non null) code occurs, and the number of nulls
+        is_null = codes == NULL_CODE
+        return np.bincount(codes[~is_null], minlength=len(self.uniques)), int(is_null.sum())
+
+    def recount(self, counted: np.ndarray, filter_key: tuple = None) -> None:
+        """
+        Counts the values of a new subset of the rows.
+        Args:
+            counted: (ndarray) a boolean array saying which rows to count
+            filter_key: (tuple) what the subset was worked out from
+        """
+        self.counted = counted.copy()
+        self.counts, self.null_count = self._bincount(self.codes[self.counted])
+        self.filter_key = filter_key
+
+    def code_values(self, values: np.ndarray, null_mask: np.ndarray) -> typing.Optional[np.ndarray]:
+        # the codes of the given values, adding the ones not seen yet. None for values that cannot be hashed.
+        codes = np.full(values.shape[0], NULL_CODE, dtype=np.int32)
+        not_null = ~null_mask
+        try:
+            value_codes = self.uniques.get_indexer(values[not_null])
+            is_new = value_codes < 0
+            if is_new.any():
+                new_codes, new_uniques = pd.factorize(values[not_null][is_new])
+                value_codes[is_new] = new_codes + len(self.uniques)
+                self.uniques = self.uniques.append(pd.Index(new_uniques))
+                self.counts = np.concatenate([self.counts, np.zeros(len(new_uniques), dtype=np.int64)])
+        except TypeError:
+            return None
+        codes[not_null] = value_codes
+        return codes
+
+    def update_rows(
+        self,
+        first_row: int,
+        end_row: int,
+        counted: np.ndarray,
+        values: np.ndarray = None,
+        null_mask: np.ndarray = None,
+    ) -> bool:
+        """
+        Adjusts the counts after rows were edited, appended, tombstoned or filtered in or out.
+        Args:
+            first_row: (int) the first row to update
+            end_row: (int) the row to stop before
+            counted: (ndarray) whether each of the rows is counted now
+            values: (ndarray) all of the column's values, to code the rows again (None when their values did not
+                change)
+            null_mask: (ndarray) all of the column's null flags (with values)
+        Returns:
+            (bool) False if the rows could not be coded (the counts should be dropped)
+        """
+        rows = slice(first_row, end_row)
+        old_rows = slice(first_row, min(end_row, self.codes.shape[0]))
+        old_counts, old_nulls = self._bincount(self.codes[old_rows][self.counted[old_rows]])
+        if values is not None:
+            row_codes = self.code_values(values[rows], null_mask[rows])
+            if row_codes is None:
+                return False
+            if end_row > self.codes.shape[0]:
+                extra = end_row - self.codes.shape[0]
+                self.codes = np.concatenate([self.codes, np.empty(extra, dtype=np.int32)])
+                self.counted = np.concatenate([self.counted, np.zeros(extra, dtype=bool)])
+            self.codes[rows] = row_codes
+        self.counted[rows] = counted
+        new_counts, new_nulls = self._bincount(self.codes[rows][counted])
+        self.counts[:old_counts.shape[0]] -= old_counts
+        self.counts += new_counts
+        self.null_count += new_nulls - old_nulls
+        return True
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """
+        Takes (sorted, unique) rows out of the counts. The distinct values are kept.
+        """
+        removed_counts, removed_nulls = self._bincount(self.codes[rows][self.counted[rows]])
+        self.counts -= removed_counts
+        self.null_count -= removed_nulls
+        self.codes = np.delete(self.codes, rows)
+        self.counted = np.delete(self.counted, rows)
+
+    def counts_for(self, values: typing.Union[np.ndarray, pd.Index], null_mask: np.ndarray) -> np.ndarray:
+        """
+        Returns the count of each of the given values (0 for values that are not in the column), nulls getting the
+        null count.
+        """
+        counts = np.zeros(len(values), dtype=np.int64)
+        try:
+            codes = self.uniques.get_indexer(values)
+        except TypeError:
+            codes = np.full(len(values), -1, dtype=np.int64)
+        found = (codes >= 0) & ~null_mask
+        counts[found] = self.counts[codes[found]]
+        counts[null_mask] = self.null_count
+        return counts
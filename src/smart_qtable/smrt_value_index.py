@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+import typing
+
+# columns with more distinct values than this are not indexed (isin is as fast for them)
+MAX_INDEXED_VALUES = 4096
+# a filter on more values than this is looked up value by value instead of OR-ing the bitmaps
+MAX_BITMAPS_PER_FILTER = 16
+# the code of a null value, nulls are indexed like any other value
+NULL_CODE = -1
+
+
+class SmartValueIndex:
+    """
+    An inverted index over one column of a SmartColumnStore: each distinct value of the column, and the nulls, map
+    to a packed bitmap (np.packbits) of the rows holding them. A filter on a set of values is then an OR of a few
+    bitmaps instead of hashing every value of the column again.
+
+    Only columns with at most MAX_INDEXED_VALUES distinct values are indexed (see build). The values are coded once
+    when the index is built; the bitmaps are built the first time a value is filtered on. The index is kept up to
+    date as rows are edited (update_rows), appended (update_rows on the new rows) or removed (remove_rows).
+    """
+
+    def __init__(self, uniques: pd.Index, codes: np.ndarray, dtype: np.dtype):
+        # the distinct values in the order they were first seen, and the code (position in uniques) of every row
+        self.uniques = uniques
+        self.codes = codes
+        # the dtype of the column's values when the index was built
+        self.dtype = dtype
+        # code -> packed bitmap of the rows with the code, built on demand
+        self._bitmaps: dict[int, np.ndarray] = {}
+
+    @classmethod
+    def build(cls, values: np.ndarray, null_mask: np.ndarray) -> typing.Optional["SmartValueIndex"]:
+        """
+        Indexes a column's values. Returns None if the column has too many distinct values, or values that cannot
+        be hashed.
+        """
+        try:
+            codes, uniques = pd.factorize(values[~null_mask])
+        except TypeError:
+            return None
+        if len(uniques) > MAX_INDEXED_VALUES:
+            return None
+        all_codes = np.full(values.shape[0], NULL_CODE, dtype=np.int32)
+        all_codes[~null_mask] = codes
+        return cls(pd.Index(uniques), all_codes, values.dtype)
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    @property
+    def value_count(self) -> int:
+        return len(self.uniques)
+
+    def is_valid_for(self, values: np.ndarray) -> bool:
+        # an edit that changed the column's dtype (i.e. fell back to objects) changes what the values compare equal to
+        return values.dtype == self.dtype and values.shape[0] >= self.codes.shape[0]
+
+    def code_values(self, values: np.ndarray, null_mask: np.ndarray) -> typing.Optional[np.ndarray]:
+        """
+        Returns the codes of the given values, adding the ones not in the index yet. Returns None if that takes the
+        index over MAX_INDEXED_VALUES distinct values.
+        """
+        codes = np.full(values.shape[0], NULL_CODE, dtype=np.int32)
+        not_null = ~null_mask
+        try:
+            value_codes = self.uniques.get_indexer(values[not_null])
+        except TypeError:
+            return None
+        is_new = value_codes < 0
+        if is_new.any():
+            try:
+                new_codes, new_uniques = pd.factorize(values[not_null][is_new])
+            except TypeError:
+                return None
+            if self.value_count + len(new_uniques) > MAX_INDEXED_VALUES:
+                return None
+            value_codes[is_new] = new_codes + self.value_count
+            self.uniques = self.uniques.append(pd.Index(new_uniques))
+        codes[not_null] = value_codes
+        return codes
+
+    def update_rows(self, values: np.ndarray, null_mask: np.ndarray, first_row: int, end_row: int) -> bool:
+        """
+        Codes the rows first_row to end_row (exclusive) again after they were edited or appended, updating the
+        bitmaps built so far.
+        Args:
+            values: (ndarray) all of the column's values
+            null_mask: (ndarray) all of the column's null flags
+            first_row: (int) the first row to code
+            end_row: (int) the row to stop before
+        Returns:
+            (bool) False if the index cannot be kept up to date (it should be dropped)
+        """
+        row_codes = self.code_values(values[first_row:end_row], null_mask[first_row:end_row])
+        if row_codes is None:
+            return False
+        if end_row > self.codes.shape[0]:
+            self.codes = np.concatenate([self.codes, np.empty(end_row - self.codes.shape[0], dtype=np.int32)])
+        self.codes[first_row:end_row] = row_codes
+        # only the bytes of each bitmap that hold the rows are packed again
+        first_byte = first_row // 8
+        end_byte = (end_row + 7) // 8
+        window = self.codes[first_byte * 8:end_byte * 8]
+        for code, bitmap in self._bitmaps.items():
+            packed = np.packbits(window == code)
+            if bitmap.shape[0] < end_byte:
+                bitmap = np.concatenate([bitmap[:first_byte], packed])
+                self._bitmaps[code] = bitmap
+            else:
+                bitmap[first_byte:end_byte] = packed
+        return True
+
+    def remove_rows(self, rows: np.ndarray) -> None:
+        """
+        Takes (sorted, unique) rows out of the index. The bitmaps are built again when they are next needed.
+        """
+        self.codes = np.delete(self.codes, rows)
+        self._bitmaps.clear()
+
+    def bitmap(self, code: int) -> np.ndarray:
+        bitmap = self._bitmaps.get(code, None)
+        if bitmap is None:
+            bitmap = np.packbits(self.codes == code)
+            self._bitmaps[code] = bitmap
+        return bitmap
+
+    def lookup(self, values: list[typing.Any], include_nulls: bool) -> np.ndarray:
+        """
+        Returns the codes of the values that are in the index (plus NULL_CODE for include_nulls).
+        """
+        codes = np.empty(0, dtype=np.int64)
+        if len(values):
+            try:
+                codes = self.uniques.get_indexer(pd.Index(values, tupleize_cols=False))
+            except TypeError:
+                # (values that cannot be compared with the column's, e.g. text against dates, match nothing)
+                codes = np.full(len(values), -1, dtype=np.int64)
+            codes = np.unique(codes[codes >= 0])
+        if include_nulls:
+            codes = np.concatenate([codes, [NULL_CODE]])
+        return codes
+
+    def isin(
+        self, values: list[typing.Any], include_nulls: bool, first_row: int = 0, end_row: int = None
+    ) -> np.ndarray:
+        """
+        Works out which rows hold one of the values (or a null, for include_nulls).
+        Args:
+            values: (list) the values to match, without nulls
+            include_nulls: (bool) whether null rows match
+            first_row: (int) the first row to check
+            end_row: (int) the row to stop before (default: the last row of the index)
+        Returns:
+            (ndarray) a boolean array for the rows first_row to end_row
+        """
+        end_row = self.codes.shape[0] if end_row is None else end_row
+        codes = self.lookup(values, include_nulls)
+        if first_row == 0 and end_row == self.codes.shape[0] and len(codes) <= MAX_BITMAPS_PER_FILTER:
+            packed = np.zeros((end_row + 7) // 8, dtype=np.uint8)
+            for code in codes:
+                packed |= self.bitmap(int(code))
+            return np.unpackbits(packed, count=end_row).astype(bool)
+        # a table of the accepted codes, with the null code at the end (codes[-1] is the last entry)
+        accepted = np.zeros(self.value_count + 1, dtype=bool)
+        accepted[codes] = True
+        return accepted[self.codes[first_row:end_row]]
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from smart_qtable import smrt_column_store
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_data_model
+from smart_qtable import smrt_dataframe
+
+DTYPES = {
+    "Name": smrt_consts.SmartDataTypes.TEXT,
+    "Age": smrt_consts.SmartDataTypes.INT,
+    "Height": smrt_consts.SmartDataTypes.FLOAT,
+    "Employed": smrt_consts.SmartDataTypes.BOOL,
+}
+
+
+def random_frame(row_count: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data_df = pd.DataFrame({
+        "Name": rng.choice(np.array(["Bob", "Alice", "Carol"], dtype=object), row_count),
+        "Age": rng.integers(20, 60, row_count).astype(object),
+        "Height": rng.integers(0, 20, row_count) / 4 + 60,
+        "Employed": rng.integers(0, 2, row_count).astype(bool).astype(object),
+    })
+    for col in data_df.columns:
+        data_df.loc[rng.random(row_count) < 0.1, col] = None
+    return data_df
+
+
+def as_objects(column: pd.Series) -> list:
+    # the column's values with every kind of null as None
+    return [None if pd.isnull(value) else value for value in column.astype(object)]
+
+
+def test_compact_columns_keep_their_values():
+    data_df = random_frame(500)
+    smrt_df = smrt_dataframe.SmartDataFrame(dtypes=dict(DTYPES), data_df=data_df.copy(), compact_memory=True)
+    compacted = smrt_df.data_df
+    assert isinstance(compacted["Name"].dtype, pd.CategoricalDtype)
+    assert str(compacted["Age"].dtype) == "Int8"
+    assert compacted["Height"].dtype == np.float32
+    assert str(compacted["Employed"].dtype) == "boolean"
+    assert smrt_df.memory_report.ratio > 1
+    for col_name in DTYPES:
+        assert as_objects(compacted[col_name]) == as_objects(data_df[col_name])
+
+
+def test_compact_column_leaves_lossy_columns_alone():
+    heights = pd.Series([60.1, 61.3, None])
+    assert smrt_dataframe.compact_column(heights, smrt_consts.SmartDataTypes.FLOAT) is heights
+    ages = pd.Series([20, 21.5, None], dtype=object)
+    assert smrt_dataframe.compact_column(ages, smrt_consts.SmartDataTypes.INT) is ages
+    names = pd.Series([f"name{pos}" for pos in range(10)])
+    assert smrt_dataframe.compact_column(names, smrt_consts.SmartDataTypes.TEXT) is names
+
+
+def compact_buffer(column: pd.Series, dtype: smrt_consts.SmartDataTypes) -> smrt_column_store.SmartColumnBuffer:
+    return smrt_column_store.SmartColumnBuffer.from_series(
+        column.name, dtype, smrt_dataframe.compact_column(column, dtype)
+    )
+
+
+@pytest.mark.parametrize("col_name", ["Name", "Age", "Employed"])
+def test_compact_buffers_read_like_the_column(col_name):
+    column = random_frame(200)[col_name]
+    buffer = compact_buffer(column, DTYPES[col_name])
+    assert buffer.categorical_dtype is not None or buffer.masked_type is not None
+    assert [None if pd.isnull(buffer.get(row)) else buffer.get(row) for row in range(200)] == as_objects(column)
+    assert as_objects(pd.Series(buffer.as_objects())) == as_objects(column)
+    np.testing.assert_array_equal(buffer.null_mask, column.isnull().to_numpy())
+
+
+@pytest.mark.parametrize("col_name, kept_value, other_value", [
+    ("Name", "Carol", "Dave"),
+    ("Age", 41, 1.5),
+    ("Employed", False, "yes"),
+])
+def test_compact_buffers_edit_and_append_like_objects(col_name, kept_value, other_value):
+    column = random_frame(100)[col_name]
+    buffer = compact_buffer(column, DTYPES[col_name])
+    expected = as_objects(column)
+
+    # values the compact dtype holds keep the buffer compact
+    buffer.set_value(3, kept_value)
+    buffer.set_values(np.array([4, 5]), np.array([kept_value, None], dtype=object))
+    expected[3:6] = [kept_value, kept_value, None]
+    buffer.append(smrt_column_store.SmartColumnBuffer.from_series(col_name, DTYPES[col_name], column[:10]))
+    expected += as_objects(column[:10])
+    assert buffer.categorical_dtype is not None or buffer.masked_type is not None
+    assert as_objects(pd.Series(buffer.as_objects())) == expected
+
+    # anything else falls back to plain objects
+    buffer.set_value(6, other_value)
+    expected[6] = other_value
+    assert buffer.categorical_dtype is None and buffer.masked_type is None
+    assert as_objects(pd.Series(buffer.as_objects())) == expected
+    np.testing.assert_array_equal(buffer.null_mask, [value is None for value in expected])
+
+
+def test_compacted_model_shows_the_same_cells(qapp):
+    data_df = random_frame(300)
+    data_df.loc[::7, "Age"] = smrt_consts.SMRT_TBL_BLANK_INT_FLAG
+    models = [
+        smrt_data_model.SmartDataModel(smrt_dataframe.SmartDataFrame(
+            dtypes=dict(DTYPES), data_df=data_df.copy(), compact_memory=compact_memory
+        ))
+        for compact_memory in (False, True)
+    ]
+    # (compaction turns the INT blank flag into a missing value, which is shown and sorted the same way)
+    cells = [
+        [[model.data(model.index(row, col)) for col in range(len(DTYPES))] for row in range(300)] for model in models
+    ]
+    assert cells[0] == cells[1]
+    for col in range(len(DTYPES)):
+        orders = [np.argsort(model.renderers[col].sort_keys(), kind="stable") for model in models]
+        np.testing.assert_array_equal(orders[0], orders[1])
@@ -0,0 +1,153 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import warnings
+
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_data_model
+from smart_qtable import smrt_dataframe
+from smart_qtable import smrt_proxy_model
+
+pytestmark = pytest.mark.usefixtures("qapp")
+
+DTYPES = {
+    "Name": smrt_consts.SmartDataTypes.TEXT,
+    "Age": smrt_consts.SmartDataTypes.INT,
+    "Height": smrt_consts.SmartDataTypes.FLOAT,
+}
+
+
+def random_frame(row_count: int, seed: int = 0, labels: list = None) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    data_df = pd.DataFrame(
+        {
+            "Name": rng.choice(np.array(["Bob", "Alice", "Carol"], dtype=object), row_count),
+            "Age": rng.integers(20, 60, row_count).astype(object),
+            "Height": rng.integers(0, 20, row_count) / 4 + 60,
+        },
+        index=labels,
+    )
+    data_df.loc[data_df.index[rng.random(row_count) < 0.1], "Name"] = None
+    return data_df
+
+
+def make_model(data_df: pd.DataFrame, **kwargs) -> smrt_data_model.SmartDataModel:
+    return smrt_data_model.SmartDataModel(
+        smrt_df=smrt_dataframe.SmartDataFrame(dtypes=dict(DTYPES), data_df=data_df.copy()), **kwargs
+    )
+
+
+def store_frame(model: smrt_data_model.SmartDataModel) -> pd.DataFrame:
+    # the model's rows as read from its column store, labelled by its row index
+    col_store = model.col_store
+    return pd.DataFrame(
+        {col_name: col_store.column_series(col).to_numpy() for col, col_name in enumerate(col_store.col_names)},
+        index=pd.Index(model.row_index.labels),
+    )
+
+
+def check_model(model: smrt_data_model.SmartDataModel, expected_df: pd.DataFrame) -> None:
+    # (the column store may hold None where the dataframe holds NaN, both are null)
+    def with_none(frame: pd.DataFrame) -> pd.DataFrame:
+        return frame.astype(object).where(frame.notna(), None)
+
+    pd.testing.assert_frame_equal(with_none(store_frame(model)), with_none(expected_df))
+    model.sync_data_df()
+    pd.testing.assert_frame_equal(model.smrt_df.data_df, expected_df, check_dtype=False)
+
+
+def test_edits_by_label_match_pandas():
+    labels = [f"id{pos}" for pos in np.random.default_rng(4).permutation(100)]
+    expected_df = random_frame(100, labels=labels)
+    model = make_model(expected_df)
+
+    updates = [("id7", "Name", "Eve"), ("id93", "Age", 70), ("id7", "Height", 58.25), ("id0", "Name", None)]
+    model.update_df_cell_values(updates)
+    model.update_df_cell_value("id42", "Age", 18)
+    for label, col_name, value in updates + [("id42", "Age", 18)]:
+        expected_df.loc[label, col_name] = value
+    check_model(model, expected_df)
+
+    model.drop_df_row("id93")
+    model.drop_df_row(labels[0])
+    expected_df = expected_df.drop(["id93", labels[0]])
+    check_model(model, expected_df)
+
+
+def test_drop_df_rows_tombstones_until_compacted():
+    expected_df = random_frame(100)
+    model = make_model(expected_df)
+    proxy = smrt_proxy_model.SmartProxyModel()
+    proxy.setSourceModel(model)
+
+    dropped = [3, 4, 5, 50, 99]
+    model.drop_df_rows(dropped)
+    # the rows stay in the model, the proxy hides them
+    assert model.rowCount() == 100
+    assert [model.is_tombstone(row) for row in range(100)] == [row in dropped for row in range(100)]
+    proxy.update_mapping()
+    assert proxy.rowCount() == 95
+    assert all(proxy.mapToSource(proxy.index(row, 0)).row() not in dropped for row in range(proxy.rowCount()))
+
+    # (dropping a row again is a no-op)
+    model.drop_df_rows([4, 10])
+    model.compact()
+    expected_df = expected_df.drop(dropped + [10])
+    check_model(model, expected_df)
+    assert model.tombstone_mask is None
+    proxy.update_mapping()
+    assert proxy.rowCount() == model.rowCount() == 94
+
+
+def test_drop_df_rows_compacts_over_the_threshold():
+    expected_df = random_frame(100)
+    model = make_model(expected_df, compaction_threshold=10)
+    model.drop_df_rows(range(0, 20, 4))
+    assert model.rowCount() == 100
+    model.drop_df_rows(range(50, 60))
+    assert model.rowCount() == 85
+    check_model(model, expected_df.drop(list(range(0, 20, 4)) + list(range(50, 60))))
+
+
+def test_drop_df_rows_with_duplicate_labels():
+    expected_df = random_frame(30, labels=[pos % 10 for pos in range(30)])
+    model = make_model(expected_df)
+    model.drop_df_rows([2, 7])
+    model.compact()
+    check_model(model, expected_df.drop([2, 7]))
+
+
+def test_append_rows_matches_concat():
+    first_df = random_frame(50)
+    model = make_model(first_df)
+    chunks = [random_frame(size, seed=size, labels=range(first, first + size)) for first, size in [(50, 7), (57, 30)]]
+    # a chunk whose float column is all None (pandas warns when that decides the dtype of the concat)
+    no_heights = random_frame(5, seed=5, labels=range(87, 92))
+    no_heights["Height"] = None
+    chunks.append(no_heights)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", FutureWarning)
+        for chunk_df in chunks:
+            model.append_rows(chunk_df)
+            # appended rows can be edited before they are merged into data_df
+            model.update_df_cell_value(chunk_df.index[0], "Age", 99)
+        model.drop_df_rows([0, 55, 88])
+        model.compact()
+        model.sync_data_df()
+    assert model.rowCount() == 89
+
+    chunks[-1] = no_heights.astype({"Height": np.float64})
+    expected_df = pd.concat([first_df] + chunks).drop([0, 55, 88])
+    expected_df.loc[[chunk_df.index[0] for chunk_df in chunks], "Age"] = 99
+    check_model(model, expected_df)
+    assert model.smrt_df.data_df["Height"].dtype == np.float64
+
+
+def test_append_rows_rejects_labels_in_the_table():
+    model = make_model(random_frame(10))
+    model.append_rows(random_frame(5, labels=range(10, 15)))
+    with pytest.raises(ValueError):
+        model.append_rows(random_frame(2, labels=[12, 20]))
+    assert model.rowCount() == 15
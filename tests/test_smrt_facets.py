@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+import functools
+
+from smart_qtable import smrt_facets
+
+
+def random_masks(rng: np.random.Generator, count: int, row_count: int = 200) -> dict[str, np.ndarray]:
+    return {f"col{pos}": rng.random(row_count) < 0.7 for pos in range(count)}
+
+
+def and_of_others(masks: dict[str, np.ndarray], name: str):
+    others = [mask for other_name, mask in masks.items() if other_name != name]
+    if not others:
+        return None
+    return functools.reduce(np.logical_and, others)
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 6])
+def test_leave_one_out_matches_and_of_others(count):
+    masks = random_masks(np.random.default_rng(count), count)
+    facets = smrt_facets.SmartFacetMasks()
+    facets.build(masks)
+    assert facets.is_valid_for(masks)
+    for name in list(masks) + ["not filtered"]:
+        expected = and_of_others(masks, name)
+        if expected is None:
+            assert facets.leave_one_out(name) is None
+        else:
+            np.testing.assert_array_equal(facets.leave_one_out(name), expected)
+    np.testing.assert_array_equal(facets.all_masks(), and_of_others(masks, None))
+
+
+def test_no_masks():
+    facets = smrt_facets.SmartFacetMasks()
+    facets.build({})
+    assert facets.leave_one_out("col0") is None
+    assert facets.all_masks() is None
+
+
+def test_update_rows_matches_a_fresh_build():
+    rng = np.random.default_rng(7)
+    masks = random_masks(rng, 4)
+    facets = smrt_facets.SmartFacetMasks()
+    facets.build(masks)
+    for mask in masks.values():
+        mask[50:90] = rng.random(40) < 0.5
+    facets.update_rows(50, 90)
+
+    fresh_facets = smrt_facets.SmartFacetMasks()
+    fresh_facets.build(masks)
+    for name in masks:
+        np.testing.assert_array_equal(facets.leave_one_out(name), fresh_facets.leave_one_out(name))
+        np.testing.assert_array_equal(facets.leave_one_out(name), and_of_others(masks, name))
+
+
+def test_replaced_mask_is_not_valid():
+    masks = random_masks(np.random.default_rng(8), 3)
+    facets = smrt_facets.SmartFacetMasks()
+    facets.build(masks)
+    assert not facets.is_valid_for({**masks, "col1": masks["col1"].copy()})
+    assert not facets.is_valid_for({name: masks[name] for name in reversed(masks)})
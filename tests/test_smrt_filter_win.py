@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import re
+
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_filter_win
+
+
+@pytest.fixture
+def match_text(monkeypatch) -> pd.Series:
+    # small chunks, so a search runs over several of them
+    monkeypatch.setattr(smrt_consts, "FILTER_SEARCH_CHUNK_SIZE", 7)
+    rng = np.random.default_rng(0)
+    words = np.array(["2024-JANUARY-05", "ALICE", "BOB", "(BLANKS)", "ALICE COOPER", "1,250"], dtype=object)
+    return pd.Series(words[rng.integers(0, len(words), 100)], index=rng.permutation(100))
+
+
+@pytest.mark.parametrize("pattern", [
+    "ALICE", "JANUARY-0", "ZZZ", "", re.compile("^A.*R$", re.IGNORECASE), re.compile(r"\d,\d")
+])
+def test_match_values_matches_pandas(match_text, pattern):
+    expected = match_text.str.contains(pattern, regex=isinstance(pattern, re.Pattern)).to_numpy(dtype=bool)
+    np.testing.assert_array_equal(smrt_filter_win.match_values(match_text, pattern), expected)
+
+
+def test_match_values_without_a_pattern(match_text):
+    # (a regex that does not compile matches nothing)
+    assert not smrt_filter_win.match_values(match_text, None).any()
+
+
+def test_match_values_stops_when_cancelled(match_text):
+    checks = []
+
+    def is_cancelled():
+        checks.append(True)
+        return len(checks) > 3
+
+    assert smrt_filter_win.match_values(match_text, "ALICE", is_cancelled) is None
+    assert len(checks) == 4
+
+
+def test_match_worker_emits_positions_with_generation(qapp, match_text):
+    results = []
+    worker = smrt_filter_win.SmartMatchWorker(match_text, "BOB", 7)
+    worker.signals.signal_finished.connect(lambda generation, positions: results.append((generation, positions)))
+    worker.run()
+    assert len(results) == 1
+    assert results[0][0] == 7
+    np.testing.assert_array_equal(results[0][1], np.flatnonzero(match_text.str.contains("BOB").to_numpy()))
+
+    cancelled_worker = smrt_filter_win.SmartMatchWorker(match_text, "BOB", 8)
+    cancelled_worker.signals.signal_finished.connect(lambda *args: results.append(args))
+    cancelled_worker.cancel()
+    cancelled_worker.run()
+    assert len(results) == 1
@@ -0,0 +1,319 @@
+import numpy as np
+import pandas as pd
+import pytest
+from PyQt6 import QtCore
+
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_data_model
+from smart_qtable import smrt_dataframe
+from smart_qtable import smrt_proxy_model
+from smart_qtable import smrt_range_filter
+
+pytestmark = pytest.mark.usefixtures("qapp")
+
+ASC = QtCore.Qt.SortOrder.AscendingOrder
+DESC = QtCore.Qt.SortOrder.DescendingOrder
+
+DTYPES = {
+    "Name": smrt_consts.SmartDataTypes.TEXT,
+    "Age": smrt_consts.SmartDataTypes.INT,
+    "Height": smrt_consts.SmartDataTypes.FLOAT,
+    "Joined": smrt_consts.SmartDataTypes.DATE_TIME,
+}
+
+
+def random_frame(row_count: int, seed: int = 0, first_label: int = 0) -> pd.DataFrame:
+    # few distinct values per column so there are plenty of ties, and some nulls in every column
+    rng = np.random.default_rng(seed)
+    data_df = pd.DataFrame(
+        {
+            "Name": rng.choice(np.array(["Bob", "alice", "Carol", "Dave"], dtype=object), row_count),
+            "Age": rng.integers(20, 25, row_count).astype(object),
+            "Height": rng.integers(0, 4, row_count) / 2 + 60,
+            "Joined": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 3, row_count), unit="D"),
+        },
+        index=pd.RangeIndex(first_label, first_label + row_count),
+    )
+    for col in data_df.columns:
+        data_df.loc[data_df.index[rng.random(row_count) < 0.15], col] = None
+    return data_df
+
+
+def make_model(data_df: pd.DataFrame, **kwargs) -> smrt_data_model.SmartDataModel:
+    return smrt_data_model.SmartDataModel(
+        smrt_df=smrt_dataframe.SmartDataFrame(dtypes=dict(DTYPES), data_df=data_df), **kwargs
+    )
+
+
+def make_proxy(model: smrt_data_model.SmartDataModel, filters: dict = None, sort: dict = None, **kwargs):
+    proxy = smrt_proxy_model.SmartProxyModel(**kwargs)
+    proxy.setSourceModel(model)
+    for col_name, df_filter in (filters or {}).items():
+        proxy.set_filter_for_column(col_name, df_filter)
+    for col_name, sort_order in (sort or {}).items():
+        proxy.set_sort_for_column(col_name, sort_order)
+    return proxy
+
+
+def shown_rows(proxy: smrt_proxy_model.SmartProxyModel) -> list[int]:
+    # (edits are applied once the event loop is idle)
+    proxy.update_mapping()
+    return [proxy.mapToSource(proxy.index(row, 0)).row() for row in range(proxy.rowCount())]
+
+
+def sorted_by_role(model: smrt_data_model.SmartDataModel, sort: dict) -> list[int]:
+    # the rows sorted one cell at a time on the model's sort role, the way a QSortFilterProxyModel would: stable
+    # sorts one column at a time, the primary column last, with nulls below every value
+    rows = list(range(model.rowCount()))
+    for col_name, sort_order in reversed(list(sort.items())):
+        col = model.column_num_from_name(col_name)
+        buffer = model.col_store.buffers[col]
+
+        def sort_key(row):
+            if buffer.null_mask[row]:
+                return 0, ""
+            return 1, model.data(model.index(row, col), smrt_consts.TABLE_SORT_ROLE)
+
+        rows = sorted(rows, key=sort_key, reverse=sort_order == DESC)
+    return rows
+
+
+def filtered_by_pandas(model: smrt_data_model.SmartDataModel, filters: dict) -> list[int]:
+    # the rows passing every filter, worked out with isin on the model's dataframe (None in a filter keeps nulls)
+    model.sync_data_df()
+    data_df = model.smrt_df.data_df
+    mask = np.ones(data_df.shape[0], dtype=bool)
+    for col_name, df_filter in filters.items():
+        values = [value for value in df_filter if value is not None]
+        col_mask = data_df[col_name].isin(values).to_numpy()
+        if len(values) < len(df_filter):
+            col_mask |= data_df[col_name].isnull().to_numpy()
+        mask &= col_mask
+    return np.flatnonzero(mask).tolist()
+
+
+@pytest.mark.parametrize("sort", [
+    {"Name": ASC},
+    {"Height": DESC},
+    {"Name": ASC, "Age": DESC},
+    {"Joined": DESC, "Height": ASC, "Name": DESC},
+])
+def test_sort_matches_sort_role(sort):
+    model = make_model(random_frame(300))
+    proxy = make_proxy(model, sort=sort)
+    assert shown_rows(proxy) == sorted_by_role(model, sort)
+
+
+def test_sort_follows_edits():
+    sort = {"Age": ASC, "Name": DESC}
+    model = make_model(random_frame(300))
+    proxy = make_proxy(model, sort=sort)
+    shown_rows(proxy)
+
+    model.update_df_cell_values([(5, "Age", 99), (17, "Name", None), (40, "Age", None), (41, "Name", "aaron")])
+    model.update_df_cell_value(120, "Age", 1)
+    assert shown_rows(proxy) == sorted_by_role(model, sort)
+    assert shown_rows(proxy) == shown_rows(make_proxy(model, sort=sort))
+
+
+FILTERS = {
+    "Name": ["Bob", "Carol", None],
+    "Age": [20, 21, 24],
+    "Joined": [pd.Timestamp("2024-01-02"), None],
+}
+
+
+@pytest.mark.parametrize("value_index", [True, False])
+def test_column_filters_match_pandas(value_index):
+    model = make_model(random_frame(500))
+    proxy = make_proxy(model, value_index=value_index)
+    filters = {}
+    for col_name, df_filter in FILTERS.items():
+        filters[col_name] = df_filter
+        proxy.set_filter_for_column(col_name, df_filter)
+        assert shown_rows(proxy) == filtered_by_pandas(model, filters)
+
+    # narrowed, widened and removed one column at a time, the other columns' masks are re-used
+    for col_name, df_filter in [("Name", ["Bob"]), ("Age", [20, 21, 22, 23, 24, None]), ("Joined", None)]:
+        proxy.set_filter_for_column(col_name, df_filter)
+        if df_filter is None:
+            filters.pop(col_name)
+        else:
+            filters[col_name] = df_filter
+        assert shown_rows(proxy) == filtered_by_pandas(model, filters)
+        assert shown_rows(proxy) == shown_rows(make_proxy(model, filters, value_index=value_index))
+
+    proxy.clear_filters()
+    assert shown_rows(proxy) == list(range(model.rowCount()))
+
+
+@pytest.mark.parametrize("value_index", [True, False])
+def test_column_filters_follow_edits(value_index):
+    model = make_model(random_frame(500))
+    proxy = make_proxy(model, FILTERS, value_index=value_index)
+    shown_rows(proxy)
+
+    model.update_df_cell_values([(3, "Name", "Bob"), (4, "Name", "Eve"), (9, "Age", 24), (10, "Age", None)])
+    model.update_df_cell_value(11, "Joined", pd.Timestamp("2024-01-02"))
+    assert shown_rows(proxy) == filtered_by_pandas(model, FILTERS)
+    assert shown_rows(proxy) == shown_rows(make_proxy(model, FILTERS, value_index=value_index))
+
+
+def test_value_indexes_follow_appended_and_dropped_rows():
+    model = make_model(random_frame(300))
+    proxy = make_proxy(model, FILTERS)
+    shown_rows(proxy)
+
+    model.append_rows(random_frame(50, seed=1, first_label=300))
+    assert shown_rows(proxy) == filtered_by_pandas(model, FILTERS)
+    model.drop_df_rows(range(0, 350, 7))
+    model.compact()
+    assert shown_rows(proxy) == filtered_by_pandas(model, FILTERS)
+    model.append_rows(random_frame(20, seed=2, first_label=350))
+    model.drop_df_rows([1, 2, 360])
+    model.compact()
+    assert shown_rows(proxy) == filtered_by_pandas(model, FILTERS)
+    assert shown_rows(proxy) == shown_rows(make_proxy(model, FILTERS))
+
+
+def test_range_filters_follow_appended_and_dropped_rows():
+    model = make_model(random_frame(300))
+    proxy = make_proxy(model)
+    proxy.set_filter_for_column("Height", smrt_range_filter.SmartRangeFilter(low=60.5, high=61))
+    proxy.set_filter_for_column("Joined", smrt_range_filter.SmartRangeFilter(high="2024-01-02", include_nulls=True))
+
+    def expected():
+        model.sync_data_df()
+        data_df = model.smrt_df.data_df
+        joined = data_df["Joined"]
+        mask = data_df["Height"].between(60.5, 61) & (joined.isnull() | (joined <= pd.Timestamp("2024-01-02")))
+        return np.flatnonzero(mask.to_numpy()).tolist()
+
+    assert shown_rows(proxy) == expected()
+    model.append_rows(random_frame(50, seed=1, first_label=300))
+    assert shown_rows(proxy) == expected()
+    model.drop_df_rows(range(0, 350, 5))
+    model.compact()
+    model.update_df_cell_values([(1, "Height", 60.5), (2, "Height", None), (3, "Joined", pd.Timestamp("2023-12-31"))])
+    assert shown_rows(proxy) == expected()
+
+
+def searched_by_display(proxy: smrt_proxy_model.SmartProxyModel, text: str) -> list[int]:
+    # the rows with text in the display string of one of their shown cells
+    model = proxy.sourceModel()
+    return [
+        row for row in range(model.rowCount())
+        if any(
+            text.upper() in str(model.data(model.index(row, col), QtCore.Qt.ItemDataRole.DisplayRole)).upper()
+            for col in proxy.proxy_to_source_cols
+        )
+    ]
+
+
+def test_search_matches_display_strings():
+    model = make_model(random_frame(300))
+    proxy = make_proxy(model)
+    for text in ["a", "al", "ali", "2024-01-0", "62", "", "bo"]:
+        proxy.set_search_text(text)
+        assert shown_rows(proxy) == (searched_by_display(proxy, text) if text else list(range(model.rowCount())))
+
+    proxy.set_hidden_cols(["Name"])
+    assert shown_rows(proxy) == searched_by_display(proxy, "bo")
+    proxy.clear_hidden_cols()
+    model.append_rows(random_frame(40, seed=1, first_label=300))
+    model.update_df_cell_value(0, "Name", "Bo Diddley")
+    model.drop_df_rows([5, 6, 310])
+    model.compact()
+    assert shown_rows(proxy) == searched_by_display(proxy, "bo")
+
+
+def uniques_by_pandas(model: smrt_data_model.SmartDataModel, col_name: str, filters: dict, **kwargs) -> pd.Series:
+    # the sorted unique values of a column among the rows passing every other column's filter (nulls last)
+    rows = filtered_by_pandas(model, {name: df_filter for name, df_filter in filters.items() if name != col_name})
+    if model.tombstone_mask is not None:
+        rows = [row for row in rows if not model.tombstone_mask[row]]
+    column = model.smrt_df.data_df[col_name].iloc[rows]
+    return pd.Series(column.unique()).sort_values(ascending=not kwargs.get("descending", False), ignore_index=True)
+
+
+def test_column_uniques_leave_out_the_column_own_filter():
+    model = make_model(random_frame(300))
+    proxy = make_proxy(model, FILTERS)
+    for col_name in ["Name", "Age", "Height", "Joined"]:
+        uniques = proxy.column_uniques(model.smrt_df.data_df[col_name])
+        pd.testing.assert_series_equal(uniques, uniques_by_pandas(model, col_name, FILTERS))
+        # re-opening the same popup re-uses the values
+        assert proxy.column_uniques(model.smrt_df.data_df[col_name]) is uniques
+
+    pd.testing.assert_series_equal(
+        proxy.column_uniques(model.smrt_df.data_df["Age"], descending=True),
+        uniques_by_pandas(model, "Age", FILTERS, descending=True),
+    )
+
+
+def test_column_uniques_follow_filters_and_edits():
+    model = make_model(random_frame(300))
+    filters = dict(FILTERS)
+    proxy = make_proxy(model, filters)
+
+    def check_uniques():
+        pd.testing.assert_series_equal(
+            proxy.column_uniques(model.smrt_df.data_df["Height"]), uniques_by_pandas(model, "Height", filters)
+        )
+
+    check_uniques()
+    filters["Name"] = ["alice"]
+    proxy.set_filter_for_column("Name", filters["Name"])
+    check_uniques()
+    model.update_df_cell_values([(row, "Height", 99.5) for row in range(0, 300, 3)])
+    check_uniques()
+    # (dropped rows leave the popup straight away, before they are compacted)
+    model.drop_df_rows(range(0, 300, 2))
+    check_uniques()
+
+
+def test_other_filters_mask_matches_pandas():
+    model = make_model(random_frame(300))
+    proxy = make_proxy(model, FILTERS)
+    for col_name in list(FILTERS) + ["Height"]:
+        other_filters = {name: df_filter for name, df_filter in FILTERS.items() if name != col_name}
+        assert np.flatnonzero(proxy.other_filters_mask(col_name)).tolist() == filtered_by_pandas(model, other_filters)
+
+    # the rows edited in place are brought up to date in the leave-one-out masks
+    model.update_df_cell_values([(row, "Name", "Bob") for row in range(0, 100, 4)])
+    model.update_df_cell_values([(row, "Age", None) for row in range(50, 150, 3)])
+    for col_name in FILTERS:
+        other_filters = {name: df_filter for name, df_filter in FILTERS.items() if name != col_name}
+        assert np.flatnonzero(proxy.other_filters_mask(col_name)).tolist() == filtered_by_pandas(model, other_filters)
+
+
+def test_value_counts_match_pandas():
+    model = make_model(random_frame(300))
+    filters = dict(FILTERS)
+    proxy = make_proxy(model, filters)
+
+    def check_counts(col_name):
+        # (the table merges appended rows into data_df before opening a popup)
+        model.sync_data_df()
+        uniques = proxy.column_uniques(model.smrt_df.data_df[col_name])
+        rows = filtered_by_pandas(model, {name: df_filter for name, df_filter in filters.items() if name != col_name})
+        if model.tombstone_mask is not None:
+            rows = [row for row in rows if not model.tombstone_mask[row]]
+        column = model.smrt_df.data_df[col_name].iloc[rows]
+        expected = [(column == value).sum() if pd.notnull(value) else column.isnull().sum() for value in uniques]
+        assert proxy.value_counts_for(col_name, uniques).tolist() == expected
+
+    for col_name in ["Name", "Age", "Joined"]:
+        check_counts(col_name)
+    filters["Height"] = [60.0, 61.5]
+    proxy.set_filter_for_column("Height", filters["Height"])
+    check_counts("Name")
+    model.update_df_cell_values([(row, "Name", "Eve") for row in range(0, 300, 5)])
+    model.update_df_cell_values([(row, "Height", 60.0) for row in range(1, 300, 7)])
+    check_counts("Name")
+    model.append_rows(random_frame(40, seed=1, first_label=300))
+    check_counts("Name")
+    model.drop_df_rows(range(0, 340, 3))
+    check_counts("Name")
+    model.compact()
+    check_counts("Name")
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from smart_qtable import smrt_column_store
+from smart_qtable import smrt_consts
+from smart_qtable import smrt_range_filter
+
+RangeFilter = smrt_range_filter.SmartRangeFilter
+
+
+def make_buffer(column: pd.Series, dtype: smrt_consts.SmartDataTypes) -> smrt_column_store.SmartColumnBuffer:
+    return smrt_column_store.SmartColumnStore().create_buffer(column.name, dtype, column)
+
+
+def between_by_pandas(column: pd.Series, range_filter: RangeFilter, invalid: np.ndarray) -> np.ndarray:
+    low = -np.inf if range_filter.low is None else range_filter.low
+    high = np.inf if range_filter.high is None else range_filter.high
+    if column.dtype.kind == "M":
+        low = pd.Timestamp.min if range_filter.low is None else pd.Timestamp(range_filter.low)
+        high = pd.Timestamp.max if range_filter.high is None else pd.Timestamp(range_filter.high)
+    mask = column.between(low, high).to_numpy() & ~invalid
+    if range_filter.include_nulls:
+        mask |= invalid
+    return mask
+
+
+NUMBER_FILTERS = [
+    RangeFilter(low=2.5, high=7),
+    RangeFilter(low=3),
+    RangeFilter(high=3),
+    RangeFilter(low=3, high=3, include_nulls=True),
+    RangeFilter(low=8, high=1),
+]
+
+
+@pytest.mark.parametrize("range_filter", NUMBER_FILTERS)
+def test_float_range_matches_pandas(range_filter):
+    rng = np.random.default_rng(0)
+    column = pd.Series(rng.integers(0, 10, 300) / 2, name="Height")
+    column[rng.random(300) < 0.1] = np.nan
+    buffer = make_buffer(column, smrt_consts.SmartDataTypes.FLOAT)
+    expected = between_by_pandas(column, range_filter, column.isnull().to_numpy())
+    np.testing.assert_array_equal(smrt_range_filter.range_mask(range_filter, buffer), expected)
+    np.testing.assert_array_equal(smrt_range_filter.range_mask(range_filter, buffer, 20, 250), expected[20:250])
+    np.testing.assert_array_equal(smrt_range_filter.SmartRangeIndex.from_buffer(buffer).mask(range_filter), expected)
+
+
+@pytest.mark.parametrize("range_filter", NUMBER_FILTERS)
+def test_int_range_leaves_out_blanks(range_filter):
+    # the INT blank flag is shown as an empty cell, it is never inside a range
+    rng = np.random.default_rng(1)
+    column = pd.Series(rng.integers(0, 10, 300), name="Age", dtype=object)
+    column[rng.random(300) < 0.1] = None
+    column[rng.random(300) < 0.1] = smrt_consts.SMRT_TBL_BLANK_INT_FLAG
+    buffer = make_buffer(column, smrt_consts.SmartDataTypes.INT)
+    invalid = (column.isnull() | (column == smrt_consts.SMRT_TBL_BLANK_INT_FLAG)).to_numpy()
+    expected = between_by_pandas(column.astype(float), range_filter, invalid)
+    np.testing.assert_array_equal(smrt_range_filter.range_mask(range_filter, buffer), expected)
+    np.testing.assert_array_equal(smrt_range_filter.SmartRangeIndex.from_buffer(buffer).mask(range_filter), expected)
+
+
+@pytest.mark.parametrize("range_filter", [
+    RangeFilter(low="2024-01-03", high="2024-01-05 12:00"),
+    RangeFilter(high="2024-01-02"),
+    RangeFilter(low="2024-01-06", include_nulls=True),
+])
+def test_date_time_range_matches_pandas(range_filter):
+    rng = np.random.default_rng(2)
+    column = pd.Series(
+        pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 8 * 24, 300), unit="h"), name="Joined"
+    )
+    column[rng.random(300) < 0.1] = pd.NaT
+    buffer = make_buffer(column, smrt_consts.SmartDataTypes.DATE_TIME)
+    expected = between_by_pandas(column, range_filter, column.isnull().to_numpy())
+    np.testing.assert_array_equal(smrt_range_filter.range_mask(range_filter, buffer), expected)
+    np.testing.assert_array_equal(smrt_range_filter.SmartRangeIndex.from_buffer(buffer).mask(range_filter), expected)
+
+
+def test_range_index_remove_rows_matches_a_fresh_index():
+    rng = np.random.default_rng(3)
+    column = pd.Series(rng.integers(0, 10, 400) / 2, name="Height")
+    column[rng.random(400) < 0.1] = np.nan
+    float_type = smrt_consts.SmartDataTypes.FLOAT
+    range_index = smrt_range_filter.SmartRangeIndex.from_buffer(make_buffer(column, float_type))
+    removed = np.unique(rng.integers(0, 400, 50))
+    range_index.remove_rows(removed)
+
+    remaining = column.drop(removed).reset_index(drop=True)
+    fresh_index = smrt_range_filter.SmartRangeIndex.from_buffer(make_buffer(remaining, float_type))
+    for range_filter in NUMBER_FILTERS:
+        np.testing.assert_array_equal(range_index.mask(range_filter), fresh_index.mask(range_filter))
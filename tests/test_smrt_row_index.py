@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from smart_qtable import smrt_row_index
+
+
+def check_against(row_index: smrt_row_index.SmartRowIndex, index: pd.Index) -> None:
+    assert len(row_index) == len(index)
+    assert row_index.is_unique == index.is_unique
+    for row, label in enumerate(index):
+        assert row_index.label(row) == label
+        rows = np.flatnonzero(index == label)
+        assert row_index.position(label) == rows[0]
+        assert row_index.positions(label) == rows.tolist()
+    labels = list(index[::3]) + ["missing"]
+    first_rows = [np.flatnonzero(index == label)[0] if label in index else -1 for label in labels]
+    np.testing.assert_array_equal(row_index.get_indexer(labels), first_rows)
+    np.testing.assert_array_equal(row_index.get_all_positions(labels[:-1]), np.flatnonzero(index.isin(labels[:-1])))
+
+
+@pytest.mark.parametrize("index", [
+    pd.RangeIndex(50),
+    pd.Index([f"row{pos}" for pos in np.random.default_rng(0).permutation(50)]),
+    pd.Index(np.random.default_rng(1).integers(0, 20, 50)),
+])
+def test_lookups_match_pandas(index):
+    check_against(smrt_row_index.SmartRowIndex(index), index)
+
+
+def test_missing_labels_raise_key_error():
+    row_index = smrt_row_index.SmartRowIndex(pd.Index(["a", "b"]))
+    with pytest.raises(KeyError):
+        row_index.position("c")
+    with pytest.raises(KeyError):
+        row_index.positions("c")
+    with pytest.raises(KeyError):
+        row_index.get_all_positions(["a", "c"])
+
+
+@pytest.mark.parametrize("labels", [list(range(100)), list(np.random.default_rng(2).integers(0, 40, 100))])
+def test_append_and_remove_match_pandas(labels):
+    rng = np.random.default_rng(3)
+    index = pd.Index(labels[:60])
+    row_index = smrt_row_index.SmartRowIndex(index)
+    # (looked up first, so the positions are kept up to date rather than built again)
+    row_index.position(index[0])
+
+    row_index.append(labels[60:])
+    index = index.append(pd.Index(labels[60:]))
+    check_against(row_index, index)
+    for _ in range(3):
+        removed = np.unique(rng.integers(0, len(index), 15))
+        removed_labels = index[removed]
+        row_index.remove(removed)
+        index = index.delete(removed)
+        check_against(row_index, index)
+        gone = [label for label in removed_labels if label not in index]
+        assert (row_index.get_indexer(gone) == -1).all()
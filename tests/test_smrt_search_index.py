@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from smart_qtable import smrt_search_index
+
+# (the last string is too long to be broken into trigrams)
+WORDS = np.array(
+    ["Apple pie", "apple", "Pineapple", "banana split", "", "pie", "ápple", "x" * 40 + "apple"], dtype=object
+)
+
+
+def contains_by_pandas(strings: np.ndarray, text: str) -> np.ndarray:
+    return pd.Series(strings, dtype=object).str.upper().str.contains(text.upper(), regex=False).to_numpy(dtype=bool)
+
+
+def random_strings(rng: np.random.Generator, row_count: int) -> np.ndarray:
+    return WORDS[rng.integers(0, len(WORDS), row_count)]
+
+
+@pytest.mark.parametrize("text", ["apple", "APP", "pie", "e", "ppl", "le p", "xxxxa", "cherry", "ÁPP", "apple pies"])
+def test_match_matches_pandas(text):
+    strings = random_strings(np.random.default_rng(0), 500)
+    search_index = smrt_search_index.SmartSearchIndex(strings)
+    expected = contains_by_pandas(strings, text)
+    np.testing.assert_array_equal(search_index.match(text), expected)
+    np.testing.assert_array_equal(search_index.match(text, 100, 300), expected[100:300])
+
+
+def test_narrowing_search_matches_pandas():
+    # each search extends the previous one, only its matches are checked again
+    strings = random_strings(np.random.default_rng(1), 500)
+    search_index = smrt_search_index.SmartSearchIndex(strings)
+    for text in ["a", "ap", "app", "appl", "apple", "apple ", "apple p", "pple"]:
+        np.testing.assert_array_equal(search_index.match(text), contains_by_pandas(strings, text))
+
+
+def test_update_rows_matches_a_fresh_index():
+    rng = np.random.default_rng(2)
+    strings = random_strings(rng, 300)
+    search_index = smrt_search_index.SmartSearchIndex(strings)
+    search_index.match("apple")
+
+    strings[5:9] = "Crab apple"
+    assert search_index.update_rows(5, strings[5:9])
+    appended = np.array(["toffee apple", "cherry", "Apple pie"], dtype=object)
+    assert search_index.update_rows(300, appended)
+    strings = np.concatenate([strings, appended])
+
+    fresh_index = smrt_search_index.SmartSearchIndex(strings)
+    for text in ["apple", "crab", "Cherry", "e a"]:
+        np.testing.assert_array_equal(search_index.match(text), contains_by_pandas(strings, text))
+        np.testing.assert_array_equal(search_index.match(text), fresh_index.match(text))
+
+
+def test_update_rows_gives_up_after_many_new_strings(monkeypatch):
+    monkeypatch.setattr(smrt_search_index, "MAX_UNINDEXED_STRINGS", 2)
+    search_index = smrt_search_index.SmartSearchIndex(WORDS.copy())
+    assert search_index.update_rows(0, np.array(["one", "two"], dtype=object))
+    assert not search_index.update_rows(0, np.array(["three"], dtype=object))
+
+
+def test_remove_rows_matches_pandas():
+    rng = np.random.default_rng(3)
+    strings = random_strings(rng, 300)
+    search_index = smrt_search_index.SmartSearchIndex(strings)
+    removed = np.unique(rng.integers(0, 300, 40))
+    search_index.remove_rows(removed)
+    strings = np.delete(strings, removed)
+    for text in ["apple", "pi"]:
+        np.testing.assert_array_equal(search_index.match(text), contains_by_pandas(strings, text))
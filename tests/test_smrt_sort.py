@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import datetime
+
+from smart_qtable import smrt_sort
+
+
+def random_frame(rng: np.random.Generator, row_count: int) -> pd.DataFrame:
+    # few distinct values per column so there are plenty of ties, and some nulls in every column
+    data_df = pd.DataFrame({
+        "text": rng.choice(np.array(["b", "a", "c", "B"], dtype=object), row_count),
+        "num": rng.integers(-3, 3, row_count).astype(float),
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 4, row_count), unit="D"),
+    })
+    for col in data_df.columns:
+        data_df.loc[rng.random(row_count) < 0.2, col] = None
+    return data_df
+
+
+def frame_ranks(data_df: pd.DataFrame) -> list[np.ndarray]:
+    return [
+        smrt_sort.null_ranks(data_df[col].to_numpy(), data_df[col].isnull().to_numpy()) for col in data_df.columns
+    ]
+
+
+def test_dense_ranks_match_pandas():
+    values = np.array([3.5, -1.0, 3.5, 0.0, 7.25, -1.0])
+    expected = pd.Series(values).rank(method="dense").to_numpy() - 1
+    np.testing.assert_array_equal(smrt_sort.dense_ranks(values), expected)
+
+
+def test_dense_ranks_mixed_types():
+    # numbers sort together before the dates, equal values share a rank
+    values = np.array([datetime.date(2024, 1, 2), 5, 1.5, datetime.date(2023, 1, 1), 5], dtype=object)
+    np.testing.assert_array_equal(smrt_sort.dense_ranks(values), [3, 1, 0, 2, 1])
+
+
+def test_null_ranks_put_nulls_first():
+    values = np.array(["b", None, "a", None, "b"], dtype=object)
+    ranks = smrt_sort.null_ranks(values, pd.isnull(values))
+    np.testing.assert_array_equal(ranks, [1, -1, 0, -1, 1])
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("descending", [[False, False, False], [True, False, True], [True, True, True]])
+def test_multi_key_sort_matches_pandas(seed, descending):
+    data_df = random_frame(np.random.default_rng(seed), 200)
+    order = smrt_sort.sort_rows(frame_ranks(data_df), descending)
+
+    # stable sorts one column at a time, the primary column last. Nulls rank below every value, so they come first
+    # in an ascending column and last in a descending one.
+    expected = data_df
+    for col, desc in reversed(list(zip(data_df.columns, descending))):
+        expected = expected.sort_values(
+            col, ascending=not desc, na_position="last" if desc else "first", kind="stable"
+        )
+    np.testing.assert_array_equal(order, expected.index.to_numpy())
+
+
+def test_multi_key_sort_without_combined_key():
+    # spans too large to fit one int64 fall back to a lexsort
+    rng = np.random.default_rng(0)
+    keys = [rng.integers(0, 2**40, 100) for _ in range(3)]
+    keys[0][::3] = keys[0][0]
+    order = smrt_sort.sort_rows(keys, [False, True, False])
+    expected = np.lexsort([keys[2], -keys[1], keys[0]])
+    np.testing.assert_array_equal(order, expected)
+
+
+def test_reverse_order_is_a_stable_descending_sort():
+    ranks = np.random.default_rng(1).integers(0, 5, 300)
+    ascending = np.argsort(ranks, kind="stable")
+    expected = np.argsort(-ranks, kind="stable")
+    np.testing.assert_array_equal(smrt_sort.reverse_order(ascending, ranks), expected)
+
+
+class StubRenderer:
+    # the part of SmartCellRenderer the sort cache uses, counting how often the column is ranked
+
+    def __init__(self, col: int, ranks: np.ndarray):
+        self.col = col
+        self.ranks = ranks
+        self.ranked_count = 0
+
+    def sort_keys(self) -> np.ndarray:
+        self.ranked_count += 1
+        return self.ranks
+
+
+def test_sort_cache_ranks_each_column_once():
+    rng = np.random.default_rng(2)
+    renderers = [StubRenderer(col, rng.integers(-1, 6, 100)) for col in range(2)]
+    sort_cache = smrt_sort.SmartSortCache()
+    for descending in ([False], [True]):
+        order = sort_cache.sort_rows(renderers[:1], descending, data_version=0)
+        expected = smrt_sort.sort_rows([renderers[0].ranks], descending)
+        np.testing.assert_array_equal(order, expected)
+    order = sort_cache.sort_rows(renderers, [True, False], data_version=0)
+    expected = smrt_sort.sort_rows([renderer.ranks for renderer in renderers], [True, False])
+    np.testing.assert_array_equal(order, expected)
+    assert [renderer.ranked_count for renderer in renderers] == [1, 1]
+
+
+def test_sort_cache_invalidate_column():
+    renderer = StubRenderer(0, np.array([2, 0, 1]))
+    sort_cache = smrt_sort.SmartSortCache()
+    sort_cache.sort_rows([renderer], [False], data_version=3)
+
+    # (re-filtering at the same data_version keeps the ranks)
+    sort_cache.invalidate_column(0, data_version=3)
+    renderer.ranks = np.array([0, 1, 2])
+    np.testing.assert_array_equal(sort_cache.sort_rows([renderer], [False], data_version=3), [1, 2, 0])
+
+    sort_cache.invalidate_column(0, data_version=4)
+    np.testing.assert_array_equal(sort_cache.sort_rows([renderer], [False], data_version=4), [0, 1, 2])
+    assert renderer.ranked_count == 2
+
+
+def test_sort_cache_remove_rows_matches_a_fresh_cache():
+    rng = np.random.default_rng(3)
+    ranks = rng.integers(-1, 5, 200)
+    removed = np.unique(rng.integers(0, 200, 40))
+    sort_cache = smrt_sort.SmartSortCache()
+    sort_cache.sort_rows([StubRenderer(0, ranks)], [False], data_version=0)
+    sort_cache.remove_rows(removed)
+
+    fresh_cache = smrt_sort.SmartSortCache()
+    remaining = StubRenderer(0, np.delete(ranks, removed))
+    for descending in ([False], [True]):
+        np.testing.assert_array_equal(
+            sort_cache.sort_rows([remaining], descending, data_version=0),
+            fresh_cache.sort_rows([remaining], descending, data_version=0),
+        )
+    assert remaining.ranked_count == 1
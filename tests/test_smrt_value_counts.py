@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from smart_qtable import smrt_value_counts
+
+VALUES = pd.Index(["red", "green", "blue", "grey", "black"])
+
+
+def random_column(rng: np.random.Generator, row_count: int) -> tuple[np.ndarray, np.ndarray]:
+    values = rng.choice(np.array(["red", "green", "blue", "grey"], dtype=object), row_count)
+    values[rng.random(row_count) < 0.1] = None
+    return values, pd.isnull(values)
+
+
+def counts_by_pandas(values: np.ndarray, counted: np.ndarray) -> np.ndarray:
+    # the count of each of VALUES among the counted rows, then the count of the counted nulls
+    counted_values = pd.Series(values[counted], dtype=object)
+    counts = counted_values.value_counts().reindex(VALUES, fill_value=0).to_numpy()
+    return np.append(counts, counted_values.isnull().sum())
+
+
+def value_counts_for(value_counts: smrt_value_counts.SmartValueCounts) -> np.ndarray:
+    keys = VALUES.append(pd.Index([None], dtype=object))
+    return value_counts.counts_for(keys, pd.isnull(keys))
+
+
+def test_counts_match_pandas():
+    rng = np.random.default_rng(0)
+    values, null_mask = random_column(rng, 500)
+    value_counts = smrt_value_counts.SmartValueCounts.build(values, null_mask)
+    for _ in range(3):
+        counted = rng.random(500) < 0.6
+        value_counts.recount(counted)
+        np.testing.assert_array_equal(value_counts_for(value_counts), counts_by_pandas(values, counted))
+
+
+def test_update_rows_matches_pandas():
+    rng = np.random.default_rng(1)
+    values, null_mask = random_column(rng, 400)
+    value_counts = smrt_value_counts.SmartValueCounts.build(values, null_mask)
+    counted = rng.random(400) < 0.6
+    value_counts.recount(counted)
+
+    # rows filtered in or out
+    counted[100:150] = ~counted[100:150]
+    assert value_counts.update_rows(100, 150, counted[100:150])
+    # rows edited, with a value not seen before
+    values[10:20] = "black"
+    values[20:25] = None
+    null_mask = pd.isnull(values)
+    assert value_counts.update_rows(10, 25, counted[10:25], values, null_mask)
+    # rows appended
+    appended, appended_nulls = random_column(rng, 60)
+    values = np.concatenate([values, appended])
+    null_mask = np.concatenate([null_mask, appended_nulls])
+    counted = np.concatenate([counted, rng.random(60) < 0.5])
+    assert value_counts.update_rows(400, 460, counted[400:460], values, null_mask)
+
+    np.testing.assert_array_equal(value_counts_for(value_counts), counts_by_pandas(values, counted))
+    fresh_counts = smrt_value_counts.SmartValueCounts.build(values, null_mask)
+    fresh_counts.recount(counted)
+    np.testing.assert_array_equal(value_counts_for(value_counts), value_counts_for(fresh_counts))
+
+
+def test_remove_rows_matches_pandas():
+    rng = np.random.default_rng(2)
+    values, null_mask = random_column(rng, 300)
+    value_counts = smrt_value_counts.SmartValueCounts.build(values, null_mask)
+    counted = rng.random(300) < 0.7
+    value_counts.recount(counted)
+    removed = np.unique(rng.integers(0, 300, 50))
+    value_counts.remove_rows(removed)
+    np.testing.assert_array_equal(
+        value_counts_for(value_counts), counts_by_pandas(np.delete(values, removed), np.delete(counted, removed))
+    )
+
+
+def test_unhashable_values_are_not_counted():
+    values = np.array([[1], [2], None], dtype=object)
+    assert smrt_value_counts.SmartValueCounts.build(values, pd.isnull(values)) is None
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from smart_qtable import smrt_value_index
+
+
+def random_column(rng: np.random.Generator, row_count: int) -> tuple[np.ndarray, np.ndarray]:
+    values = rng.choice(np.array(["red", "green", "blue", "grey", "pink"], dtype=object), row_count)
+    values[rng.random(row_count) < 0.1] = None
+    return values, pd.isnull(values)
+
+
+def isin_by_pandas(values: np.ndarray, filt_vals: list, include_nulls: bool) -> np.ndarray:
+    mask = pd.Series(values).isin(filt_vals).to_numpy()
+    if include_nulls:
+        mask |= pd.isnull(values)
+    return mask
+
+
+@pytest.mark.parametrize("filt_vals, include_nulls", [
+    (["red"], False),
+    (["red", "blue", "black"], True),
+    ([], True),
+    (["black"], False),
+    ([1, 2.5], False),
+])
+def test_isin_matches_pandas(filt_vals, include_nulls):
+    values, null_mask = random_column(np.random.default_rng(0), 1001)
+    value_index = smrt_value_index.SmartValueIndex.build(values, null_mask)
+    expected = isin_by_pandas(values, filt_vals, include_nulls)
+    np.testing.assert_array_equal(value_index.isin(filt_vals, include_nulls), expected)
+    np.testing.assert_array_equal(value_index.isin(filt_vals, include_nulls, 13, 500), expected[13:500])
+
+
+def test_isin_with_many_values(monkeypatch):
+    # a filter on more values than MAX_BITMAPS_PER_FILTER is looked up value by value
+    monkeypatch.setattr(smrt_value_index, "MAX_BITMAPS_PER_FILTER", 2)
+    values, null_mask = random_column(np.random.default_rng(1), 300)
+    value_index = smrt_value_index.SmartValueIndex.build(values, null_mask)
+    filt_vals = ["red", "green", "pink"]
+    np.testing.assert_array_equal(value_index.isin(filt_vals, True), isin_by_pandas(values, filt_vals, True))
+
+
+def test_build_skips_columns_with_many_values():
+    values = np.arange(smrt_value_index.MAX_INDEXED_VALUES + 1)
+    assert smrt_value_index.SmartValueIndex.build(values, np.zeros(values.shape[0], dtype=bool)) is None
+    assert smrt_value_index.SmartValueIndex.build(values[:-1], np.zeros(values.shape[0] - 1, dtype=bool)) is not None
+
+
+def test_update_rows_matches_a_fresh_index():
+    rng = np.random.default_rng(2)
+    values, null_mask = random_column(rng, 400)
+    value_index = smrt_value_index.SmartValueIndex.build(values, null_mask)
+    filt_vals = ["red", "white"]
+    # the bitmaps built so far are patched rather than dropped
+    value_index.isin(filt_vals, True)
+
+    values[10:30] = "white"
+    values[31] = None
+    null_mask = pd.isnull(values)
+    assert value_index.update_rows(values, null_mask, 10, 32)
+    appended, appended_nulls = random_column(rng, 77)
+    values = np.concatenate([values, appended])
+    null_mask = np.concatenate([null_mask, appended_nulls])
+    assert value_index.update_rows(values, null_mask, 400, 477)
+
+    np.testing.assert_array_equal(value_index.isin(filt_vals, True), isin_by_pandas(values, filt_vals, True))
+    fresh_index = smrt_value_index.SmartValueIndex.build(values, null_mask)
+    np.testing.assert_array_equal(value_index.isin(filt_vals, True), fresh_index.isin(filt_vals, True))
+
+
+def test_remove_rows_matches_a_fresh_index():
+    rng = np.random.default_rng(3)
+    values, null_mask = random_column(rng, 400)
+    value_index = smrt_value_index.SmartValueIndex.build(values, null_mask)
+    value_index.isin(["red"], False)
+    removed = np.unique(rng.integers(0, 400, 60))
+    value_index.remove_rows(removed)
+
+    values = np.delete(values, removed)
+    np.testing.assert_array_equal(value_index.isin(["red"], False), isin_by_pandas(values, ["red"], False))
+    np.testing.assert_array_equal(value_index.isin(["grey"], True), isin_by_pandas(values, ["grey"], True))